@@ -1,28 +1,53 @@
 """
 All agent communication pattern are implemented in this file.
 """
-import json
+import copy
 import os
-import random
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 
+import numpy as np
 import pandas as pd
 
 from agent_communication_generation_tool.description_classes.agent import CentralAgent, LeafAgent, Agent, \
     AggregatorAgent
+from agent_communication_generation_tool.description_classes.arrival_process import (ArrivalProcess,
+                                                                                     UniformArrivalProcess,
+                                                                                     PoissonArrivalProcess,
+                                                                                     DeterministicJitterArrivalProcess,
+                                                                                     MMPPArrivalProcess,
+                                                                                     ParetoOnOffArrivalProcess)
 from agent_communication_generation_tool.description_classes.communication_graph import CommunicationGraph
 from agent_communication_generation_tool.description_classes.data_size_generator import (DataSizeGenerator,
                                                                                          FixedDataSizeGenerator,
                                                                                          InIntervalDataSizeGenerator)
+from agent_communication_generation_tool.description_classes.traffic_bundle import write_traffic_bundle
+from agent_communication_generation_tool.description_classes.traffic_configuration import TrafficConfiguration, \
+    StreamRule, TrafficConfigurationWriter, read_traffic_configuration_chunks, get_config_file_path, \
+    merge_traffic_configurations
 
 
 class TriggerType(Enum):
     """
     Communication might be event or time triggered.
+    Event-triggered communication can follow a specific arrival process.
     """
     EVENT_TRIGGERED = 1
     TIME_TRIGGERED = 2
+    POISSON = 3
+    DETERMINISTIC_JITTER = 4
+    MMPP = 5
+    PARETO_ON_OFF = 6
+
+
+ARRIVAL_PROCESS_TRIGGER_TYPES = {
+    UniformArrivalProcess: TriggerType.EVENT_TRIGGERED,
+    PoissonArrivalProcess: TriggerType.POISSON,
+    DeterministicJitterArrivalProcess: TriggerType.DETERMINISTIC_JITTER,
+    MMPPArrivalProcess: TriggerType.MMPP,
+    ParetoOnOffArrivalProcess: TriggerType.PARETO_ON_OFF
+}
 
 
 class CommunicationMode(Enum):
@@ -45,30 +70,74 @@ class OrganizationalStructure(Enum):
     DECENTRALIZED = 3
 
 
-def write_config_to_file(end_device, config):
+TRAFFIC_CONFIGURATION_DIRECTORY = 'omnet_project_files/modules/traffic_configurations/'
+TRAFFIC_BUNDLE_FILE_NAME = 'traffic_bundle.bin'
+# time after the last message (or reply) until the simulation ends, messages still in flight are delivered
+DEFAULT_DRAIN_MARGIN_MS = 5000
+
+
+def write_config_to_file(end_device, config: TrafficConfiguration, directory=TRAFFIC_CONFIGURATION_DIRECTORY):
     """
     Writes json-network configuration to file in OMNeT++ project.
     :param end_device: name of end device.
-    :param config: traffic configuration file (json).
+    :param config: traffic configuration of end device.
+    :param directory: directory of the traffic configuration files.
     :return: writes file
     """
-    directory = 'omnet_project_files/modules/traffic_configurations/'
     os.makedirs(directory, exist_ok=True)  # Create directory if it doesn't exist
 
-    with open(os.path.join(directory, f'traffic_config_{end_device}.json'), 'w') as f:
-        json.dump(config, f, indent=2)
+    with open(get_config_file_path(directory, end_device), 'w') as f:
+        f.write(config.to_json())
+
+
+def is_periodic(times_send_ms: np.ndarray) -> bool:
+    """
+    Checks whether sending times have a constant period.
+    :param times_send_ms: sending times.
+    :return: bool.
+    """
+    if len(times_send_ms) < 3:
+        return len(times_send_ms) > 0
+    periods = np.diff(times_send_ms)
+    return bool((periods == periods[0]).all())
 
 
 def get_initial_config(agent: Agent):
     """
-    Generates initial configuration dict for OMNeT++.
+    Generates initial (empty) traffic configuration for OMNeT++.
     :param agent: sender.
-    :return: dictionary with config.
+    :return: traffic configuration.
     """
-    return {
-        "sender": agent.omnet_name,
-        "messageList": []
-    }
+    return TrafficConfiguration(agent)
+
+
+def generate_time_grid_shard(pattern,
+                             entropy: int,
+                             sender_indices: list[int],
+                             senders: list[Agent],
+                             receivers_per_sender: list,
+                             times_send_ms: np.ndarray,
+                             packet_sizes_bytes: list[int],
+                             expect_reply,
+                             reply_after_ms_range,
+                             first_msg_ids: list[int]):
+    """
+    Generates the time grids of a shard of senders and writes their traffic configuration files (in a worker process
+    or, for a single shard, in the process of the pattern). Each sender draws from its own random stream (derived from
+    entropy and the index of the sender), so the result does not depend on the number of shards.
+    :param pattern: pattern (in worker processes a copy of the pattern without communication graph).
+    :param entropy: entropy of the random streams of the senders.
+    :param sender_indices: indices of the senders among all senders.
+    :return: traffic configurations and config writers of the shard (by sender).
+    """
+    rng = pattern.rng
+    for i, sender, receivers, packet_size_bytes, first_msg_id in zip(
+            sender_indices, senders, receivers_per_sender, packet_sizes_bytes, first_msg_ids):
+        pattern.rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(i,)))
+        pattern.generate_time_grids([sender], [receivers], times_send_ms, [packet_size_bytes], expect_reply,
+                                    reply_after_ms_range, [first_msg_id])
+    pattern.rng = rng
+    return pattern.traffic_configurations, pattern.config_writers
 
 
 class AgentCommunicationPattern(ABC):
@@ -83,7 +152,7 @@ class AgentCommunicationPattern(ABC):
                  frequency_ms: int,
                  data_size_generator: DataSizeGenerator,
                  communication_mode: CommunicationMode):
-        directory = 'omnet_project_files/modules/traffic_configurations/'
+        directory = TRAFFIC_CONFIGURATION_DIRECTORY
         try:
             for filename in os.listdir(directory):
                 file_path = os.path.join(directory, filename)
@@ -102,6 +171,29 @@ class AgentCommunicationPattern(ABC):
         self.message_id_counter = 0
         self.traffic_configurations = {}
 
+        self.rng = np.random.default_rng()
+        # arrival process of event-triggered communication with multiple events, uniform gaps if not set
+        self.arrival_process = None
+        # write periodic traffic as stream rules instead of single messages
+        self.use_stream_rules = False
+        # streaming mode: if set, time-triggered traffic is generated in slices of window_ms and written to file
+        # slice by slice, configurations are not kept in memory but read back from file
+        self.window_ms = None
+        self.config_writers = {}
+        # directory of the traffic configuration files, set to the run directory for concurrent runs
+        self.traffic_configuration_directory = TRAFFIC_CONFIGURATION_DIRECTORY
+        # if not set, configurations are only kept in memory (e.g. for patterns of a composite pattern)
+        self.write_config_files = True
+        # write all configurations into one binary bundle (see traffic_bundle.py) instead of one json file per agent
+        self.use_traffic_bundle = False
+        # margin after the end of the traffic until the simulation is stopped (see get_sim_time_limit_ms)
+        self.drain_margin_ms = DEFAULT_DRAIN_MARGIN_MS
+        # number of processes for the generation of time grids, senders are split into shards
+        self.num_workers = 1
+        # variants (see create_variant): pattern whose messages are reused and reply delay range to redraw
+        self.skeleton = None
+        self.variant_reply_after_range = None
+
     @abstractmethod
     def generate_traffic_configuration_files(self):
         """
@@ -109,20 +201,184 @@ class AgentCommunicationPattern(ABC):
         """
         pass
 
-    def get_inputs(self):
+    def create_variant(self, data_size_generator=None, reply_after_range=None):
+        """
+        Creates a variant of the pattern that reuses senders, receivers, sending times and message ids of this pattern
+        (the skeleton) and only redraws the packet sizes and/or the reply delays.
+        The skeleton is generated once, when the first variant generates its traffic configuration files.
+        Packet sizes are redrawn per message (per stream rule for stream rules). Reply delays do not shift later
+        sending times, so reply delay variants are only exact for patterns whose sending times do not depend on the
+        reply delay range (e.g. DemandResponse).
+        :param data_size_generator: data size generator of the variant, packet sizes are kept if None.
+        :param reply_after_range: range of reply delays of the variant, reply delays are kept if None.
+        :return: pattern of the same class, to be used in its own CommunicationScenarioDescription.
+        """
+        if self.window_ms:
+            raise ValueError('Variants are not supported in streaming mode.')
+        skeleton = self.skeleton if self.skeleton is not None else self
+        variant = copy.copy(skeleton)
+        variant.skeleton = skeleton
+        variant.traffic_configurations = {}
+        variant.config_writers = {}
+        if data_size_generator is not None:
+            variant.data_size_generator = data_size_generator
+        variant.variant_reply_after_range = reply_after_range
+        return variant
+
+    def create_variants(self, data_size_generators=None, reply_after_ranges=None) -> dict:
+        """
+        Creates one variant (see create_variant) per combination of data size generator and reply delay range.
+        :param data_size_generators: dict of name and data size generator (e.g. data_size_generators in
+        simulation_run_variables.py), packet sizes are kept if None.
+        :param reply_after_ranges: dict of name and reply delay range (e.g. complexities), reply delays are kept if
+        None.
+        :return: dict of (data size generator name, reply delay range name) and variant.
+        """
+        data_size_generators = data_size_generators if data_size_generators is not None else {None: None}
+        reply_after_ranges = reply_after_ranges if reply_after_ranges is not None else {None: None}
+        return {(size_name, reply_name): self.create_variant(data_size_generator, reply_after_range)
+                for size_name, data_size_generator in data_size_generators.items()
+                for reply_name, reply_after_range in reply_after_ranges.items()}
+
+    def generate_variant_traffic_configuration_files(self):
+        """
+        Generates the traffic configuration files of a variant from the configurations of its skeleton.
+        Packet size and reply delay columns are replaced in one vectorized draw per sender.
+        """
+        skeleton = self.skeleton
+        if len(skeleton.traffic_configurations) == 0:
+            skeleton.generate_traffic_configuration_files()
+        redraw_sizes = self.data_size_generator is not skeleton.data_size_generator
+        for skeleton_config in skeleton.traffic_configurations.values():
+            config = skeleton_config.copy()
+            if redraw_sizes:
+                num_messages = len(config.get_column('msgId'))
+                config.set_column('packetSize_B', self.data_size_generator.get_data_sizes(num_messages))
+            if self.variant_reply_after_range is not None:
+                reply = config.get_column('reply')
+                reply_after_ms = np.zeros(len(reply), dtype=np.int64)
+                reply_after_ms[reply] = self.rng.integers(self.variant_reply_after_range[0],
+                                                          self.variant_reply_after_range[1],
+                                                          endpoint=True, size=int(reply.sum()))
+                config.set_column('replyAfter_ms', reply_after_ms)
+            for rule in config.stream_rules:
+                if redraw_sizes:
+                    packet_size_bytes = self.data_size_generator.get_data_size()
+                    rule.packet_size_range_bytes = (packet_size_bytes, packet_size_bytes)
+                if self.variant_reply_after_range is not None and rule.reply:
+                    rule.reply_after_ms_range = tuple(self.variant_reply_after_range)
+                    rule.seed = int(self.rng.integers(2 ** 63))
+            self.save_config(config)
+
+    def get_inputs(self, chunk_size=None):
         """
         Get inputs (traffic configuration) as pandas DataFrame.
-        :return: DataFrame.
+        :param chunk_size: if set, an iterator of DataFrames with at most chunk_size messages is returned instead.
+        :return: DataFrame (or iterator of DataFrames).
         """
-        dfs = []
-        for client, data in self.traffic_configurations.items():
-            df = pd.DataFrame(data['messageList'])
-            df['sender'] = client
-            dfs.append(df)
+        if chunk_size is not None:
+            return self.iter_inputs(chunk_size)
+        if self.window_ms:
+            dfs = list(self.iter_inputs())
+        else:
+            dfs = [config.to_dataframe() for config in self.traffic_configurations.values()]
         if len(dfs) == 0:
             return None
         return pd.concat(dfs)
 
+    def iter_inputs(self, chunk_size=100000):
+        """
+        Iterates over inputs (traffic configuration) in chunks. In streaming mode, the inputs are read back from the
+        written traffic configuration files.
+        :param chunk_size: maximal number of messages per chunk.
+        :return: iterator of DataFrames.
+        """
+        if self.window_ms:
+            for writer in self.config_writers.values():
+                yield from read_traffic_configuration_chunks(writer.file_path, chunk_size)
+            return
+        for config in self.traffic_configurations.values():
+            df = config.to_dataframe()
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size]
+
+    def get_active_agent_names(self) -> set[str]:
+        """
+        Gets agents that send or receive at least one message.
+        In streaming mode, the written traffic configuration files are read back.
+        :return: set of omnet names.
+        """
+        active_agent_names = set()
+        if self.window_ms:
+            for df in self.iter_inputs():
+                active_agent_names.update(df['sender'].unique().tolist())
+                active_agent_names.update(df['receiver'].unique().tolist())
+            return active_agent_names
+        for config in self.traffic_configurations.values():
+            if len(config) == 0:
+                continue
+            active_agent_names.add(config.sender)
+            active_agent_names.update(receiver.omnet_name for receiver in config.receivers)
+        return active_agent_names
+
+    def get_traffic_end_ms(self) -> int:
+        """
+        Gets the latest point in time at which a message or a reply is sent (last sending time plus reply delay).
+        In streaming mode, the written traffic configuration files are read back.
+        :return: end of traffic in ms, -1 if there is no traffic.
+        """
+        if self.window_ms:
+            end_time_ms = -1
+            for df in self.iter_inputs():
+                if len(df) == 0:
+                    continue
+                times_send_ms = df['timeSend_ms']
+                if 'replyAfter_ms' in df.columns:
+                    times_send_ms = times_send_ms + df['replyAfter_ms'].fillna(0)
+                end_time_ms = max(end_time_ms, int(times_send_ms.max()))
+            return end_time_ms
+        return max((config.get_end_time_ms() for config in self.traffic_configurations.values()), default=-1)
+
+    def get_sim_time_limit_ms(self) -> int:
+        """
+        Gets the simulation time limit: end of traffic plus drain margin, at most the simulation duration.
+        :return: simulation time limit in ms.
+        """
+        return min(max(self.get_traffic_end_ms(), 0) + self.drain_margin_ms, self.simulation_duration_ms)
+
+    def set_rng(self, rng: np.random.Generator):
+        """
+        Sets random number generator, e.g. a child stream of the scenario seed.
+        :param rng: random number generator.
+        """
+        self.rng = rng
+
+    def random_int(self, low: int, high: int) -> int:
+        """
+        Draws integer from [low, high] (including both bounds) like random.randint.
+        """
+        return int(self.rng.integers(low, high, endpoint=True))
+
+    def random_float(self) -> float:
+        """
+        Draws float from [0, 1) like random.random.
+        """
+        return float(self.rng.random())
+
+    def random_sample(self, population: list, k: int) -> list:
+        """
+        Samples k distinct elements like random.sample.
+        """
+        return [population[i] for i in self.rng.choice(len(population), size=k, replace=False).tolist()]
+
+    def random_choice(self, population: list):
+        """
+        Chooses one element like random.choice.
+        """
+        if len(population) == 0:
+            raise IndexError('Cannot choose from an empty sequence')
+        return population[int(self.rng.integers(len(population)))]
+
     def get_control_center_agent(self):
         control_center_agents = (
             self.communication_graph.get_agents_by_type(CentralAgent.CentralAgentType.CONTROL_CENTER_AGENT))
@@ -160,54 +416,358 @@ class AgentCommunicationPattern(ABC):
         return grid_operator_agents[0]
 
     def add_message_to_config(self,
-                              config: dict,
+                              config: TrafficConfiguration,
                               time_send_ms: int,
                               receiver: Agent,
                               packet_size_bytes: int,
                               expect_reply=False,
                               reply_after_ms_range=(0, 0)
                               ):
-        new_msg = {
-            "msgId": self.message_id_counter,
-            "timeSend_ms": time_send_ms,
-            "receiver": receiver.omnet_name,
-            "receiverPort": receiver.omnet_port,
-            "packetSize_B": packet_size_bytes
-        }
+        reply_after_ms = 0
         if expect_reply:
-            new_msg['reply'] = True
-            new_msg['replyAfter_ms'] = random.randint(reply_after_ms_range[0],
-                                                      reply_after_ms_range[1])
-        config['messageList'].append(new_msg)
+            reply_after_ms = self.random_int(reply_after_ms_range[0],
+                                            reply_after_ms_range[1])
+        config.add_message(msg_id=self.message_id_counter,
+                           time_send_ms=time_send_ms,
+                           receiver=receiver,
+                           packet_size_bytes=packet_size_bytes,
+                           reply=expect_reply,
+                           reply_after_ms=reply_after_ms)
         self.message_id_counter += 1
         return config
 
+    def add_time_grid_to_config(self,
+                                config: TrafficConfiguration,
+                                times_send_ms,
+                                receivers: list[Agent],
+                                packet_size_bytes: int,
+                                expect_reply=False,
+                                reply_after_ms_range=(0, 0),
+                                first_msg_id=None):
+        """
+        Adds one message per pair of sending time and receiver in one batch.
+        Messages are ordered by sending time and then by receiver, message ids are assigned in this order.
+        If use_stream_rules is set and the sending times are periodic, one stream rule per receiver is added instead.
+        :param config: traffic configuration of sender.
+        :param times_send_ms: sending times.
+        :param receivers: receivers of each sending time.
+        :param packet_size_bytes: packet size of the messages, either one size or one size per message.
+        :param expect_reply: whether the receivers reply.
+        :param reply_after_ms_range: range of reply delays.
+        :param first_msg_id: id of the first message, if the ids are reserved already (the message id counter is not
+        advanced then).
+        :return: traffic configuration.
+        """
+        times_send_ms = np.asarray(times_send_ms, dtype=np.int64)
+        if first_msg_id is None:
+            first_msg_id = self.message_id_counter
+            self.message_id_counter += len(times_send_ms) * len(receivers)
+        if self.use_stream_rules and np.ndim(packet_size_bytes) == 0 and is_periodic(times_send_ms):
+            return self.add_stream_rules_to_config(config, times_send_ms, receivers, packet_size_bytes,
+                                                   expect_reply, reply_after_ms_range, first_msg_id)
+        receiver_codes = np.array([config.encode_receiver(receiver) for receiver in receivers], dtype=np.int32)
+        times_grid, receiver_grid = np.broadcast_arrays(times_send_ms[:, np.newaxis], receiver_codes[np.newaxis, :])
+        num_messages = times_grid.size
+
+        reply_after_ms = 0
+        if expect_reply:
+            reply_after_ms = self.rng.integers(reply_after_ms_range[0], reply_after_ms_range[1],
+                                               endpoint=True, size=num_messages)
+        config.add_messages(msg_ids=first_msg_id + np.arange(num_messages),
+                            times_send_ms=times_grid.ravel(),
+                            receiver_codes=receiver_grid.ravel(),
+                            packet_sizes_bytes=packet_size_bytes,
+                            reply=expect_reply,
+                            reply_after_ms=reply_after_ms)
+        return config
+
+    def add_stream_rules_to_config(self,
+                                   config: TrafficConfiguration,
+                                   times_send_ms: np.ndarray,
+                                   receivers: list[Agent],
+                                   packet_size_bytes: int,
+                                   expect_reply=False,
+                                   reply_after_ms_range=(0, 0),
+                                   first_msg_id=0):
+        """
+        Adds one stream rule per receiver for periodic sending times. Message ids are the same as in
+        add_time_grid_to_config, reply delays are derived from a seed per rule.
+        :param config: traffic configuration of sender.
+        :param times_send_ms: periodic sending times.
+        :param receivers: receivers of each sending time.
+        :param packet_size_bytes: packet size of the messages.
+        :param expect_reply: whether the receivers reply.
+        :param reply_after_ms_range: range of reply delays.
+        :param first_msg_id: id of the first message.
+        :return: traffic configuration.
+        """
+        num_times = len(times_send_ms)
+        if num_times == 0 or len(receivers) == 0:
+            return config
+        period_ms = int(times_send_ms[1] - times_send_ms[0]) if num_times > 1 else 0
+        for i, receiver in enumerate(receivers):
+            config.add_stream_rule(StreamRule(receiver=receiver,
+                                              start_ms=int(times_send_ms[0]),
+                                              period_ms=period_ms,
+                                              count=num_times,
+                                              first_msg_id=first_msg_id + i,
+                                              msg_id_stride=len(receivers),
+                                              packet_size_range_bytes=(int(packet_size_bytes), int(packet_size_bytes)),
+                                              reply=expect_reply,
+                                              reply_after_ms_range=tuple(reply_after_ms_range),
+                                              seed=int(self.rng.integers(2 ** 63))))
+        return config
+
+    def add_time_grids_for_senders(self,
+                                   senders: list[Agent],
+                                   receivers_per_sender: list,
+                                   times_send_ms: np.ndarray,
+                                   packet_sizes_bytes: list[int],
+                                   expect_reply=False,
+                                   reply_after_ms_range=(0, 0)):
+        """
+        Adds time grids (see add_time_grid_to_config) for several senders and saves their configurations.
+        Message ids are reserved per sender in the order of the senders. If num_workers is greater than 1, the senders
+        are split into shards that are generated in parallel processes (see generate_time_grid_shard).
+        :param senders: sending agents.
+        :param receivers_per_sender: receivers of each sender.
+        :param times_send_ms: sending times.
+        :param packet_sizes_bytes: packet size of each sender.
+        :param expect_reply: whether the receivers reply.
+        :param reply_after_ms_range: range of reply delays.
+        """
+        num_messages = np.array([len(times_send_ms) * len(receivers) for receivers in receivers_per_sender],
+                                dtype=np.int64)
+        first_msg_ids = (self.message_id_counter + np.cumsum(num_messages) - num_messages).tolist()
+        self.message_id_counter += int(num_messages.sum())
+
+        # drawn for any number of shards, so the random streams of the senders and all later draws of the pattern do
+        # not depend on the number of shards
+        entropy = int(self.rng.integers(2 ** 63))
+        num_shards = min(self.num_workers, len(senders))
+        if num_shards <= 1:
+            generate_time_grid_shard(self, entropy, list(range(len(senders))), senders, receivers_per_sender,
+                                     times_send_ms, packet_sizes_bytes, expect_reply, reply_after_ms_range,
+                                     first_msg_ids)
+            return
+
+        # shards get a copy of the pattern without graph and configurations
+        shard_pattern = copy.copy(self)
+        shard_pattern.communication_graph = None
+        shard_pattern.skeleton = None
+        shard_pattern.traffic_configurations = {}
+        shard_pattern.config_writers = {}
+        shards = np.array_split(np.arange(len(senders)), num_shards)
+        with ProcessPoolExecutor(max_workers=num_shards) as executor:
+            futures = [executor.submit(generate_time_grid_shard, shard_pattern, entropy, shard.tolist(),
+                                       [senders[i] for i in shard], [receivers_per_sender[i] for i in shard],
+                                       times_send_ms, [packet_sizes_bytes[i] for i in shard], expect_reply,
+                                       reply_after_ms_range, [first_msg_ids[i] for i in shard])
+                       for shard in shards]
+            for future in futures:
+                traffic_configurations, config_writers = future.result()
+                self.traffic_configurations.update(traffic_configurations)
+                self.config_writers.update(config_writers)
+
+    def generate_time_grids(self,
+                            senders: list[Agent],
+                            receivers_per_sender: list,
+                            times_send_ms: np.ndarray,
+                            packet_sizes_bytes: list[int],
+                            expect_reply,
+                            reply_after_ms_range,
+                            first_msg_ids: list[int]):
+        """
+        Generates and saves the time grids of senders with reserved message ids.
+        In streaming mode, the grids are generated in slices of window_ms and every slice is appended to the files
+        of the senders right away. Message ids are the same in both modes.
+        """
+        if not self.window_ms:
+            for sender, receivers, packet_size_bytes, first_msg_id in zip(
+                    senders, receivers_per_sender, packet_sizes_bytes, first_msg_ids):
+                config = get_initial_config(sender)
+                config = self.add_time_grid_to_config(config, times_send_ms=times_send_ms, receivers=receivers,
+                                                      packet_size_bytes=packet_size_bytes, expect_reply=expect_reply,
+                                                      reply_after_ms_range=reply_after_ms_range,
+                                                      first_msg_id=first_msg_id)
+                self.save_config(config)
+            return
+
+        writers = [self.get_config_writer(sender) for sender in senders]
+        # sending times at or after the end of the simulation are kept, as in non-streaming mode
+        end_ms = max(self.simulation_duration_ms, int(times_send_ms.max()) + 1 if len(times_send_ms) > 0 else 0)
+        for window_start_ms in range(0, end_ms, self.window_ms):
+            first, last = np.searchsorted(times_send_ms, [window_start_ms, window_start_ms + self.window_ms])
+            if first == last:
+                continue
+            for sender, receivers, packet_size_bytes, first_msg_id, writer in zip(
+                    senders, receivers_per_sender, packet_sizes_bytes, first_msg_ids, writers):
+                config = get_initial_config(sender)
+                config = self.add_time_grid_to_config(config, times_send_ms=times_send_ms[first:last],
+                                                      receivers=receivers, packet_size_bytes=packet_size_bytes,
+                                                      expect_reply=expect_reply,
+                                                      reply_after_ms_range=reply_after_ms_range,
+                                                      first_msg_id=first_msg_id + first * len(receivers))
+                writer.append(config)
+        for writer in writers:
+            writer.close()
+
+    def add_negotiation_rounds(self,
+                               agent_configs: dict,
+                               senders: list[Agent],
+                               participants: list[Agent],
+                               round_times_send_ms,
+                               time_offset_ms_range=None,
+                               expect_reply=False,
+                               reply_after_ms_range=(0, 0)):
+        """
+        Adds negotiation rounds: in each round, every sender sends one message to each of its neighbors that is a
+        participant. Neighborhoods are filtered once with a mask over node ids and all messages of a sender are added
+        in one batch, so the effort is linear in the number of messages.
+        Message ids are assigned round by round, in the order of the senders and their neighbors.
+        :param agent_configs: dict of agent and traffic configuration, configurations of senders are added if missing.
+        :param senders: sending agents in the order of sending (e.g. get_flooding_order of the communication graph).
+        :param participants: agents that may receive negotiation messages.
+        :param round_times_send_ms: sending time of each round.
+        :param time_offset_ms_range: if set, a random offset from this range is added to the sending time of each
+        message.
+        :param expect_reply: whether the receivers reply.
+        :param reply_after_ms_range: range of reply delays.
+        :return: dict of agent and traffic configuration.
+        """
+        graph = self.communication_graph
+        allowed = graph.get_node_mask(participants)
+        receivers_per_sender = []
+        for sender in senders:
+            neighbor_nodes = graph.get_neighbor_nodes(graph.get_node(sender))
+            receivers_per_sender.append([graph.node_agent_mapping[node]
+                                         for node in neighbor_nodes[allowed[neighbor_nodes]].tolist()])
+        num_receivers = np.array([len(receivers) for receivers in receivers_per_sender], dtype=np.int64)
+        messages_per_round = int(num_receivers.sum())
+        round_times_send_ms = np.asarray(round_times_send_ms, dtype=np.int64)
+        num_rounds = len(round_times_send_ms)
+        num_messages = num_rounds * messages_per_round
+        if num_messages == 0:
+            return agent_configs
+
+        # one row per round, one column per message of a round
+        msg_ids = (self.message_id_counter + np.arange(num_messages)).reshape(num_rounds, messages_per_round)
+        self.message_id_counter += num_messages
+        packet_sizes = self.data_size_generator.get_data_sizes(num_messages).reshape(num_rounds, messages_per_round)
+        times_send_ms = np.broadcast_to(round_times_send_ms[:, np.newaxis], (num_rounds, messages_per_round))
+        if time_offset_ms_range is not None:
+            times_send_ms = times_send_ms + self.rng.integers(time_offset_ms_range[0], time_offset_ms_range[1],
+                                                              endpoint=True, size=times_send_ms.shape)
+        reply_after_ms = np.zeros((num_rounds, messages_per_round), dtype=np.int64)
+        if expect_reply:
+            reply_after_ms = self.rng.integers(reply_after_ms_range[0], reply_after_ms_range[1],
+                                               endpoint=True, size=reply_after_ms.shape)
+
+        first_columns = np.cumsum(num_receivers) - num_receivers
+        for sender, receivers, first_column, k in zip(senders, receivers_per_sender, first_columns.tolist(),
+                                                      num_receivers.tolist()):
+            if k == 0:
+                continue
+            config = agent_configs.get(sender)
+            if config is None:
+                config = agent_configs[sender] = get_initial_config(sender)
+            receiver_codes = np.array([config.encode_receiver(receiver) for receiver in receivers], dtype=np.int32)
+            columns = slice(first_column, first_column + k)
+            config.add_messages(msg_ids=msg_ids[:, columns].ravel(),
+                                times_send_ms=times_send_ms[:, columns].ravel(),
+                                receiver_codes=np.tile(receiver_codes, num_rounds),
+                                packet_sizes_bytes=packet_sizes[:, columns].ravel(),
+                                reply=expect_reply,
+                                reply_after_ms=reply_after_ms[:, columns].ravel())
+        return agent_configs
+
+    def get_time_triggered_sending_times(self) -> np.ndarray:
+        """
+        Gets sending times of time-triggered communication (every frequency_ms until the end of the simulation).
+        :return: array of sending times.
+        """
+        if self.frequency_ms <= 0:
+            raise ValueError('Time-triggered communication requires a positive frequency.')
+        return np.arange(self.frequency_ms, self.simulation_duration_ms, self.frequency_ms, dtype=np.int64)
+
+    def set_arrival_process(self, arrival_process: ArrivalProcess):
+        """
+        Sets arrival process of event-triggered communication and the according trigger type.
+        :param arrival_process: arrival process.
+        """
+        self.arrival_process = arrival_process
+        self.trigger = ARRIVAL_PROCESS_TRIGGER_TYPES.get(type(arrival_process), TriggerType.EVENT_TRIGGERED)
+
+    def get_event_triggered_sending_times(self, event_frequency_range=(0, 0)) -> np.ndarray:
+        """
+        Gets sending times of multiple events until the end of the simulation.
+        :param event_frequency_range: range of the uniform time between events, if no arrival process is set.
+        :return: array of sending times.
+        """
+        arrival_process = self.arrival_process
+        if arrival_process is None:
+            arrival_process = UniformArrivalProcess(event_frequency_range[0], event_frequency_range[1])
+        return arrival_process.get_arrival_times(self.simulation_duration_ms, self.rng)
+
+    def save_config(self, config: TrafficConfiguration):
+        """
+        Writes traffic configuration of a sender to file and keeps it as input of the scenario.
+        In streaming mode, the configuration is only written.
+        :param config: traffic configuration.
+        """
+        if self.window_ms:
+            writer = self.get_config_writer(config.sender)
+            writer.append(config)
+            writer.close()
+            return
+        if self.write_config_files and not self.use_traffic_bundle:
+            write_config_to_file(config.sender, config, self.traffic_configuration_directory)
+        self.traffic_configurations[config.sender] = config
+
+    def write_traffic_bundle(self) -> str:
+        """
+        Writes the traffic configurations of all senders into one binary bundle.
+        :return: path of the bundle relative to the OMNeT++ project or run directory (value of the TrafficApp
+        parameter trafficBundlePath).
+        """
+        if self.window_ms:
+            raise ValueError('Traffic bundles are not supported in streaming mode.')
+        directory = os.path.normpath(self.traffic_configuration_directory)
+        os.makedirs(directory, exist_ok=True)
+        write_traffic_bundle(os.path.join(directory, TRAFFIC_BUNDLE_FILE_NAME),
+                             list(self.traffic_configurations.values()))
+        # configurations are located in modules/traffic_configurations of the project
+        return os.path.relpath(os.path.join(directory, TRAFFIC_BUNDLE_FILE_NAME),
+                               os.path.dirname(os.path.dirname(directory)))
+
+    def get_config_writer(self, sender) -> TrafficConfigurationWriter:
+        """
+        Creates writer for the traffic configuration file of a sender (an existing file is overwritten).
+        :param sender: sending agent or its omnet name.
+        :return: writer.
+        """
+        sender_name = sender.omnet_name if isinstance(sender, Agent) else sender
+        os.makedirs(self.traffic_configuration_directory, exist_ok=True)
+        writer = TrafficConfigurationWriter(get_config_file_path(self.traffic_configuration_directory, sender_name),
+                                            sender_name)
+        self.config_writers[sender_name] = writer
+        return writer
+
     def fill_config_for_non_sending_agents(self):
         non_sending_agents = [agent for agent in self.communication_graph.agents
-                              if agent.omnet_name not in self.traffic_configurations.keys()]
+                              if agent.omnet_name not in self.traffic_configurations.keys()
+                              and agent.omnet_name not in self.config_writers.keys()]
         for agent in non_sending_agents:
-            config = {
-                "sender": agent.omnet_name,
-                "messageList": []
-            }
-            write_config_to_file(agent.omnet_name, config)
-            self.traffic_configurations[agent.omnet_name] = config
+            config = get_initial_config(agent)
+            self.save_config(config)
 
     def generate_to_neighbor_communication(self,
                                            agents: list[Agent]):
-        for agent in agents:
-            config = get_initial_config(agent)
-            data_size = self.data_size_generator.get_data_size()
-            current_time = self.frequency_ms
-            while current_time < self.simulation_duration_ms:
-                neighbors = self.communication_graph.get_neighbors(agent)
-                assert all(isinstance(neighbor, Agent) for neighbor in neighbors)
-                for receiver in neighbors:
-                    config = self.add_message_to_config(config, time_send_ms=current_time, receiver=receiver,
-                                                        packet_size_bytes=data_size)
-                current_time += self.frequency_ms
-            write_config_to_file(agent.omnet_name, config)
-            self.traffic_configurations[agent.omnet_name] = config
+        sending_times = self.get_time_triggered_sending_times()
+        data_sizes = self.data_size_generator.get_data_sizes(len(agents)).tolist()
+        neighbors_per_agent = [self.communication_graph.get_neighbors(agent) for agent in agents]
+        assert all(isinstance(neighbor, Agent) for neighbors in neighbors_per_agent for neighbor in neighbors)
+        self.add_time_grids_for_senders(agents, neighbors_per_agent, sending_times, data_sizes)
         self.fill_config_for_non_sending_agents()
 
     def generate_many_to_one_communication(self,
@@ -215,31 +775,13 @@ class AgentCommunicationPattern(ABC):
                                            many: list[Agent],
                                            send_only_once=False
                                            ):
-        send_time = random.randint(0, self.simulation_duration_ms)
+        send_time = self.random_int(0, self.simulation_duration_ms)
+        sending_times = np.array([send_time]) if send_only_once else self.get_time_triggered_sending_times()
 
-        for agent in many:
-            config = {
-                "sender": agent.omnet_name,
-                "messageList": []
-            }
-            data_size = self.data_size_generator.get_data_size()
-            if not send_only_once:
-                current_time = self.frequency_ms
-                while current_time < self.simulation_duration_ms:
-                    neighbors = self.communication_graph.get_neighbors(agent)
-                    assert all(isinstance(neighbor, Agent) for neighbor in neighbors)
-                    for receiver in neighbors:
-                        config = self.add_message_to_config(config, time_send_ms=current_time, receiver=receiver,
-                                                            packet_size_bytes=data_size)
-                    current_time += self.frequency_ms
-            else:
-                neighbors = self.communication_graph.get_neighbors(agent)
-                assert all(isinstance(neighbor, Agent) for neighbor in neighbors)
-                for receiver in neighbors:
-                    config = self.add_message_to_config(config, time_send_ms=send_time, receiver=receiver,
-                                                        packet_size_bytes=data_size)
-            write_config_to_file(agent.omnet_name, config)
-            self.traffic_configurations[agent.omnet_name] = config
+        data_sizes = self.data_size_generator.get_data_sizes(len(many)).tolist()
+        neighbors_per_agent = [self.communication_graph.get_neighbors(agent) for agent in many]
+        assert all(isinstance(neighbor, Agent) for neighbors in neighbors_per_agent for neighbor in neighbors)
+        self.add_time_grids_for_senders(many, neighbors_per_agent, sending_times, data_sizes)
         self.fill_config_for_non_sending_agents()
 
     def generate_event_triggered_communication(self,
@@ -250,22 +792,12 @@ class AgentCommunicationPattern(ABC):
                                                send_time=0,
                                                expect_reply=False,
                                                reply_after_range=(0, 0)):
-        config = {
-            "sender": one.omnet_name,
-            "messageList": []
-        }
+        config = get_initial_config(one)
         data_size = self.data_size_generator.get_data_size()
         neighbors = self.communication_graph.get_neighbors(one)
         assert all(isinstance(neighbor, Agent) for neighbor in neighbors)
         if multiple_events:
-            sending_times = []
-            new_sending_time = 0
-            while True:
-                new_sending_time += random.randint(event_frequency_range[0], event_frequency_range[1])
-                if new_sending_time < self.simulation_duration_ms:
-                    sending_times.append(new_sending_time)
-                else:
-                    break
+            sending_times = self.get_event_triggered_sending_times(event_frequency_range).tolist()
         else:
             sending_times = [send_time]
         for s_time in sending_times:
@@ -274,17 +806,16 @@ class AgentCommunicationPattern(ABC):
                 possible_receivers = neighbors
             elif self.communication_mode == CommunicationMode.MULTICAST:
                 # sample half of the neighbors as receiver of multicast
-                possible_receivers = random.sample(neighbors, int(len(neighbors) / 2))
+                possible_receivers = self.random_sample(neighbors, int(len(neighbors) / 2))
             elif self.communication_mode == CommunicationMode.UNICAST:
-                possible_receivers = random.sample(many, 1)
+                possible_receivers = self.random_sample(many, 1)
 
             for receiver in possible_receivers:
                 if receiver in many:
                     config = self.add_message_to_config(config, time_send_ms=s_time, receiver=receiver,
                                                         packet_size_bytes=data_size, expect_reply=expect_reply,
                                                         reply_after_ms_range=reply_after_range)
-        write_config_to_file(one.omnet_name, config)
-        self.traffic_configurations[one.omnet_name] = config
+        self.save_config(config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -294,20 +825,9 @@ class AgentCommunicationPattern(ABC):
                                                         expect_reply=False,
                                                         reply_after_range=(0, 0)
                                                         ):
-        config = {
-            "sender": one.omnet_name,
-            "messageList": []
-        }
         data_size = self.data_size_generator.get_data_size()
-        current_time = self.frequency_ms
-        while current_time < self.simulation_duration_ms:
-            for receiver in many:
-                config = self.add_message_to_config(config, time_send_ms=current_time, receiver=receiver,
-                                                    packet_size_bytes=data_size, expect_reply=expect_reply,
-                                                    reply_after_ms_range=reply_after_range)
-            current_time += self.frequency_ms
-        write_config_to_file(one.omnet_name, config)
-        self.traffic_configurations[one.omnet_name] = config
+        self.add_time_grids_for_senders([one], [many], self.get_time_triggered_sending_times(), [data_size],
+                                        expect_reply=expect_reply, reply_after_ms_range=reply_after_range)
 
         self.fill_config_for_non_sending_agents()
 
@@ -392,31 +912,24 @@ class AddNewAgent(ComplexAgentCommunicationPattern):
             raise ValueError('More than one control agent.')
         control_center_agent = control_center_agents[0]
 
-        cc_config = {
-            "sender": control_center_agent.omnet_name,
-            "messageList": []
-        }
+        cc_config = get_initial_config(control_center_agent)
 
         # get a subset of agents that are added to the network
         random_leaf_agents = leaf_agents if len(leaf_agents) < self.num_new_agents \
-            else random.sample(leaf_agents, self.num_new_agents)
+            else self.random_sample(leaf_agents, self.num_new_agents)
 
         # send request from leaf agent to control center agent
         for random_leaf_agent in random_leaf_agents:
-            config = {
-                "sender": random_leaf_agent.omnet_name,
-                "messageList": []
-            }
+            config = get_initial_config(random_leaf_agent)
 
-            send_time = random.randint(0, 100)  # in the first 100 ms
+            send_time = self.random_int(0, 100)  # in the first 100 ms
             data_size = self.data_size_generator.get_data_size()
 
             config = self.add_message_to_config(config, time_send_ms=send_time, receiver=control_center_agent,
                                                 packet_size_bytes=data_size, expect_reply=True,
                                                 reply_after_ms_range=self.reply_after_range)
 
-            write_config_to_file(random_leaf_agent.omnet_name, config)
-            self.traffic_configurations[random_leaf_agent.omnet_name] = config
+            self.save_config(config)
 
             # send information from control center agent to all leaf agents
             asserted_inform_time = send_time + self.reply_after_range[1]
@@ -427,8 +940,7 @@ class AddNewAgent(ComplexAgentCommunicationPattern):
                                                        receiver=leaf_agent,
                                                        packet_size_bytes=data_size, expect_reply=False)
 
-        write_config_to_file(control_center_agent.omnet_name, cc_config)
-        self.traffic_configurations[control_center_agent.omnet_name] = cc_config
+        self.save_config(cc_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -437,28 +949,21 @@ class AddNewAgent(ComplexAgentCommunicationPattern):
         control_center_agent = self.get_control_center_agent()
         aggregator_agent = self.get_aggregator_agent()
         random_leaf_agents = leaf_agents if len(leaf_agents) < self.num_new_agents \
-            else random.sample(leaf_agents, self.num_new_agents)
+            else self.random_sample(leaf_agents, self.num_new_agents)
 
-        a_config = {
-            "sender": aggregator_agent.omnet_name,
-            "messageList": []
-        }
+        a_config = get_initial_config(aggregator_agent)
 
         # send request from leaf agent to aggregator agent
         for random_leaf_agent in random_leaf_agents:
-            config = {
-                "sender": random_leaf_agent.omnet_name,
-                "messageList": []
-            }
+            config = get_initial_config(random_leaf_agent)
 
-            send_time = random.randint(0, 100)  # in the first 100 ms
+            send_time = self.random_int(0, 100)  # in the first 100 ms
             data_size = self.data_size_generator.get_data_size()
 
             config = self.add_message_to_config(config, time_send_ms=send_time, receiver=aggregator_agent,
                                                 packet_size_bytes=data_size)
 
-            write_config_to_file(random_leaf_agent.omnet_name, config)
-            self.traffic_configurations[random_leaf_agent.omnet_name] = config
+            self.save_config(config)
 
             # send request from aggregator agent to control agent
 
@@ -479,8 +984,7 @@ class AddNewAgent(ComplexAgentCommunicationPattern):
                                                       receiver=leaf_agent,
                                                       packet_size_bytes=data_size, expect_reply=False)
 
-        write_config_to_file(aggregator_agent.omnet_name, a_config)
-        self.traffic_configurations[aggregator_agent.omnet_name] = a_config
+        self.save_config(a_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -495,13 +999,13 @@ class AddNewAgent(ComplexAgentCommunicationPattern):
         control_center_agent = control_center_agents[0]
 
         random_leaf_agents = leaf_agents if len(leaf_agents) < self.num_new_agents \
-            else random.sample(leaf_agents, self.num_new_agents)
+            else self.random_sample(leaf_agents, self.num_new_agents)
 
         for random_leaf_agent in random_leaf_agents:
             # send request from leaf agent to control center agent
             config = get_initial_config(random_leaf_agent)
 
-            send_time = random.randint(0, 100)  # in the first 100 ms
+            send_time = self.random_int(0, 100)  # in the first 100 ms
             data_size = self.data_size_generator.get_data_size()
 
             config = self.add_message_to_config(config, time_send_ms=send_time, receiver=control_center_agent,
@@ -518,8 +1022,7 @@ class AddNewAgent(ComplexAgentCommunicationPattern):
                                                     receiver=neighbor,
                                                     packet_size_bytes=data_size, expect_reply=False)
 
-            write_config_to_file(random_leaf_agent.omnet_name, config)
-            self.traffic_configurations[random_leaf_agent.omnet_name] = config
+            self.save_config(config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -540,11 +1043,11 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
         generator_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GENERATION_AGENT)
         if len(generator_agents) == 0:
             raise ValueError('No generator agents implemented.')
-        random_generator_agents = random.sample(generator_agents, 15) if len(generator_agents) > 15 \
+        random_generator_agents = self.random_sample(generator_agents, 15) if len(generator_agents) > 15 \
             else generator_agents
         control_center_agent = self.get_control_center_agent()
 
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
 
         cc_config = get_initial_config(control_center_agent)
 
@@ -559,10 +1062,9 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
                 expect_reply=True,
                 reply_after_ms_range=self.t_central_optimization_range
             )
-            write_config_to_file(random_generator_agent.omnet_name, gen_config)
-            self.traffic_configurations[random_generator_agent.omnet_name] = gen_config
+            self.save_config(gen_config)
             # if control center agent responds with agree: inform other leaf agents, generator agent sends confirm
-            if random.random() < self.p_agree_to_power_supply:
+            if self.random_float() < self.p_agree_to_power_supply:
                 # control center agent agrees to power supply
                 for leaf_agent in self.communication_graph.get_agents_by_class(LeafAgent):
                     if leaf_agent == random_generator_agent:
@@ -575,8 +1077,7 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
                         expect_reply=False,
                         reply_after_ms_range=(0, 100)
                     )
-        write_config_to_file(control_center_agent.omnet_name, cc_config)
-        self.traffic_configurations[control_center_agent.omnet_name] = cc_config
+        self.save_config(cc_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -586,10 +1087,10 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
         demand_supply_agents = (self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT) +
                                 self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GENERATION_AGENT) +
                                 self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.STORAGE_AGENT))
-        demand_supply_agents = random.sample(demand_supply_agents, 15) if len(demand_supply_agents) > 15 else demand_supply_agents
-        initial_neg_agent = random.choice(demand_supply_agents)
+        demand_supply_agents = self.random_sample(demand_supply_agents, 15) if len(demand_supply_agents) > 15 else demand_supply_agents
+        initial_neg_agent = self.random_choice(demand_supply_agents)
 
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
 
         # send request from control center agent to aggregator agent
         cc_config = get_initial_config(control_center_agent)
@@ -600,12 +1101,12 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
             packet_size_bytes=self.data_size_generator.get_data_size(),
             expect_reply=False
         )
-        time_send += random.randint(0, 100)
+        time_send += self.random_int(0, 100)
         # aggregator agent requests one of its leaf agents
         agg_config = get_initial_config(aggregator_agent)
         agg_config = self.add_message_to_config(
             config=agg_config,
-            time_send_ms=time_send + random.randint(0, 100),
+            time_send_ms=time_send + self.random_int(0, 100),
             receiver=initial_neg_agent,
             packet_size_bytes=self.data_size_generator.get_data_size(),
             expect_reply=False
@@ -615,7 +1116,7 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
 
         # while not terminated: leaf agent performs local optimization and sends message to its neighbors
         neg_time = 0
-        time_send_init = time_send + random.randint(self.t_central_optimization_range[0],
+        time_send_init = time_send + self.random_int(self.t_central_optimization_range[0],
                                                     self.t_central_optimization_range[1])
         for neighbor in self.communication_graph.get_neighbors(initial_neg_agent):
             # send initial neg message
@@ -626,26 +1127,19 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
                 packet_size_bytes=self.data_size_generator.get_data_size(),
                 expect_reply=False
             )
-        participants = [initial_neg_agent]
+        # participants: agents reached by flooding from the initial agent, all of them negotiate in every round
+        participants = self.communication_graph.get_flooding_order(initial_neg_agent, demand_supply_agents)
+        round_times_send_ms = []
         while neg_time < self.negotiation_duration_ms:
-            time_send += random.randint(self.t_central_optimization_range[0],
+            time_send += self.random_int(self.t_central_optimization_range[0],
                                         self.t_central_optimization_range[1])
             neg_time = time_send - time_send_init
-            for participant in participants:
-                for neighbor_of_participant in self.communication_graph.get_neighbors(participant):
-                    if neighbor_of_participant not in demand_supply_agents:
-                        continue
-                    agent_configs[participant] = self.add_message_to_config(
-                        config=agent_configs[participant],
-                        time_send_ms=time_send,
-                        receiver=neighbor_of_participant,
-                        packet_size_bytes=self.data_size_generator.get_data_size(),
-                        expect_reply=False
-                    )
-                    if neighbor_of_participant not in participants:
-                        participants.append(neighbor_of_participant)
+            round_times_send_ms.append(time_send)
+        agent_configs = self.add_negotiation_rounds(agent_configs, senders=participants,
+                                                    participants=demand_supply_agents,
+                                                    round_times_send_ms=round_times_send_ms)
 
-        time_send = neg_time + random.randint(self.t_central_optimization_range[0],
+        time_send = neg_time + self.random_int(self.t_central_optimization_range[0],
                                               self.t_central_optimization_range[1])
 
         # initial leaf agent sends solution back to aggregator
@@ -657,7 +1151,7 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
             expect_reply=False
         )
 
-        time_send += random.randint(self.t_central_optimization_range[0],
+        time_send += self.random_int(self.t_central_optimization_range[0],
                                     self.t_central_optimization_range[1])
 
         # aggregator forwards solution to control center agent
@@ -669,15 +1163,12 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
             expect_reply=False
         )
 
-        write_config_to_file(control_center_agent.omnet_name, cc_config)
-        self.traffic_configurations[control_center_agent.omnet_name] = cc_config
+        self.save_config(cc_config)
 
-        write_config_to_file(aggregator_agent.omnet_name, agg_config)
-        self.traffic_configurations[aggregator_agent.omnet_name] = agg_config
+        self.save_config(agg_config)
 
         for agent, agent_config in agent_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -686,11 +1177,11 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
         demand_supply_agents = (self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT) +
                                 self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GENERATION_AGENT) +
                                 self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.STORAGE_AGENT))
-        demand_supply_agents = random.sample(demand_supply_agents, 15) if len(demand_supply_agents) > 15 \
+        demand_supply_agents = self.random_sample(demand_supply_agents, 15) if len(demand_supply_agents) > 15 \
             else demand_supply_agents
-        initial_neg_agent = random.choice(demand_supply_agents)
+        initial_neg_agent = self.random_choice(demand_supply_agents)
 
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
 
         # send request from control center agent to initial negotiation agent
         cc_config = get_initial_config(control_center_agent)
@@ -706,7 +1197,7 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
 
         # while not terminated: leaf agent performs local optimization and sends message to its neighbors
         neg_time = 0
-        time_send_init = time_send + random.randint(self.t_central_optimization_range[0],
+        time_send_init = time_send + self.random_int(self.t_central_optimization_range[0],
                                                     self.t_central_optimization_range[1])
         for neighbor in self.communication_graph.get_neighbors(initial_neg_agent):
             # send initial neg message
@@ -717,26 +1208,19 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
                 packet_size_bytes=self.data_size_generator.get_data_size(),
                 expect_reply=False
             )
-        participants = [initial_neg_agent]
+        # participants: agents reached by flooding from the initial agent, all of them negotiate in every round
+        participants = self.communication_graph.get_flooding_order(initial_neg_agent, demand_supply_agents)
+        round_times_send_ms = []
         while neg_time < self.negotiation_duration_ms:
-            time_send += random.randint(self.t_central_optimization_range[0],
+            time_send += self.random_int(self.t_central_optimization_range[0],
                                         self.t_central_optimization_range[1])
             neg_time = time_send - time_send_init
-            for participant in participants:
-                for neighbor_of_participant in self.communication_graph.get_neighbors(participant):
-                    if neighbor_of_participant not in demand_supply_agents:
-                        continue
-                    agent_configs[participant] = self.add_message_to_config(
-                        config=agent_configs[participant],
-                        time_send_ms=time_send,
-                        receiver=neighbor_of_participant,
-                        packet_size_bytes=self.data_size_generator.get_data_size(),
-                        expect_reply=False
-                    )
-                    if neighbor_of_participant not in participants:
-                        participants.append(neighbor_of_participant)
+            round_times_send_ms.append(time_send)
+        agent_configs = self.add_negotiation_rounds(agent_configs, senders=participants,
+                                                    participants=demand_supply_agents,
+                                                    round_times_send_ms=round_times_send_ms)
 
-        time_send = neg_time + random.randint(self.t_central_optimization_range[0],
+        time_send = neg_time + self.random_int(self.t_central_optimization_range[0],
                                               self.t_central_optimization_range[1])
 
         # initial leaf agent sends solution back to control center agent
@@ -748,12 +1232,10 @@ class DemandSupplyBalancing(ComplexAgentCommunicationPattern):
             expect_reply=False
         )
 
-        write_config_to_file(control_center_agent.omnet_name, cc_config)
-        self.traffic_configurations[control_center_agent.omnet_name] = cc_config
+        self.save_config(cc_config)
 
         for agent, agent_config in agent_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -775,11 +1257,11 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                               self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GENERATION_AGENT) +
                               self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.STORAGE_AGENT))
 
-        participant_agents = random.sample(participant_agents, self.num_participant_agents) \
+        participant_agents = self.random_sample(participant_agents, self.num_participant_agents) \
             if len(participant_agents) > self.num_participant_agents else participant_agents
 
         # in interval:
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
         market_agent_config = get_initial_config(market_agent)
 
         while time_send < self.simulation_duration_ms:
@@ -793,8 +1275,7 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                                                expect_reply=True,
                                                reply_after_ms_range=self.t_local_optimization))
             time_send += self.market_interval_ms
-        write_config_to_file(market_agent.omnet_name, market_agent_config)
-        self.traffic_configurations[market_agent.omnet_name] = market_agent_config
+        self.save_config(market_agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -805,11 +1286,11 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                               self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GENERATION_AGENT) +
                               self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.STORAGE_AGENT))
 
-        participant_agents = random.sample(participant_agents, self.num_participant_agents) \
+        participant_agents = self.random_sample(participant_agents, self.num_participant_agents) \
             if len(participant_agents) > self.num_participant_agents else participant_agents
 
         # in interval:
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
         market_agent_config = get_initial_config(market_agent)
         aggregator_agent_config = get_initial_config(aggregator_agent)
 
@@ -821,10 +1302,10 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                                            receiver=aggregator_agent,
                                            packet_size_bytes=self.data_size_generator.get_data_size(),
                                            expect_reply=False))
-            time_send += random.randint(10, 100)
+            time_send += self.random_int(10, 100)
             # send random number of times message -> reply between aggregator and participants
             for _ in range(self.num_iterations_till_goal):
-                time_send += random.randint(10, 100)
+                time_send += self.random_int(10, 100)
                 for part_agent in participant_agents:
                     aggregator_agent_config = (
                         self.add_message_to_config(config=aggregator_agent_config,
@@ -834,7 +1315,7 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                                                    expect_reply=True,
                                                    reply_after_ms_range=self.t_local_optimization))
             # inform other participant agents
-            time_send += random.randint(10, 100)
+            time_send += self.random_int(10, 100)
             for part_agent in participant_agents:
                 aggregator_agent_config = (
                     self.add_message_to_config(config=aggregator_agent_config,
@@ -843,7 +1324,7 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                                                packet_size_bytes=self.data_size_generator.get_data_size(),
                                                expect_reply=False))
             # inform market agent
-            time_send += random.randint(10, 100)
+            time_send += self.random_int(10, 100)
             aggregator_agent_config = (
                 self.add_message_to_config(config=aggregator_agent_config,
                                            time_send_ms=time_send,
@@ -851,11 +1332,9 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                                            packet_size_bytes=self.data_size_generator.get_data_size(),
                                            expect_reply=False))
             time_send += self.market_interval_ms
-        write_config_to_file(market_agent.omnet_name, market_agent_config)
-        self.traffic_configurations[market_agent.omnet_name] = market_agent_config
+        self.save_config(market_agent_config)
 
-        write_config_to_file(aggregator_agent.omnet_name, aggregator_agent_config)
-        self.traffic_configurations[aggregator_agent.omnet_name] = aggregator_agent_config
+        self.save_config(aggregator_agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -864,13 +1343,13 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                               self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GENERATION_AGENT) +
                               self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.STORAGE_AGENT))
 
-        participant_agents = random.sample(participant_agents, self.num_participant_agents) \
+        participant_agents = self.random_sample(participant_agents, self.num_participant_agents) \
             if len(participant_agents) > self.num_participant_agents else participant_agents
 
-        random_initiator = random.choice(participant_agents)
+        random_initiator = self.random_choice(participant_agents)
         initiator_config = get_initial_config(random_initiator)
 
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
 
         for _ in range(self.num_iterations_till_goal):
             for neighbor in self.communication_graph.get_neighbors(random_initiator):
@@ -882,8 +1361,7 @@ class MarketParticipation(ComplexAgentCommunicationPattern):
                                                    packet_size_bytes=self.data_size_generator.get_data_size(),
                                                    expect_reply=True,
                                                    reply_after_ms_range=self.t_local_optimization))
-        write_config_to_file(random_initiator.omnet_name, initiator_config)
-        self.traffic_configurations[random_initiator.omnet_name] = initiator_config
+        self.save_config(initiator_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -903,10 +1381,10 @@ class VoltageRegulation(ComplexAgentCommunicationPattern):
                 self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GRID_INFRASTRUCTURE_AGENT) +
                 self.communication_graph.get_agents_by_type(AggregatorAgent.AggregatorAgentType.PDC_AGENT))
         leaf_agents = self.communication_graph.get_agents_by_class(LeafAgent)
-        leaf_agents = random.sample(leaf_agents, self._num_agents_in_regulation) if len(leaf_agents) > self._num_agents_in_regulation else leaf_agents
+        leaf_agents = self.random_sample(leaf_agents, self._num_agents_in_regulation) if len(leaf_agents) > self._num_agents_in_regulation else leaf_agents
 
         # send measurements from pmu/pdc agents to control center agent
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
         agent_configs = {agent: get_initial_config(agent) for agent in pmu_pdc_agents}
         control_center_agent_config = get_initial_config(control_center_agent)
         for agent in pmu_pdc_agents:
@@ -916,19 +1394,17 @@ class VoltageRegulation(ComplexAgentCommunicationPattern):
                                                               packet_size_bytes=self.data_size_generator.get_data_size())
 
         # send control command from control center agent to leaf agent
-        time_send += random.randint(self.t_local_optimization_ms_range[0],
+        time_send += self.random_int(self.t_local_optimization_ms_range[0],
                                     self.t_local_optimization_ms_range[1])
         for agent in leaf_agents:
             control_center_agent_config = self.add_message_to_config(config=control_center_agent_config,
                                                                      time_send_ms=time_send,
                                                                      receiver=agent,
                                                                      packet_size_bytes=self.data_size_generator.get_data_size())
-        write_config_to_file(control_center_agent.omnet_name, control_center_agent_config)
-        self.traffic_configurations[control_center_agent.omnet_name] = control_center_agent_config
+        self.save_config(control_center_agent_config)
 
         for agent, agent_config in agent_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -938,12 +1414,12 @@ class VoltageRegulation(ComplexAgentCommunicationPattern):
         pmu_pdc_agents = (
                 self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GRID_INFRASTRUCTURE_AGENT) +
                 self.communication_graph.get_agents_by_type(AggregatorAgent.AggregatorAgentType.PDC_AGENT))
-        pmu_pdc_agents = random.sample(pmu_pdc_agents, self._num_agents_in_regulation) \
+        pmu_pdc_agents = self.random_sample(pmu_pdc_agents, self._num_agents_in_regulation) \
             if len(pmu_pdc_agents) > self._num_agents_in_regulation else pmu_pdc_agents
 
 
         # send measurements from pmu/pdc agents to control center agent
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
         agent_configs = {agent: get_initial_config(agent) for agent in pmu_pdc_agents}
         for agent in pmu_pdc_agents:
             agent_configs[agent] = self.add_message_to_config(config=agent_configs[agent],
@@ -954,17 +1430,16 @@ class VoltageRegulation(ComplexAgentCommunicationPattern):
                                                               reply_after_ms_range=self.t_local_optimization_ms_range)
 
         for agent, agent_config in agent_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
     def generate_traffic_configuration_files_decentralized(self):
         bus_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GRID_INFRASTRUCTURE_AGENT)
-        bus_agents = random.sample(bus_agents, 3) if len(bus_agents) > 3 else bus_agents
+        bus_agents = self.random_sample(bus_agents, 3) if len(bus_agents) > 3 else bus_agents
 
         # send measurements from pmu/pdc agents to control center agent
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
         agent_configs = {agent: get_initial_config(agent) for agent in bus_agents}
         for agent in bus_agents:
             for neighbor in self.communication_graph.get_neighbors(agent):
@@ -977,8 +1452,7 @@ class VoltageRegulation(ComplexAgentCommunicationPattern):
                                                                       reply_after_ms_range=self.t_local_optimization_ms_range)
 
         for agent, agent_config in agent_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -994,11 +1468,11 @@ class EVManagementSystem(ComplexAgentCommunicationPattern):
 
     def generate_traffic_configuration_files_centralized(self):
         ev_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
-        ev_agents = random.sample(ev_agents, 15) if len(ev_agents) > 15 else ev_agents
+        ev_agents = self.random_sample(ev_agents, 15) if len(ev_agents) > 15 else ev_agents
         dso_agent = self.get_grid_operator_agent()
 
         # ev agents send charge requirement to dso agent, dso agent replies
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
         agent_configs = {agent: get_initial_config(agent) for agent in ev_agents}
         for agent in ev_agents:
             agent_configs[agent] = self.add_message_to_config(config=agent_configs[agent],
@@ -1009,8 +1483,7 @@ class EVManagementSystem(ComplexAgentCommunicationPattern):
                                                               reply_after_ms_range=self.t_local_optimization_ms_range)
 
         for agent, agent_config in agent_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -1019,11 +1492,11 @@ class EVManagementSystem(ComplexAgentCommunicationPattern):
         aggregator_agent = self.get_aggregator_agent()
         grid_operator_agent = self.get_grid_operator_agent()
         ev_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
-        ev_agents = random.sample(ev_agents, 15) if len(ev_agents) > 15 else ev_agents
+        ev_agents = self.random_sample(ev_agents, 15) if len(ev_agents) > 15 else ev_agents
 
         agent_to_configs = {}
 
-        time_send_price = random.randint(0, 100)
+        time_send_price = self.random_int(0, 100)
         # market agent sends price to aggregator
         agent_to_configs[market_agent] = get_initial_config(market_agent)
         agent_to_configs[market_agent] = (
@@ -1033,7 +1506,7 @@ class EVManagementSystem(ComplexAgentCommunicationPattern):
                                        packet_size_bytes=self.data_size_generator.get_data_size(),
                                        expect_reply=False))
 
-        time_send_constraints = random.randint(0, 100)
+        time_send_constraints = self.random_int(0, 100)
         # grid operator sends constraints to aggregator
         agent_to_configs[grid_operator_agent] = get_initial_config(grid_operator_agent)
         agent_to_configs[grid_operator_agent] = (
@@ -1048,14 +1521,13 @@ class EVManagementSystem(ComplexAgentCommunicationPattern):
         for agent in ev_agents:
             agent_to_configs[agent] = (
                 self.add_message_to_config(config=get_initial_config(agent),
-                                           time_send_ms=time_send_min + random.randint(0, 100),
+                                           time_send_ms=time_send_min + self.random_int(0, 100),
                                            receiver=aggregator_agent,
                                            packet_size_bytes=self.data_size_generator.get_data_size(),
                                            expect_reply=True,
                                            reply_after_ms_range=self.t_local_optimization_ms_range))
         for agent, agent_config in agent_to_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -1064,27 +1536,21 @@ class EVManagementSystem(ComplexAgentCommunicationPattern):
         # send schedule from ev agent to neighbors and expect reply
 
         ev_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
-        ev_agents = random.sample(ev_agents, 15) if len(ev_agents) > 15 else ev_agents
+        ev_agents = self.random_sample(ev_agents, 15) if len(ev_agents) > 15 else ev_agents
 
-        time_send_min = random.randint(0, 100)
+        time_send_min = self.random_int(0, 100)
         agent_configs = {agent: get_initial_config(agent) for agent in ev_agents}
 
-        for _ in range(self.num_iterations_till_goal):
-            for ev_agent in ev_agents:
-                for neighbor in self.communication_graph.get_neighbors(ev_agent):
-                    if neighbor in ev_agents:
-                        agent_configs[ev_agent] = (
-                            self.add_message_to_config(config=agent_configs[ev_agent],
-                                                       time_send_ms=time_send_min + random.randint(0, 100),
-                                                       receiver=neighbor,
-                                                       packet_size_bytes=self.data_size_generator.get_data_size(),
-                                                       expect_reply=True,
-                                                       reply_after_ms_range=self.t_local_optimization_ms_range))
-            time_send_min += 100 + self.t_local_optimization_ms_range[1]
+        # every iteration starts 100 ms + maximal optimization time after the previous one
+        round_times_send_ms = time_send_min + np.arange(self.num_iterations_till_goal) * (
+                100 + self.t_local_optimization_ms_range[1])
+        agent_configs = self.add_negotiation_rounds(agent_configs, senders=ev_agents, participants=ev_agents,
+                                                    round_times_send_ms=round_times_send_ms,
+                                                    time_offset_ms_range=(0, 100), expect_reply=True,
+                                                    reply_after_ms_range=self.t_local_optimization_ms_range)
 
         for agent, agent_config in agent_configs.items():
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
         self.fill_config_for_non_sending_agents()
 
@@ -1103,12 +1569,11 @@ class FaultDetectionAndLocation(ComplexAgentCommunicationPattern):
 
         for agent in pmu_agents:
             agent_config = self.add_message_to_config(config=get_initial_config(agent),
-                                                      time_send_ms=random.randint(0, 100),
+                                                      time_send_ms=self.random_int(0, 100),
                                                       receiver=control_center_agent,
                                                       packet_size_bytes=self.data_size_generator.get_data_size(),
                                                       expect_reply=False)
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
     def generate_traffic_configuration_files_hierarchical(self):
         pmu_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GRID_INFRASTRUCTURE_AGENT)
@@ -1116,20 +1581,19 @@ class FaultDetectionAndLocation(ComplexAgentCommunicationPattern):
 
         for agent in pmu_agents:
             agent_config = self.add_message_to_config(config=get_initial_config(agent),
-                                                      time_send_ms=random.randint(0, 100),
+                                                      time_send_ms=self.random_int(0, 100),
                                                       receiver=pdc_agent,
                                                       packet_size_bytes=self.data_size_generator.get_data_size(),
                                                       expect_reply=False)
-            write_config_to_file(agent.omnet_name, agent_config)
-            self.traffic_configurations[agent.omnet_name] = agent_config
+            self.save_config(agent_config)
 
     def generate_traffic_configuration_files_decentralized(self):
         leaf_agents = self.communication_graph.get_agents_by_class(LeafAgent)
 
-        agent_with_fault = random.choice(leaf_agents)
+        agent_with_fault = self.random_choice(leaf_agents)
 
         agent_config = get_initial_config(agent_with_fault)
-        time_send = random.randint(0, 100)
+        time_send = self.random_int(0, 100)
 
         for neighbor in self.communication_graph.get_neighbors(agent_with_fault):
             agent_config = self.add_message_to_config(config=agent_config,
@@ -1138,8 +1602,7 @@ class FaultDetectionAndLocation(ComplexAgentCommunicationPattern):
                                                       packet_size_bytes=self.data_size_generator.get_data_size(),
                                                       expect_reply=True,
                                                       reply_after_ms_range=self.t_local_optimization_ms_range)
-        write_config_to_file(agent_with_fault.omnet_name, agent_config)
-        self.traffic_configurations[agent_with_fault.omnet_name] = agent_config
+        self.save_config(agent_config)
 
 
 """
@@ -1172,7 +1635,7 @@ class CustomerAutomation(SimpleAgentCommunicationPattern):
             raise ValueError('No HEMS agent implemented.')
         if len(hems_agents) > 1:
             raise ValueError('More than one HEMS agent.')
-        self.generate_to_neighbor_communication(agents=hems_agents + random.sample(device_agents, self.num_devices))
+        self.generate_to_neighbor_communication(agents=hems_agents + self.random_sample(device_agents, self.num_devices))
 
 
 class ScheduledAutomatedMeterReading(SimpleAgentCommunicationPattern):
@@ -1200,7 +1663,7 @@ class OnDemandAutomatedMeterReading(SimpleAgentCommunicationPattern):
         control_center_agent = self.get_control_center_agent()
         meter_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
         # only some meters send data
-        meter_agents = random.sample(meter_agents, int(len(meter_agents) / 3))
+        meter_agents = self.random_sample(meter_agents, int(len(meter_agents) / 3))
         self.generate_many_to_one_communication(one=control_center_agent,
                                                 many=meter_agents,
                                                 send_only_once=False)
@@ -1221,7 +1684,7 @@ class PricingApplication(SimpleAgentCommunicationPattern):
                         self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.GENERATION_AGENT))
         meter_agents_sample = len(meter_agents) if len(meter_agents) < 20 else 20
         self.generate_broadcast_time_triggered_communication(one=market_agent,
-                                                             many=random.sample(meter_agents, meter_agents_sample))
+                                                             many=self.random_sample(meter_agents, meter_agents_sample))
 
 
 class DemandResponse(SimpleAgentCommunicationPattern):
@@ -1238,7 +1701,7 @@ class DemandResponse(SimpleAgentCommunicationPattern):
         control_center_agent = self.get_control_center_agent()
         meter_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
 
-        send_time = random.randint(0, 100)  # in the first 100 ms
+        send_time = self.random_int(0, 100)  # in the first 100 ms
 
         self.generate_event_triggered_communication(one=control_center_agent,
                                                     many=meter_agents,
@@ -1275,9 +1738,9 @@ class VoltageReduction(SimpleAgentCommunicationPattern):
     def generate_traffic_configuration_files(self):
         control_center_agent = self.get_control_center_agent()
         leaf_agents = self.communication_graph.get_agents_by_class(LeafAgent)
-        leaf_agents = random.sample(leaf_agents, 20) if len(leaf_agents) > 20 else leaf_agents
+        leaf_agents = self.random_sample(leaf_agents, 20) if len(leaf_agents) > 20 else leaf_agents
 
-        send_time = random.randint(0, 100)  # in the first 100 ms
+        send_time = self.random_int(0, 100)  # in the first 100 ms
 
         self.generate_event_triggered_communication(one=control_center_agent,
                                                     many=leaf_agents,
@@ -1295,10 +1758,10 @@ class FaultLocationIsolation(SimpleAgentCommunicationPattern):
 
     def generate_traffic_configuration_files(self):
         control_center_agent = self.get_control_center_agent()
-        leaf_agents = random.sample(self.communication_graph.get_agents_by_class(LeafAgent),
-                                    int(len(self.communication_graph.get_agents_by_class(LeafAgent))/4))
+        leaf_agents = self.communication_graph.get_agents_by_class(LeafAgent)
+        leaf_agents = self.random_sample(leaf_agents, int(len(leaf_agents) / 4))
 
-        send_time = random.randint(0, 100)  # in the first 100 ms
+        send_time = self.random_int(0, 100)  # in the first 100 ms
 
         self.generate_event_triggered_communication(one=control_center_agent,
                                                     many=leaf_agents,
@@ -1320,7 +1783,7 @@ class StorageApplication(SimpleAgentCommunicationPattern):
         control_center_agent = self.get_control_center_agent()
 
         storage_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.STORAGE_AGENT)
-        storage_agents = random.sample(storage_agents, 20) if len(storage_agents) > 20 else storage_agents
+        storage_agents = self.random_sample(storage_agents, 20) if len(storage_agents) > 20 else storage_agents
 
         self.generate_broadcast_time_triggered_communication(one=control_center_agent,
                                                              many=storage_agents,
@@ -1331,17 +1794,20 @@ class StorageApplication(SimpleAgentCommunicationPattern):
 class OutageRestorationManagement(SimpleAgentCommunicationPattern):
     def __init__(self, simulation_duration_ms: int,
                  communication_graph: CommunicationGraph,
-                 reply_after_range: tuple[int, int]):
+                 reply_after_range: tuple[int, int],
+                 arrival_process: ArrivalProcess = None):
         self.reply_after_range = reply_after_range
         data_size_generator = FixedDataSizeGenerator(data_size_byte=25)
         super().__init__(simulation_duration_ms, communication_graph, TriggerType.EVENT_TRIGGERED, 0,
                          data_size_generator, CommunicationMode.UNICAST)
+        if arrival_process:
+            self.set_arrival_process(arrival_process)
 
     def generate_traffic_configuration_files(self):
         control_center_agent = self.get_control_center_agent()
         meter_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
 
-        send_time = random.randint(0, 100)  # in the first 100 ms
+        send_time = self.random_int(0, 100)  # in the first 100 ms
 
         self.generate_event_triggered_communication(one=control_center_agent,
                                                     many=meter_agents,
@@ -1358,21 +1824,25 @@ class CustomerInformation(SimpleAgentCommunicationPattern):
         data_size_generator = FixedDataSizeGenerator(data_size_byte=200)
         super().__init__(simulation_duration_ms, communication_graph, TriggerType.TIME_TRIGGERED, 1000,
                          data_size_generator, CommunicationMode.BROADCAST)
+        self.use_stream_rules = True
 
     def generate_traffic_configuration_files(self):
         control_center_agent = self.get_control_center_agent()
         meter_agents = self.communication_graph.get_agents_by_type(LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
-        meter_agents = random.sample(meter_agents, int(len(meter_agents)/3)) # only use 1/3 of meter agents
+        meter_agents = self.random_sample(meter_agents, int(len(meter_agents)/3)) # only use 1/3 of meter agents
 
         self.generate_broadcast_time_triggered_communication(one=control_center_agent,
                                                              many=meter_agents)
 
 
 class WACsVoltageStabilityControl(SimpleAgentCommunicationPattern):
-    def __init__(self, simulation_duration_ms: int, communication_graph: CommunicationGraph):
+    def __init__(self, simulation_duration_ms: int, communication_graph: CommunicationGraph,
+                 arrival_process: ArrivalProcess = None):
         data_size_generator = FixedDataSizeGenerator(data_size_byte=18)
         super().__init__(simulation_duration_ms, communication_graph, TriggerType.EVENT_TRIGGERED, 0,
                          data_size_generator, CommunicationMode.BROADCAST)
+        if arrival_process:
+            self.set_arrival_process(arrival_process)
 
     def generate_traffic_configuration_files(self):
         control_center_agent = self.get_control_center_agent()
@@ -1394,6 +1864,7 @@ class WACsPowerOscillationMonitoring(SimpleAgentCommunicationPattern):
         data_size_generator = FixedDataSizeGenerator(data_size_byte=18)
         super().__init__(simulation_duration_ms, communication_graph, TriggerType.TIME_TRIGGERED, 100,
                          data_size_generator, CommunicationMode.BROADCAST)
+        self.use_stream_rules = True
 
     def generate_traffic_configuration_files(self):
         control_center_agent = self.get_control_center_agent()
@@ -1412,6 +1883,7 @@ class WideAreaProtection(SimpleAgentCommunicationPattern):
         data_size_generator = FixedDataSizeGenerator(data_size_byte=18)
         super().__init__(simulation_duration_ms, communication_graph, TriggerType.TIME_TRIGGERED, 100,
                          data_size_generator, CommunicationMode.BROADCAST)
+        self.use_stream_rules = True
 
     def generate_traffic_configuration_files(self):
         control_center_agent = self.get_control_center_agent()
@@ -1442,3 +1914,83 @@ class WAMsStateEstimation(SimpleAgentCommunicationPattern):
 
         self.generate_broadcast_time_triggered_communication(one=control_center_agent,
                                                              many=pmu_agents + pdc_agents)
+
+
+class CompositeAgentCommunicationPattern(AgentCommunicationPattern):
+    """
+    Combination of several agent communication patterns (applications) on the same network, which are simulated in
+    one run. Message ids of the applications are shifted into disjoint ranges, the configurations of each agent are
+    merged by sending time. The application of a message is given by its message id (see get_applications).
+    """
+
+    def __init__(self,
+                 simulation_duration_ms: int,
+                 communication_graph: CommunicationGraph,
+                 patterns: dict):
+        """
+        :param simulation_duration_ms: duration of the simulation.
+        :param communication_graph: communication graph that contains the agents of all patterns.
+        :param patterns: dict of application name and pattern.
+        """
+        if len(patterns) == 0:
+            raise ValueError('Composite pattern requires at least one pattern.')
+        first_pattern = list(patterns.values())[0]
+        super().__init__(simulation_duration_ms, communication_graph, first_pattern.trigger,
+                         first_pattern.frequency_ms, first_pattern.data_size_generator,
+                         first_pattern.communication_mode)
+        self.patterns = patterns
+        for pattern in self.patterns.values():
+            if pattern.window_ms:
+                raise ValueError('Patterns of a composite pattern do not support streaming mode.')
+            pattern.write_config_files = False
+        self.application_names = list(patterns.keys())
+        self.msg_id_offsets = []
+
+    def set_rng(self, rng: np.random.Generator):
+        """
+        Sets random number generator, each pattern and its data size generator get their own child streams.
+        :param rng: random number generator.
+        """
+        self.rng = rng
+        child_rngs = rng.spawn(2 * len(self.patterns))
+        for i, pattern in enumerate(self.patterns.values()):
+            pattern.set_rng(child_rngs[2 * i])
+            pattern.data_size_generator.set_rng(child_rngs[2 * i + 1])
+
+    def generate_traffic_configuration_files(self):
+        configs_per_sender = {}
+        offsets_per_sender = {}
+        self.msg_id_offsets = []
+        for pattern in self.patterns.values():
+            pattern.generate_traffic_configuration_files()
+            self.msg_id_offsets.append(self.message_id_counter)
+            for sender, config in pattern.traffic_configurations.items():
+                configs_per_sender.setdefault(sender, []).append(config)
+                offsets_per_sender.setdefault(sender, []).append(self.message_id_counter)
+            self.message_id_counter += pattern.message_id_counter
+
+        for sender, configs in configs_per_sender.items():
+            self.save_config(merge_traffic_configurations(configs, offsets_per_sender[sender]))
+        self.fill_config_for_non_sending_agents()
+
+    def get_applications(self, msg_ids) -> np.ndarray:
+        """
+        Gets application names of messages.
+        :param msg_ids: message ids of the composite pattern.
+        :return: array of application names.
+        """
+        application_codes = np.searchsorted(self.msg_id_offsets, np.asarray(msg_ids), side='right') - 1
+        return np.array(self.application_names, dtype=object)[application_codes]
+
+    def get_inputs(self, chunk_size=None):
+        """
+        Get inputs (traffic configuration) as pandas DataFrame with an additional column application.
+        :param chunk_size: if set, an iterator of DataFrames with at most chunk_size messages is returned instead.
+        :return: DataFrame (or iterator of DataFrames).
+        """
+        if chunk_size is not None:
+            return (df.assign(application=self.get_applications(df['msgId'])) for df in self.iter_inputs(chunk_size))
+        df = super().get_inputs()
+        if df is None:
+            return None
+        return df.assign(application=self.get_applications(df['msgId']))
@@ -0,0 +1,249 @@
+"""
+Arrival processes that generate the sending times of event-triggered communication.
+All processes draw whole arrays of inter-arrival times and accumulate them, the resulting sending times are
+truncated at the simulation duration.
+"""
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class ArrivalProcess(ABC):
+    """
+    Abstract class of an arrival process.
+    """
+
+    def get_arrival_times(self,
+                          simulation_duration_ms: int,
+                          rng: np.random.Generator) -> np.ndarray:
+        """
+        Generates all arrival times before the end of the simulation.
+        :param simulation_duration_ms: duration of the simulation.
+        :param rng: random number generator.
+        :return: sorted int64 array of arrival times in ms.
+        """
+        times = self.generate_arrival_times(simulation_duration_ms, rng)
+        return np.floor(times[times < simulation_duration_ms]).astype(np.int64)
+
+    @abstractmethod
+    def generate_arrival_times(self,
+                               simulation_duration_ms: int,
+                               rng: np.random.Generator) -> np.ndarray:
+        """
+        Generates sorted arrival times (as float) that cover at least the simulation duration.
+        """
+        pass
+
+    @abstractmethod
+    def get_description(self) -> str:
+        pass
+
+
+def accumulate_inter_arrival_times(draw_inter_arrival_times,
+                                   simulation_duration_ms: int,
+                                   mean_inter_arrival_time_ms: float) -> np.ndarray:
+    """
+    Accumulates blocks of inter-arrival times until the simulation duration is covered.
+    The block size is estimated from the mean inter-arrival time, so usually one block is sufficient.
+    :param draw_inter_arrival_times: function that takes a number n and returns n inter-arrival times.
+    :param simulation_duration_ms: duration of the simulation.
+    :param mean_inter_arrival_time_ms: expected inter-arrival time.
+    :return: arrival times.
+    """
+    if mean_inter_arrival_time_ms <= 0:
+        raise ValueError('Arrival process requires a positive mean inter-arrival time.')
+    block_size = int(1.1 * simulation_duration_ms / mean_inter_arrival_time_ms) + 16
+    blocks = []
+    last_arrival_time = 0
+    while last_arrival_time < simulation_duration_ms:
+        arrival_times = last_arrival_time + np.cumsum(draw_inter_arrival_times(block_size))
+        blocks.append(arrival_times)
+        last_arrival_time = arrival_times[-1]
+    return np.concatenate(blocks)
+
+
+class UniformArrivalProcess(ArrivalProcess):
+    """
+    Inter-arrival times are drawn uniformly from an integer interval (including both bounds).
+    """
+
+    def __init__(self,
+                 min_inter_arrival_time_ms: int,
+                 max_inter_arrival_time_ms: int):
+        self.min_inter_arrival_time_ms = min_inter_arrival_time_ms
+        self.max_inter_arrival_time_ms = max_inter_arrival_time_ms
+
+    def generate_arrival_times(self, simulation_duration_ms, rng):
+        return accumulate_inter_arrival_times(
+            lambda n: rng.integers(self.min_inter_arrival_time_ms, self.max_inter_arrival_time_ms,
+                                   endpoint=True, size=n),
+            simulation_duration_ms,
+            (self.min_inter_arrival_time_ms + self.max_inter_arrival_time_ms) / 2)
+
+    def get_description(self) -> str:
+        return (f'Uniform arrival process with inter-arrival times between {self.min_inter_arrival_time_ms} ms and '
+                f'{self.max_inter_arrival_time_ms} ms')
+
+
+class PoissonArrivalProcess(ArrivalProcess):
+    """
+    Poisson process, inter-arrival times are exponentially distributed.
+    """
+
+    def __init__(self,
+                 mean_inter_arrival_time_ms: float):
+        self.mean_inter_arrival_time_ms = mean_inter_arrival_time_ms
+
+    def generate_arrival_times(self, simulation_duration_ms, rng):
+        return accumulate_inter_arrival_times(
+            lambda n: rng.exponential(self.mean_inter_arrival_time_ms, size=n),
+            simulation_duration_ms,
+            self.mean_inter_arrival_time_ms)
+
+    def get_description(self) -> str:
+        return f'Poisson arrival process with mean inter-arrival time {self.mean_inter_arrival_time_ms} ms'
+
+
+class DeterministicJitterArrivalProcess(ArrivalProcess):
+    """
+    Periodic arrivals, each arrival is shifted by a jitter drawn uniformly from [-jitter_ms, jitter_ms].
+    The jitter does not accumulate over time.
+    """
+
+    def __init__(self,
+                 period_ms: float,
+                 jitter_ms: float):
+        if period_ms <= 0:
+            raise ValueError('Arrival process requires a positive period.')
+        self.period_ms = period_ms
+        self.jitter_ms = jitter_ms
+
+    def generate_arrival_times(self, simulation_duration_ms, rng):
+        periodic_times = np.arange(self.period_ms, simulation_duration_ms + self.jitter_ms + self.period_ms,
+                                   self.period_ms, dtype=np.float64)
+        arrival_times = periodic_times + rng.uniform(-self.jitter_ms, self.jitter_ms, size=len(periodic_times))
+        arrival_times.sort()
+        return arrival_times[arrival_times >= 0]
+
+    def get_description(self) -> str:
+        return f'Periodic arrival process with period {self.period_ms} ms and jitter +/- {self.jitter_ms} ms'
+
+
+class MMPPArrivalProcess(ArrivalProcess):
+    """
+    Markov-modulated Poisson process. The process stays in a state for an exponentially distributed sojourn time,
+    generates arrivals with the rate of the state and then moves to the next state according to the transition
+    matrix. Without transition matrix, the states are visited in a cycle (e.g. alternating for two states).
+    """
+
+    def __init__(self,
+                 rates_per_s: list[float],
+                 mean_sojourn_times_ms: list[float],
+                 transition_matrix=None):
+        if len(rates_per_s) != len(mean_sojourn_times_ms):
+            raise ValueError('MMPP requires one mean sojourn time per state.')
+        self.rates_per_s = np.asarray(rates_per_s, dtype=np.float64)
+        self.mean_sojourn_times_ms = np.asarray(mean_sojourn_times_ms, dtype=np.float64)
+        num_states = len(rates_per_s)
+        self.cyclic = transition_matrix is None
+        if transition_matrix is None:
+            transition_matrix = np.roll(np.eye(num_states), 1, axis=1)
+        self.transition_matrix = np.asarray(transition_matrix, dtype=np.float64)
+
+    def get_state_sequence(self, num_sojourns: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Draws the sequence of visited states, starting in state 0.
+        :param num_sojourns: number of sojourns.
+        :param rng: random number generator.
+        :return: array of states.
+        """
+        if self.cyclic:
+            return np.arange(num_sojourns) % len(self.rates_per_s)
+        cumulative_transitions = np.cumsum(self.transition_matrix, axis=1)
+        uniforms = rng.random(num_sojourns)
+        states = np.zeros(num_sojourns, dtype=np.int64)
+        for i in range(1, num_sojourns):
+            states[i] = min(np.searchsorted(cumulative_transitions[states[i - 1]], uniforms[i], side='right'),
+                            len(self.rates_per_s) - 1)
+        return states
+
+    def generate_arrival_times(self, simulation_duration_ms, rng):
+        # sojourns until the simulation duration is covered
+        num_sojourns = int(1.1 * simulation_duration_ms / self.mean_sojourn_times_ms.min()) + 16
+        states = self.get_state_sequence(num_sojourns, rng)
+        sojourn_ends = np.cumsum(rng.exponential(self.mean_sojourn_times_ms[states]))
+        # in the unlikely case that the sojourns end too early, the last state is kept until the end
+        sojourn_ends[-1] = max(sojourn_ends[-1], simulation_duration_ms)
+        num_sojourns = np.searchsorted(sojourn_ends, simulation_duration_ms) + 1
+        states = states[:num_sojourns]
+        sojourn_ends = sojourn_ends[:num_sojourns]
+        sojourn_starts = np.concatenate(([0], sojourn_ends[:-1]))
+
+        # Poisson number of arrivals per sojourn, placed uniformly within the sojourn
+        sojourn_lengths = sojourn_ends - sojourn_starts
+        num_arrivals = rng.poisson(self.rates_per_s[states] * sojourn_lengths / 1000)
+        arrival_times = (np.repeat(sojourn_starts, num_arrivals) +
+                         rng.random(num_arrivals.sum()) * np.repeat(sojourn_lengths, num_arrivals))
+        arrival_times.sort()
+        return arrival_times
+
+    def get_description(self) -> str:
+        return (f'MMPP arrival process with rates {self.rates_per_s.tolist()} 1/s and mean sojourn times '
+                f'{self.mean_sojourn_times_ms.tolist()} ms')
+
+
+class ParetoOnOffArrivalProcess(ArrivalProcess):
+    """
+    ON/OFF process with Pareto distributed ON and OFF periods, which results in self-similar traffic for shapes
+    between 1 and 2. During ON periods, arrivals are periodic.
+    """
+
+    def __init__(self,
+                 mean_on_time_ms: float,
+                 mean_off_time_ms: float,
+                 on_period_ms: float,
+                 shape_on=1.5,
+                 shape_off=1.5):
+        if shape_on <= 1 or shape_off <= 1:
+            raise ValueError('Pareto shapes have to be greater than 1 for a finite mean.')
+        if on_period_ms <= 0:
+            raise ValueError('Arrival process requires a positive period.')
+        self.mean_on_time_ms = mean_on_time_ms
+        self.mean_off_time_ms = mean_off_time_ms
+        self.on_period_ms = on_period_ms
+        self.shape_on = shape_on
+        self.shape_off = shape_off
+
+    def generate_arrival_times(self, simulation_duration_ms, rng):
+        def draw_cycle_lengths(n):
+            on_times = draw_pareto(self.mean_on_time_ms, self.shape_on, n, rng)
+            off_times = draw_pareto(self.mean_off_time_ms, self.shape_off, n, rng)
+            return np.column_stack((on_times, off_times)).ravel()
+
+        # alternating ON and OFF periods, starting with an ON period at time 0
+        period_ends = accumulate_inter_arrival_times(draw_cycle_lengths, simulation_duration_ms,
+                                                     (self.mean_on_time_ms + self.mean_off_time_ms) / 2)
+        on_starts = np.concatenate(([0], period_ends[1:-1:2]))
+        on_ends = period_ends[0::2][:len(on_starts)]
+
+        # periodic arrivals within each ON period: start, start + period, ...
+        num_arrivals = np.ceil((on_ends - on_starts) / self.on_period_ms).astype(np.int64)
+        offsets = np.arange(num_arrivals.sum()) - np.repeat(np.cumsum(num_arrivals) - num_arrivals, num_arrivals)
+        return np.repeat(on_starts, num_arrivals) + offsets * self.on_period_ms
+
+    def get_description(self) -> str:
+        return (f'Pareto ON/OFF arrival process with mean ON time {self.mean_on_time_ms} ms, mean OFF time '
+                f'{self.mean_off_time_ms} ms and period {self.on_period_ms} ms during ON periods')
+
+
+def draw_pareto(mean: float, shape: float, size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws Pareto distributed values with the given mean.
+    :param mean: mean of the distribution.
+    :param shape: shape parameter (> 1).
+    :param size: number of values.
+    :param rng: random number generator.
+    :return: array of values.
+    """
+    scale = mean * (shape - 1) / shape
+    return scale * (1 + rng.pareto(shape, size=size))
@@ -0,0 +1,280 @@
+"""
+Resumable campaign queue backed by SQLite. Each scenario of a campaign is a job keyed by a deterministic fingerprint
+(see sweep.py), its state is pending, running, done or failed. Jobs are claimed atomically, so several worker
+processes can drain the same queue. Restarting a campaign skips done jobs and returns the jobs of crashed workers to
+the queue. Failed runs are retried until the retry budget of the job is used up, interrupted runs are returned to the
+queue without using it up. The queue is drained by the CampaignWorker (see scenario_runner.py).
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+from enum import Enum
+
+from agent_communication_generation_tool.description_classes.simulation_process import \
+    DEFAULT_SIMULATION_TIMEOUT_S
+
+# runs of a job
+DEFAULT_MAX_ATTEMPTS = 3
+# running jobs of workers that cannot be checked (see has_lease) are returned to the queue after this time
+DEFAULT_LEASE_S = DEFAULT_SIMULATION_TIMEOUT_S + 3600
+# number of characters of the error that are kept
+MAX_ERROR_LENGTH = 10000
+
+
+class JobState(Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+def get_process_start_time(pid: int):
+    """
+    Gets start time of a process (clock ticks after boot), which tells it apart from later processes with the same pid.
+    :param pid: process id.
+    :return: start time, None if it is unknown (no /proc file system or no such process).
+    """
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # the process name may contain spaces, the start time is the 20th field after it
+    return int(stat[stat.rindex(')') + 2:].split()[19])
+
+
+def get_worker_id() -> str:
+    start_time = get_process_start_time(os.getpid())
+    return f'{socket.gethostname()}:{os.getpid()}:{"" if start_time is None else start_time}'
+
+
+def parse_worker_id(worker_id: str):
+    """
+    :param worker_id: id of the worker (host:pid:start time, see get_worker_id).
+    :return: host, pid and start time of the worker process (None if unknown).
+    """
+    host, pid, start_time = worker_id.rsplit(':', 2)
+    return host, int(pid), int(start_time) if start_time else None
+
+
+def has_lease(worker_id: str) -> bool:
+    """
+    Checks whether the running jobs of a worker are bound to the lease. Workers on other hosts cannot be checked, local
+    workers without start time cannot be told apart from later processes with the same pid.
+    :param worker_id: id of the worker.
+    :return: bool.
+    """
+    host, _, start_time = parse_worker_id(worker_id)
+    return host != socket.gethostname() or start_time is None
+
+
+def is_worker_alive(worker_id: str) -> bool:
+    """
+    Checks whether a worker process is alive. Workers on other hosts are assumed to be alive.
+    :param worker_id: id of the worker (see get_worker_id).
+    :return: bool.
+    """
+    host, pid, start_time = parse_worker_id(worker_id)
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # the pid of a crashed worker may have been reused by another process
+    current_start_time = get_process_start_time(pid)
+    return start_time is None or current_start_time is None or current_start_time == start_time
+
+
+class CampaignQueue:
+    """
+    Job queue of a campaign in a SQLite database.
+    """
+
+    def __init__(self, database_path: str, max_attempts=DEFAULT_MAX_ATTEMPTS, lease_s=DEFAULT_LEASE_S):
+        """
+        :param database_path: path of the database, created if it does not exist.
+        :param max_attempts: number of runs of a job before it is failed.
+        :param lease_s: time after which running jobs of workers that cannot be checked are returned to the queue.
+        """
+        self.database_path = database_path
+        self.max_attempts = max_attempts
+        self.lease_s = lease_s
+        self.worker_id = get_worker_id()
+        # transactions are started explicitly (BEGIN IMMEDIATE locks the database for other writers)
+        self.connection = sqlite3.connect(database_path, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                                'fingerprint TEXT PRIMARY KEY, '
+                                'entry TEXT NOT NULL, '
+                                'state TEXT NOT NULL, '
+                                'attempts INTEGER NOT NULL DEFAULT 0, '
+                                'worker TEXT, '
+                                'claimed_at REAL, '
+                                'updated_at REAL NOT NULL, '
+                                'error TEXT, '
+                                'scenario_id TEXT, '
+                                'result_path TEXT, '
+                                'run_directory TEXT)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)')
+
+    def close(self):
+        self.connection.close()
+
+    def execute_transaction(self, function):
+        """
+        Runs function(connection) in an immediate transaction, which is rolled back on errors.
+        :param function: function to run.
+        :return: return value of function.
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = function(self.connection)
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        return result
+
+    def add_jobs(self, jobs: dict[str, dict]) -> int:
+        """
+        Adds jobs to the queue, jobs that are already in the queue (in any state) are kept as they are.
+        :param jobs: entries by fingerprint.
+        :return: number of added jobs.
+        """
+        now = time.time()
+
+        def add(connection):
+            cursor = connection.executemany(
+                'INSERT OR IGNORE INTO jobs (fingerprint, entry, state, updated_at) VALUES (?, ?, ?, ?)',
+                [(fingerprint, json.dumps(entry, sort_keys=True), JobState.PENDING.value, now)
+                 for fingerprint, entry in jobs.items()])
+            return cursor.rowcount
+
+        return self.execute_transaction(add)
+
+    def recover_jobs(self) -> int:
+        """
+        Returns running jobs of crashed workers to the queue or, if their retry budget is used up, fails them. Jobs of
+        workers that cannot be checked (see has_lease) are recovered when the lease expired.
+        :return: number of recovered jobs.
+        """
+        now = time.time()
+
+        def recover(connection):
+            rows = connection.execute('SELECT fingerprint, worker, claimed_at FROM jobs WHERE state = ?',
+                                      (JobState.RUNNING.value,)).fetchall()
+            fingerprints = [fingerprint for fingerprint, worker, claimed_at in rows
+                            if not is_worker_alive(worker)
+                            or (has_lease(worker) and claimed_at + self.lease_s < now)]
+            # jobs that crash their workers use up their retry budget as well
+            connection.executemany('UPDATE jobs SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, worker = NULL, '
+                                   'updated_at = ?, error = ? WHERE fingerprint = ?',
+                                   [(self.max_attempts, JobState.PENDING.value, JobState.FAILED.value, now,
+                                     'worker crashed or lease expired', fingerprint) for fingerprint in fingerprints])
+            return len(fingerprints)
+
+        return self.execute_transaction(recover)
+
+    def claim_job(self):
+        """
+        Claims the next pending job for this worker.
+        :return: (fingerprint, entry) or None if no job is pending.
+        """
+        now = time.time()
+
+        def claim(connection):
+            row = connection.execute('SELECT fingerprint, entry FROM jobs WHERE state = ? ORDER BY rowid LIMIT 1',
+                                     (JobState.PENDING.value,)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE jobs SET state = ?, attempts = attempts + 1, worker = ?, claimed_at = ?, '
+                               'updated_at = ? WHERE fingerprint = ?',
+                               (JobState.RUNNING.value, self.worker_id, now, now, row[0]))
+            return row[0], json.loads(row[1])
+
+        return self.execute_transaction(claim)
+
+    def complete_job(self, fingerprint: str, error=None, scenario_id=None, result_path=None, run_directory=None):
+        """
+        Marks a job of this worker as done or, on error, returns it to the queue until the retry budget is used up.
+        :param fingerprint: fingerprint of the job.
+        :param error: error of the run, None if the run was successful.
+        :param scenario_id: id of the scenario of the run.
+        :param result_path: path of the result csv of the run, None if the run has no result.
+        :param run_directory: run directory of the run, None if it was not kept.
+        """
+        now = time.time()
+        location = (None if scenario_id is None else str(scenario_id), result_path, run_directory)
+        if error is None:
+            self.connection.execute('UPDATE jobs SET state = ?, worker = NULL, updated_at = ?, error = NULL, '
+                                    'scenario_id = ?, result_path = ?, run_directory = ? '
+                                    'WHERE fingerprint = ? AND worker = ?',
+                                    (JobState.DONE.value, now, *location, fingerprint, self.worker_id))
+            return
+        self.connection.execute('UPDATE jobs SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, worker = NULL, '
+                                'updated_at = ?, error = ?, scenario_id = ?, result_path = ?, run_directory = ? '
+                                'WHERE fingerprint = ? AND worker = ?',
+                                (self.max_attempts, JobState.PENDING.value, JobState.FAILED.value, now,
+                                 error[-MAX_ERROR_LENGTH:], *location, fingerprint, self.worker_id))
+
+    def release_job(self, fingerprint: str):
+        """
+        Returns a job of this worker to the queue without using up its retry budget (the run was interrupted).
+        :param fingerprint: fingerprint of the job.
+        """
+        self.connection.execute('UPDATE jobs SET state = ?, attempts = attempts - 1, worker = NULL, claimed_at = NULL, '
+                                'updated_at = ? WHERE fingerprint = ? AND worker = ?',
+                                (JobState.PENDING.value, time.time(), fingerprint, self.worker_id))
+
+    def retry_failed_jobs(self) -> int:
+        """
+        Returns failed jobs to the queue with a new retry budget.
+        :return: number of jobs.
+        """
+        cursor = self.connection.execute('UPDATE jobs SET state = ?, attempts = 0, updated_at = ? WHERE state = ?',
+                                         (JobState.PENDING.value, time.time(), JobState.FAILED.value))
+        return cursor.rowcount
+
+    def get_counts(self) -> dict[JobState, int]:
+        """
+        Gets number of jobs per state.
+        :return: dict.
+        """
+        counts = {state: 0 for state in JobState}
+        for state, count in self.connection.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'):
+            counts[JobState(state)] = count
+        return counts
+
+    def get_job(self, fingerprint: str):
+        """
+        Gets state and result location of a job.
+        :param fingerprint: fingerprint of the job.
+        :return: dict with the columns of the job (without its entry) or None if the job is not in the queue.
+        """
+        cursor = self.connection.execute('SELECT state, attempts, worker, error, scenario_id, result_path, '
+                                         'run_directory FROM jobs WHERE fingerprint = ?', (fingerprint,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([column[0] for column in cursor.description], row))
+        job['state'] = JobState(job['state'])
+        return job
+
+    def get_failed_jobs(self) -> list[tuple[str, str]]:
+        """
+        Gets failed jobs with the error of their last run.
+        :return: list of (fingerprint, error).
+        """
+        return self.connection.execute('SELECT fingerprint, error FROM jobs WHERE state = ? ORDER BY rowid',
+                                       (JobState.FAILED.value,)).fetchall()
+
+    def print_summary(self):
+        counts = self.get_counts()
+        print(f'Campaign {self.database_path}: ' + ', '.join(f'{count} {state.value}'
+                                                             for state, count in counts.items()))
+
@@ -1,10 +1,11 @@
 """
 Implementation of communication graph representation to indicate neighborhoods between agents.
 """
-import random
 from abc import ABC, abstractmethod
 
 import networkx as nx
+import numpy as np
+from scipy import sparse
 
 from agent_communication_generation_tool.description_classes.agent import Agent, CentralAgent, \
     LeafAgent
@@ -13,18 +14,64 @@ from agent_communication_generation_tool.description_classes.agent import Agent,
 class CommunicationGraph(ABC):
     """
     Abstract class of a communication graph.
+    The adjacency is either held in a networkx graph or, if sparse_adjacency is set, in a SciPy CSR matrix.
+    In the sparse case the networkx graph is only built when it is accessed (e.g. for plotting).
     """
+    # whether nodes without edges are part of the networkx graph
+    INCLUDE_ISOLATED_NODES = True
 
     def __init__(self,
-                 agents: list[Agent], max_number_of_agents_per_type=None):
+                 agents: list[Agent], max_number_of_agents_per_type=None,
+                 sparse_adjacency=False, rng: np.random.Generator = None):
+        self.rng = rng if rng is not None else np.random.default_rng()
         if max_number_of_agents_per_type:
             agents = reduce_number_of_leaf_agents_in_graph(max_number_of_agents_per_type=max_number_of_agents_per_type,
-                                                           agents=agents)
+                                                           agents=agents, rng=self.rng)
         self.agents = agents
+        # buckets of agents per agent type and per agent class (including base classes)
+        self.agents_by_type = {}
+        self.agents_by_class = {}
+        for agent in self.agents:
+            self.agents_by_type.setdefault(agent.agent_type, []).append(agent)
+            for agent_class in type(agent).__mro__:
+                self.agents_by_class.setdefault(agent_class, []).append(agent)
         self.node_agent_mapping = {idx: agent for idx, agent in enumerate(self.agents)}
-        self.graph = self.initialize_graph()
+        # agents are identified by object identity, the first node of an agent is used
+        self.agent_node_mapping = {}
+        for idx, agent in self.node_agent_mapping.items():
+            self.agent_node_mapping.setdefault(id(agent), idx)
+        self._neighbor_cache = {}
+        self._neighbor_node_cache = {}
+        self.sparse_adjacency = sparse_adjacency
+        self.adjacency = None
+        self._graph = None
+        if self.sparse_adjacency:
+            self.adjacency = self.initialize_adjacency()
+        else:
+            self.graph = self.initialize_graph()
         self.relabeled_graph = None
 
+    @property
+    def graph(self) -> nx.Graph:
+        if self._graph is None and self.adjacency is not None:
+            self._graph = self.adjacency_to_graph()
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph: nx.Graph):
+        self._graph = graph
+        if self.sparse_adjacency:
+            self.adjacency = nx.to_scipy_sparse_array(graph, nodelist=range(len(self.node_agent_mapping)),
+                                                      dtype=np.int8, format='csr')
+        self.invalidate_neighbor_cache()
+
+    def invalidate_neighbor_cache(self):
+        """
+        Clears cached neighborhoods. Has to be called after the graph has been modified in place.
+        """
+        self._neighbor_cache.clear()
+        self._neighbor_node_cache.clear()
+
     def relabel_graph(self):
         if len(self.node_agent_mapping) == len(self.agents):
             mapping = {}
@@ -35,29 +82,138 @@ class CommunicationGraph(ABC):
 
     def get_agents_by_type(self,
                            agent_type):
-        return [agent for agent in self.agents if agent.agent_type == agent_type]
+        """
+        Gets agents of agent type from the precomputed buckets.
+        :param agent_type: type of the agents.
+        :return: list of agents, which is shared and must not be modified.
+        """
+        return self.agents_by_type.get(agent_type, [])
 
     def get_agents_by_class(self,
                             agent_class):
-        return [agent for agent in self.agents if isinstance(agent, agent_class)]
+        """
+        Gets agents that are instances of agent class from the precomputed buckets.
+        :param agent_class: class of the agents.
+        :return: list of agents, which is shared and must not be modified.
+        """
+        return self.agents_by_class.get(agent_class, [])
 
     @abstractmethod
     def initialize_graph(self) -> nx.Graph:
         pass
 
+    def get_edges(self) -> np.ndarray:
+        """
+        Generates the edges of the topology.
+        :return: edge array of shape (number of edges, 2).
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not provide an edge array.')
+
+    def initialize_adjacency(self) -> sparse.csr_array:
+        """
+        Initializes topology as sparse adjacency matrix.
+        :return: symmetric CSR matrix with one row per node.
+        """
+        return build_adjacency_from_edges(len(self.node_agent_mapping), self.get_edges())
+
+    def adjacency_to_graph(self) -> nx.Graph:
+        """
+        Converts the sparse adjacency to a networkx graph.
+        :return: graph.
+        """
+        graph = nx.Graph()
+        if self.INCLUDE_ISOLATED_NODES:
+            graph.add_nodes_from(range(self.adjacency.shape[0]))
+        upper = sparse.triu(self.adjacency, format='coo')
+        graph.add_edges_from(zip(upper.row.tolist(), upper.col.tolist()))
+        return graph
+
+    def get_node(self,
+                 agent: Agent):
+        """
+        Gets node of agent in topology graph.
+        :param agent: agent to get node for.
+        :return: node id or None if agent is not part of the graph.
+        """
+        return self.agent_node_mapping.get(id(agent))
+
+    def get_neighbor_nodes(self,
+                           node: int) -> np.ndarray:
+        """
+        Gets neighbor nodes from topology graph, cached per node until the graph changes.
+        With sparse adjacency, neighbors are ordered by node id.
+        :param node: node id.
+        :return: int64 array of neighbor node ids, which is shared and must not be modified.
+        """
+        neighbor_nodes = self._neighbor_node_cache.get(node)
+        if neighbor_nodes is None:
+            if self.sparse_adjacency:
+                indptr = self.adjacency.indptr
+                neighbor_nodes = self.adjacency.indices[indptr[node]:indptr[node + 1]].astype(np.int64)
+            else:
+                neighbor_nodes = np.fromiter(nx.neighbors(self.graph, node), dtype=np.int64)
+            self._neighbor_node_cache[node] = neighbor_nodes
+        return neighbor_nodes
+
     def get_neighbors(self,
                       agent: Agent):
         """
         Gets neighbors from topology graph.
+        Neighborhoods are cached per node until the graph changes.
+        With sparse adjacency, neighbors are ordered by node id.
         :param agent: node to get neighbors for.
-        :return: list of agent objects.
+        :return: tuple of agent objects.
         """
-        l = 0
-        for node_id, cur_agent in self.node_agent_mapping.items():
-            if agent == cur_agent:
-                neighbor_ids = [n for n in nx.neighbors(self.graph, l)]
-                return [self.node_agent_mapping[i] for i in neighbor_ids]
-            l += 1
+        node = self.get_node(agent)
+        if node is None:
+            return None
+        neighbors = self._neighbor_cache.get(node)
+        if neighbors is None:
+            neighbors = tuple(self.node_agent_mapping[i] for i in self.get_neighbor_nodes(node).tolist())
+            self._neighbor_cache[node] = neighbors
+        return neighbors
+
+    def get_node_mask(self,
+                      agents: list[Agent]) -> np.ndarray:
+        """
+        Gets boolean mask over all nodes that is set for the nodes of the given agents.
+        :param agents: agents.
+        :return: bool array with one entry per node.
+        """
+        mask = np.zeros(len(self.node_agent_mapping), dtype=np.bool_)
+        nodes = [self.get_node(agent) for agent in agents]
+        mask[[node for node in nodes if node is not None]] = True
+        return mask
+
+    def get_flooding_order(self,
+                           initiator: Agent,
+                           participants: list[Agent]) -> list[Agent]:
+        """
+        Gets the agents that are reached by flooding from the initiator over neighbors that are participants, in the
+        order in which they are reached (breadth-first). The frontier and the visited set are kept as arrays over
+        node ids.
+        :param initiator: agent that starts the flooding.
+        :param participants: agents that take part in the flooding.
+        :return: list of agents, starting with the initiator.
+        """
+        start = self.get_node(initiator)
+        if start is None:
+            return []
+        allowed = self.get_node_mask(participants)
+        visited = np.zeros(len(self.node_agent_mapping), dtype=np.bool_)
+        visited[start] = True
+        order = [np.array([start], dtype=np.int64)]
+        frontier = order[0]
+        while len(frontier) > 0:
+            next_frontier = []
+            for node in frontier.tolist():
+                neighbor_nodes = self.get_neighbor_nodes(node)
+                new_nodes = neighbor_nodes[allowed[neighbor_nodes] & ~visited[neighbor_nodes]]
+                visited[new_nodes] = True
+                next_frontier.append(new_nodes)
+            frontier = np.concatenate(next_frontier)
+            order.append(frontier)
+        return [self.node_agent_mapping[node] for node in np.concatenate(order).tolist()]
 
     @abstractmethod
     def get_description(self):
@@ -67,28 +223,26 @@ class CommunicationGraph(ABC):
 class RingOverlayGraph(CommunicationGraph):
     def __init__(self, agents: list[Agent],
                  central_agent: CentralAgent,
-                 max_number_of_agents_per_type=None):
+                 max_number_of_agents_per_type=None,
+                 sparse_adjacency=False,
+                 rng: np.random.Generator = None):
         self.central_agent = central_agent
-        super().__init__(agents, max_number_of_agents_per_type)
+        super().__init__(agents, max_number_of_agents_per_type, sparse_adjacency, rng)
 
     def initialize_graph(self) -> nx.Graph:
         """
         Initializes topology as networkx graph.
         :return: generated graph.
         """
-        graph = nx.Graph()
-        for node in self.node_agent_mapping.keys():
-            graph.add_node(node)
+        return build_graph_from_edges(len(self.node_agent_mapping), self.get_edges())
 
-        agents_without_central_agent = {idx: agent for idx, agent in self.node_agent_mapping.items()
-                                        if not isinstance(agent, CentralAgent)}
-
-        for idx, agent in agents_without_central_agent.items():
-            graph.add_edge(idx,
-                           idx + 1 if idx < len(agents_without_central_agent) - 1
-                           else list(agents_without_central_agent.keys())[0])
-
-        return graph
+    def get_edges(self) -> np.ndarray:
+        """
+        Generates edges of the ring over all agents except the central agents.
+        :return: edge array of shape (number of edges, 2).
+        """
+        nodes = get_nodes_of_agents(self.node_agent_mapping, lambda agent: not isinstance(agent, CentralAgent))
+        return get_ring_edges(nodes)
 
     def get_description(self):
         return f'Ring Overlay Topology with {len(self.agents)} agents'
@@ -98,33 +252,37 @@ class SmallWorldOverlayGraph(CommunicationGraph):
     def __init__(self, agents: list[Agent],
                  central_agent: CentralAgent,
                  p: float,
-                 max_number_of_agents_per_type=None):
+                 max_number_of_agents_per_type=None,
+                 sparse_adjacency=False,
+                 rng: np.random.Generator = None):
         self.central_agent = central_agent
         self.p = p
-        super().__init__(agents, max_number_of_agents_per_type)
+        super().__init__(agents, max_number_of_agents_per_type, sparse_adjacency, rng)
 
     def initialize_graph(self) -> nx.Graph:
         """
         Initializes topology as networkx graph.
         :return: generated graph.
         """
-        graph = nx.Graph()
-
-        for node in self.node_agent_mapping.keys():
-            graph.add_node(node)
-
-        leaf_agents = {idx: agent for idx, agent in self.node_agent_mapping.items()
-                       if isinstance(agent, LeafAgent)}
+        return build_graph_from_edges(len(self.node_agent_mapping), self.get_edges())
 
-        for idx, agent in leaf_agents.items():
-            graph.add_edge(idx,
-                           idx + 1 if idx < len(leaf_agents) - 1
-                           else list(leaf_agents.keys())[0])
-            if random.random() < self.p:
-                others = {i: a for i, a in leaf_agents.items() if a != agent}
-                choice = random.choice(list(others.keys()))
-                graph.add_edge(idx, choice)
-        return graph
+    def get_edges(self) -> np.ndarray:
+        """
+        Generates edges of the ring over all leaf agents. With probability p, a leaf agent gets an additional
+        shortcut to another leaf agent chosen uniformly at random.
+        :return: edge array of shape (number of edges, 2).
+        """
+        nodes = get_nodes_of_agents(self.node_agent_mapping, lambda agent: isinstance(agent, LeafAgent))
+        ring_edges = get_ring_edges(nodes)
+        if len(nodes) < 2:
+            return ring_edges
+
+        shortcut_positions = np.flatnonzero(self.rng.random(len(nodes)) < self.p)
+        # draw among the other n - 1 leaf agents and skip the position of the agent itself
+        other_positions = self.rng.integers(0, len(nodes) - 1, size=len(shortcut_positions))
+        other_positions += other_positions >= shortcut_positions
+        shortcut_edges = np.column_stack((nodes[shortcut_positions], nodes[other_positions]))
+        return np.concatenate((ring_edges, shortcut_edges))
 
     def get_description(self):
         return f'Small World Overlay Topology with {len(self.agents)} agents and p = {self.p}'
@@ -133,78 +291,180 @@ class SmallWorldOverlayGraph(CommunicationGraph):
 class CompleteOverlayGraph(CommunicationGraph):
     def __init__(self, agents: list[Agent],
                  central_agent: CentralAgent,
-                 max_number_of_agents_per_type=None):
+                 max_number_of_agents_per_type=None,
+                 sparse_adjacency=False,
+                 rng: np.random.Generator = None):
         self.central_agent = central_agent
-        super().__init__(agents, max_number_of_agents_per_type)
+        super().__init__(agents, max_number_of_agents_per_type, sparse_adjacency, rng)
 
     def initialize_graph(self) -> nx.Graph:
         """
         Initializes topology as networkx graph.
         :return: generated graph.
         """
-        graph = nx.Graph()
-        for node in self.node_agent_mapping.keys():
-            graph.add_node(node)
-
-        leaf_agents = {idx: agent for idx, agent in self.node_agent_mapping.items()
-                       if isinstance(agent, LeafAgent)}
-
-        for idx, agent in leaf_agents.items():
-            graph.add_edge(idx,
-                           idx + 1 if idx < len(leaf_agents) - 1
-                           else list(leaf_agents.keys())[0])
-            others = {i: a for i, a in leaf_agents.items() if a != agent}
-            for o in others.keys():
-                graph.add_edge(idx, o)
-        return graph
+        return build_graph_from_edges(len(self.node_agent_mapping), self.get_edges())
+
+    def get_edges(self) -> np.ndarray:
+        """
+        Generates edges between all pairs of leaf agents (plus the ring edges).
+        :return: edge array of shape (number of edges, 2).
+        """
+        nodes = get_nodes_of_agents(self.node_agent_mapping, lambda agent: isinstance(agent, LeafAgent))
+        first, second = np.triu_indices(len(nodes), k=1)
+        return np.concatenate((get_ring_edges(nodes), np.column_stack((nodes[first], nodes[second]))))
+
+    def initialize_adjacency(self) -> sparse.csr_array:
+        """
+        Initializes topology as sparse adjacency matrix.
+        The rows of the leaf agents are built directly, without materializing the edge list, the ring edges (see
+        get_edges) are added afterwards.
+        :return: symmetric CSR matrix with one row per node.
+        """
+        nodes = get_nodes_of_agents(self.node_agent_mapping, lambda agent: isinstance(agent, LeafAgent))
+        if len(nodes) < 2:
+            return super().initialize_adjacency()
+        num_nodes = len(self.node_agent_mapping)
+        index_type = get_index_type(len(nodes) * (len(nodes) - 1))
+        indices = np.broadcast_to(nodes.astype(index_type), (len(nodes), len(nodes)))[
+            ~np.eye(len(nodes), dtype=bool)]
+        degrees = np.zeros(num_nodes, dtype=index_type)
+        degrees[nodes] = len(nodes) - 1
+        indptr = np.concatenate(([0], np.cumsum(degrees))).astype(index_type)
+        adjacency = sparse.csr_array((np.ones(len(indices), dtype=np.int8), indices, indptr),
+                                     shape=(num_nodes, num_nodes))
+        # ring edges may connect leaf agents to other agents, edges between leaf agents are merged
+        adjacency = (adjacency + build_adjacency_from_edges(num_nodes, get_ring_edges(nodes))).tocsr()
+        adjacency.sort_indices()
+        adjacency.data[:] = 1
+        return adjacency
 
     def get_description(self):
         return f'Complete Overlay Topology with {len(self.agents)} agents'
 
 
-def reduce_number_of_leaf_agents_in_graph(max_number_of_agents_per_type: int, agents: list[Agent]):
+def get_nodes_of_agents(node_agent_mapping: dict, condition) -> np.ndarray:
+    """
+    Gets nodes of all agents that fulfill the condition.
+    :param node_agent_mapping: mapping of node ids to agents.
+    :param condition: function that takes an agent and returns a bool.
+    :return: array of node ids in ascending order.
+    """
+    return np.array([idx for idx, agent in node_agent_mapping.items() if condition(agent)], dtype=np.int64)
+
+
+def get_ring_edges(nodes: np.ndarray) -> np.ndarray:
+    """
+    Generates ring edges. Each node is connected to the node with the next id,
+    the node at the end of the ring is connected to the first node.
+    :param nodes: node ids in ascending order.
+    :return: edge array of shape (number of nodes, 2).
+    """
+    if len(nodes) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    next_nodes = np.where(nodes < len(nodes) - 1, nodes + 1, nodes[0])
+    return np.column_stack((nodes, next_nodes))
+
+
+def build_graph_from_edges(num_nodes: int, edges: np.ndarray) -> nx.Graph:
+    """
+    Builds networkx graph with nodes 0, ..., num_nodes - 1 from an edge array in bulk.
+    :param num_nodes: number of nodes.
+    :param edges: edge array of shape (number of edges, 2).
+    :return: graph.
+    """
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_edges_from(edges.tolist())
+    return graph
+
+
+def get_index_type(num_entries: int):
+    """
+    Gets smallest index type SciPy accepts for sparse matrices with num_entries stored entries.
+    :param num_entries: number of stored entries.
+    :return: numpy dtype.
+    """
+    return np.int32 if num_entries < np.iinfo(np.int32).max else np.int64
+
+
+def build_adjacency_from_edges(num_nodes: int, edges: np.ndarray) -> sparse.csr_array:
+    """
+    Builds symmetric sparse adjacency matrix from an edge array. Duplicate edges are merged.
+    :param num_nodes: number of nodes.
+    :param edges: edge array of shape (number of edges, 2).
+    :return: CSR matrix of shape (num_nodes, num_nodes) with sorted indices.
+    """
+    index_type = get_index_type(2 * len(edges))
+    rows = np.concatenate((edges[:, 0], edges[:, 1])).astype(index_type)
+    cols = np.concatenate((edges[:, 1], edges[:, 0])).astype(index_type)
+    adjacency = sparse.coo_array((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(num_nodes, num_nodes))
+    adjacency = adjacency.tocsr()
+    adjacency.sum_duplicates()
+    adjacency.data[:] = 1
+    return adjacency
+
+
+def reduce_number_of_leaf_agents_in_graph(max_number_of_agents_per_type: int, agents: list[Agent],
+                                          rng: np.random.Generator = None):
+    if rng is None:
+        rng = np.random.default_rng()
+    leaf_agents_by_type = {agent_type: [] for agent_type in LeafAgent.LeafAgentType}
+    non_leaf_agents = list()
+    for agent in agents:
+        if agent.agent_type in leaf_agents_by_type:
+            leaf_agents_by_type[agent.agent_type].append(agent)
+        if not isinstance(agent, LeafAgent):
+            non_leaf_agents.append(agent)
+
     reduced_agents = list()
-    for agent_type in LeafAgent.LeafAgentType:
-        agents_of_type = [agent for agent in agents if agent.agent_type == agent_type]
+    for agents_of_type in leaf_agents_by_type.values():
         if len(agents_of_type) > max_number_of_agents_per_type:
-            reduced_agents.extend(random.sample(agents_of_type, max_number_of_agents_per_type))
+            sampled = rng.choice(len(agents_of_type), size=max_number_of_agents_per_type, replace=False)
+            reduced_agents.extend(agents_of_type[i] for i in sampled.tolist())
         else:
             reduced_agents.extend(agents_of_type)
-    reduced_agents.extend([agent for agent in agents if not isinstance(agent, LeafAgent)])
+    reduced_agents.extend(non_leaf_agents)
     return reduced_agents
 
 
 class StarCommunicationGraph(CommunicationGraph):
+    INCLUDE_ISOLATED_NODES = False
+
     def __init__(self,
                  agents: list[Agent],
                  central_agent: CentralAgent,
                  aggregator_agent=None,
-                 max_number_of_agents_per_type=None):
+                 max_number_of_agents_per_type=None,
+                 sparse_adjacency=False,
+                 rng: np.random.Generator = None):
         self.central_agent = central_agent
         self.aggregator_agent = aggregator_agent
-        super().__init__(agents, max_number_of_agents_per_type)
+        super().__init__(agents, max_number_of_agents_per_type, sparse_adjacency, rng)
 
     def initialize_graph(self) -> nx.Graph:
         """
         Initializes topology as networkx graph.
         :return: generated graph.
         """
-        central_agent_id = [key for key, value in self.node_agent_mapping.items() if value == self.central_agent][0]
-        leaf_agents = {idx: agent for idx, agent in self.node_agent_mapping.items()
-                       if isinstance(agent, LeafAgent) and agent != self.central_agent}
-
         graph = nx.Graph()
+        graph.add_edges_from(self.get_edges().tolist())
+        return graph
+
+    def get_edges(self) -> np.ndarray:
+        """
+        Generates edges from the leaf agents to the aggregator agent (and from the aggregator agent to the central agent)
+        or, without aggregator agent, from the leaf agents to the central agent.
+        :return: edge array of shape (number of edges, 2).
+        """
+        central_agent_id = [key for key, value in self.node_agent_mapping.items() if value == self.central_agent][0]
+        leaf_nodes = get_nodes_of_agents(self.node_agent_mapping,
+                                         lambda agent: isinstance(agent, LeafAgent) and agent != self.central_agent)
 
         if self.aggregator_agent:
             aggregator_id = [key for key, value in self.node_agent_mapping.items() if value == self.aggregator_agent][0]
-            graph.add_edge(central_agent_id, aggregator_id)
-
-            for l_agent_id in leaf_agents:
-                graph.add_edge(l_agent_id, aggregator_id)
-        else:
-            for l_agent_id in leaf_agents:
-                graph.add_edge(l_agent_id, central_agent_id)
-        return graph
+            hub_edges = np.array([[central_agent_id, aggregator_id]], dtype=np.int64)
+            return np.concatenate((hub_edges, np.column_stack((leaf_nodes, np.full_like(leaf_nodes, aggregator_id)))))
+        return np.column_stack((leaf_nodes, np.full_like(leaf_nodes, central_agent_id)))
 
     def get_description(self):
         return f'Star Overlay Topology with {len(self.agents)} agents'
@@ -91,6 +91,7 @@ class SimbenchNetworkDescription(CommunicationNetworkDescription, ABC):
                  technology: str, simbench_code):
         config_name = 'SimbenchNetwork'
         self.technology = technology
+        self.network_extractor = network_extractor
         network_extractor.initialize_network()
 
         self.household_agents = network_extractor.household_agents
@@ -111,6 +112,15 @@ class SimbenchNetworkDescription(CommunicationNetworkDescription, ABC):
     def get_central_agent(self):
         return self.control_center_agent
 
+    def prune_idle_agents(self, active_agent_names=None, project_directory=None):
+        """
+        Leaves agents that neither send nor receive out of the OMNeT++ network (see SimbenchNetworkExtractor).
+        :param active_agent_names: omnet names of agents that send or receive messages, None to keep all agents.
+        :param project_directory: run directory to write the network files to, the OMNeT++ project if None.
+        :return: omnet names of the pruned agents.
+        """
+        return self.network_extractor.prune_agents(active_agent_names, project_directory)
+
 
 class SimbenchLTENetworkDescription(SimbenchNetworkDescription):
     class Specification(Enum):
@@ -118,27 +128,29 @@ class SimbenchLTENetworkDescription(SimbenchNetworkDescription):
         LTE450 = 1
 
     def __init__(self, simbench_code, specification=Specification.LTE, system_state=SystemState.NORMAL,
-                 max_number_of_agents_per_type=None):
+                 max_number_of_agents_per_type=None, rng=None):
         self.system_state = system_state
         self.simbench_code = simbench_code
         network_extractor = SimbenchLTENetworkExtractor(simbench_code, system_state, specification,
-                                                        max_number_of_agents_per_type)
+                                                        max_number_of_agents_per_type, rng)
         super().__init__(network_extractor, technology=specification.name, simbench_code=simbench_code)
 
 
 class Simbench5GNetworkDescription(SimbenchNetworkDescription):
     def __init__(self, simbench_code, specification=None, system_state=SystemState.NORMAL,
-                 max_number_of_agents_per_type=None):
+                 max_number_of_agents_per_type=None, rng=None):
         self.system_state = system_state
         self.simbench_code = simbench_code
-        network_extractor = Simbench5GNetworkExtractor(simbench_code, system_state, max_number_of_agents_per_type)
+        network_extractor = Simbench5GNetworkExtractor(simbench_code, system_state, max_number_of_agents_per_type,
+                                                       rng)
         super().__init__(network_extractor, technology='5G', simbench_code=simbench_code)
 
 
 class SimbenchEthernetNetworkDescription(SimbenchNetworkDescription):
     def __init__(self, simbench_code, specification=None, system_state=SystemState.NORMAL,
-                 max_number_of_agents_per_type=None):
-        network_extractor = SimbenchEthernetNetworkExtractor(simbench_code, system_state, max_number_of_agents_per_type)
+                 max_number_of_agents_per_type=None, rng=None):
+        network_extractor = SimbenchEthernetNetworkExtractor(simbench_code, system_state, max_number_of_agents_per_type,
+                                                             rng)
         self.simbench_code = simbench_code
         self.system_state = SystemState.NORMAL
         super().__init__(network_extractor, technology='Ethernet', simbench_code=simbench_code)
@@ -3,9 +3,8 @@ Implementation of the communication scenario to generate agent communication pat
 """
 import json
 import os
+import shlex
 import shutil
-import subprocess
-import time
 import uuid
 from datetime import datetime
 from os.path import abspath
@@ -15,8 +14,14 @@ import pandas as pd
 from agent_communication_generation_tool.description_classes.communication_network_description import \
     CommunicationNetworkDescription, SimbenchNetworkDescription
 from agent_communication_generation_tool.description_classes.agent_communication_pattern import \
-    AgentCommunicationPattern, ComplexAgentCommunicationPattern
+    AgentCommunicationPattern, ComplexAgentCommunicationPattern, CompositeAgentCommunicationPattern
 from agent_communication_generation_tool.description_classes.communication_graph import CommunicationGraph
+from agent_communication_generation_tool.description_classes.omnet_build import build_omnet_project, \
+    OMNET_PROJECT_DIRECTORY, EXECUTABLE_NAME
+from agent_communication_generation_tool.description_classes.offered_load_analyzer import OfferedLoadAnalyzer
+from agent_communication_generation_tool.description_classes.random_streams import RandomStreams, RandomStream
+from agent_communication_generation_tool.description_classes.simulation_process import SimulationProcessManager, \
+    DEFAULT_SIMULATION_TIMEOUT_S
 from agent_communication_generation_tool.util import merge_input_and_output_df, plot_traffic_pattern
 
 # set inet installation path
@@ -28,30 +33,128 @@ ROOT = str(Path(abspath(__file__)).parent.parent.parent)
 class CommunicationScenarioDescription:
     """
     Description class of a scenario.
+    The scenario owns the root seed of all random streams. Pattern and data size generator are seeded with their
+    child streams before each run (see seed_random_streams). Network description and communication graph are created before the scenario, to make them
+    reproducible, create them with the NETWORK and GRAPH streams of the same RandomStreams (see random_streams.py).
     """
 
     def __init__(self,
                  description_text,
                  communication_network_description: CommunicationNetworkDescription,
                  agent_communication_pattern: AgentCommunicationPattern,
-                 communication_graph: CommunicationGraph):
+                 communication_graph: CommunicationGraph,
+                 seed=None,
+                 random_streams: RandomStreams = None,
+                 prune_idle_agents=False,
+                 max_offered_utilization=None,
+                 simulation_timeout_s=DEFAULT_SIMULATION_TIMEOUT_S):
         self.id = uuid.uuid4()
         self.description_text = description_text
         self.communication_network_description = communication_network_description
         self.agent_communication_pattern = agent_communication_pattern
         self.communication_graph = communication_graph
+        # leave agents without traffic out of the simulated network
+        self.prune_idle_agents = prune_idle_agents
+        # omnet names of the agents left out of the network of the last run (see prepare_run)
+        self.pruned_agent_names = set()
+        # skip the simulation if the offered load of a link or cell exceeds this share of its nominal capacity
+        self.max_offered_utilization = max_offered_utilization
+        # wall-clock timeout of the OMNeT++ process
+        self.simulation_timeout_s = simulation_timeout_s
+        # exit code, wall time and stderr of the last run (see SimulationProcessResult)
+        self.simulation_process_result = None
+        # path of the result csv of the last run, None if it has no result (see collect_results)
+        self.result_file_path = None
+        # run directory of the last run, None if it was not kept (see ScenarioRunner)
+        self.run_directory = None
+
+        self.random_streams = random_streams if random_streams is not None else RandomStreams(seed)
 
         self.results = dict()
 
         os.chdir(ROOT)
 
+    def seed_random_streams(self):
+        """
+        Seeds pattern and data size generator with their child streams. Data size generators may be shared by several
+        scenarios, so they are seeded right before the traffic of a run is generated (see prepare_run).
+        """
+        self.agent_communication_pattern.set_rng(self.random_streams.get_rng(RandomStream.PATTERN))
+        self.agent_communication_pattern.data_size_generator.set_rng(
+            self.random_streams.get_rng(RandomStream.DATA_SIZE))
+
+    def check_offered_load(self) -> bool:
+        """
+        Checks the offered load of the generated traffic against the nominal capacities of the network.
+        :return: True if no link or cell exceeds max_offered_utilization.
+        """
+        network_extractor = None
+        if isinstance(self.communication_network_description, SimbenchNetworkDescription):
+            network_extractor = self.communication_network_description.network_extractor
+        analyzer = OfferedLoadAnalyzer(self.agent_communication_pattern, network_extractor)
+        if analyzer.is_feasible(self.max_offered_utilization):
+            return True
+        analyzer.print_summary(self.max_offered_utilization)
+        print(f'Skip simulation {self.description_text}: offered load exceeds capacity.')
+        return False
+
     def run_simulation(self):
         """
         Generates traffic configuration files and runs OMNeT++ simulation according to definition.
+        The OMNeT++ project is shared, for concurrent runs see ScenarioRunner.
+        """
+        run = self.prepare_run()
+        if run is None:
+            return
+        command, description_df = run
+
+        print(f'Run simulation {self.description_text} '
+              f'with network {self.communication_network_description.id}.')
+        results_directory = os.path.join(OMNET_PROJECT_DIRECTORY, 'results')
+        try:
+            # delete results folder with outdated files
+            shutil.rmtree(results_directory)
+        except FileNotFoundError:
+            print('No results folder to delete.')
+        # build project (only if its sources changed)
+        build_omnet_project()
+
+        # run simulation, wait for its exit and complete result files
+        self.simulation_process_result = SimulationProcessManager(self.simulation_timeout_s).run(
+            command, OMNET_PROJECT_DIRECTORY, self.get_result_file_paths(results_directory))
+        if not self.simulation_process_result.is_successful():
+            print(f'Simulation {self.description_text} {self.simulation_process_result.get_description()}.')
+
+        self.collect_results(description_df, results_directory)
+
+    def prepare_run(self, run_directory=None):
         """
-        self.agent_communication_pattern.generate_traffic_configuration_files()
-        import pandas as pd
-        from datetime import datetime
+        Generates traffic configuration files (and network files) of a run.
+        :param run_directory: directory of the run with a copy of the omnetpp.ini (see ScenarioRunner), files are
+        written to the OMNeT++ project if None.
+        :return: OMNeT++ command (to be run in the project or run directory) and description DataFrame, None if the
+        offered load exceeds max_offered_utilization.
+        """
+        if run_directory is not None:
+            self.agent_communication_pattern.traffic_configuration_directory = (
+                os.path.join(run_directory, 'modules', 'traffic_configurations'))
+        self.seed_random_streams()
+        if self.agent_communication_pattern.skeleton is not None:
+            self.agent_communication_pattern.generate_variant_traffic_configuration_files()
+        else:
+            self.agent_communication_pattern.generate_traffic_configuration_files()
+        traffic_bundle_path = None
+        if self.agent_communication_pattern.use_traffic_bundle:
+            traffic_bundle_path = self.agent_communication_pattern.write_traffic_bundle()
+        if isinstance(self.communication_network_description, SimbenchNetworkDescription):
+            # the network description may be shared by several scenarios, None restores the complete network
+            self.pruned_agent_names = self.communication_network_description.prune_idle_agents(
+                self.agent_communication_pattern.get_active_agent_names() if self.prune_idle_agents else None,
+                run_directory)
+        if self.max_offered_utilization is not None and not self.check_offered_load():
+            return None
+        # stop the simulation once all messages and replies are delivered
+        sim_time_limit_ms = self.agent_communication_pattern.get_sim_time_limit_ms()
 
         # Assuming all the necessary information is available in your current context
         data = [
@@ -64,7 +167,9 @@ class CommunicationScenarioDescription:
             {'Parameter': 'Data size generator', 'Value': self.agent_communication_pattern.data_size_generator.get_description()},
             {'Parameter': 'Frequency', 'Value': self.agent_communication_pattern.frequency_ms},
             {'Parameter': 'Simulation duration', 'Value': self.agent_communication_pattern.simulation_duration_ms},
-            {'Parameter': 'Communication mode', 'Value': self.agent_communication_pattern.communication_mode.name}
+            {'Parameter': 'Simulation time limit', 'Value': sim_time_limit_ms},
+            {'Parameter': 'Communication mode', 'Value': self.agent_communication_pattern.communication_mode.name},
+            {'Parameter': 'Seed', 'Value': self.random_streams.seed}
         ]
 
         # Adding optional fields based on subclass checks
@@ -74,32 +179,48 @@ class CommunicationScenarioDescription:
         if issubclass(self.agent_communication_pattern.__class__, ComplexAgentCommunicationPattern):
             data.append({'Parameter': 'Organizational structure', 'Value': self.agent_communication_pattern.organizational_structure.name})
 
+        if issubclass(self.agent_communication_pattern.__class__, CompositeAgentCommunicationPattern):
+            data.append({'Parameter': 'Applications',
+                         'Value': ', '.join(f'{name} ({pattern.__class__.__name__})' for name, pattern in
+                                            self.agent_communication_pattern.patterns.items())})
+
         # Creating the DataFrame
         description_df = pd.DataFrame(data)
 
-        print(f'Run simulation {self.description_text} '
-              f'with network {self.communication_network_description.id}.')
-        os.system('killall -9 omnet_project_files')
-        time.sleep(3)
-        os.chdir(ROOT + '/omnet_project_files')
-        try:
-            # delete results folder with outdated files
-            shutil.rmtree('results')
-        except FileNotFoundError:
-            print('No results folder to delete.')
-        # build project
-        os.system("make")
-
-        # run simulation
-        command = (f"./omnet_project_files -f omnetpp.ini -c {self.communication_network_description.config_name} "
+        executable = './omnet_project_files'
+        if run_directory is not None:
+            executable = os.path.join(OMNET_PROJECT_DIRECTORY, EXECUTABLE_NAME)
+        command = (f"{executable} -f omnetpp.ini -c {self.communication_network_description.config_name} "
                    f"-n {INET_PATH} -u Cmdenv "
-                   f"--sim-time-limit={self.agent_communication_pattern.simulation_duration_ms}ms")
-        subprocess.run(command, shell=True)
+                   f"--sim-time-limit={sim_time_limit_ms}ms")
+        if traffic_bundle_path is not None:
+            # ** and [0] are glob patterns of the shell, the whole option is quoted
+            command += ' ' + shlex.quote(f'--**.app[0].trafficBundlePath="{traffic_bundle_path}"')
+        return command, description_df
 
-        time.sleep(5)
+    def get_result_file_paths(self, results_directory='results') -> list[str]:
+        """
+        Gets paths of the result files written by the agents of the simulated network.
+        :param results_directory: results folder of the OMNeT++ project or run directory.
+        :return: list of paths.
+        """
+        return [os.path.join(results_directory, f'simulation_results_{agent.omnet_name}.json')
+                for agent in self.communication_graph.agents if agent.omnet_name not in self.pruned_agent_names]
 
+    def collect_results(self, description_df: pd.DataFrame, results_directory='results'):
+        """
+        Merges inputs and outputs of a finished run and saves them (with the description) as result.
+        :param description_df: description DataFrame (see prepare_run).
+        :param results_directory: results folder of the OMNeT++ project or run directory.
+        """
+        if self.simulation_process_result is not None:
+            description_df = pd.concat([description_df, pd.DataFrame([
+                {'Parameter': 'Exit code', 'Value': self.simulation_process_result.return_code},
+                {'Parameter': 'Wall time (s)', 'Value': self.simulation_process_result.wall_time_s},
+                {'Parameter': 'Timed out', 'Value': self.simulation_process_result.timed_out}])],
+                                       ignore_index=True)
         input_df = self.agent_communication_pattern.get_inputs()
-        output_df, reply_df = self.get_outputs()
+        output_df, reply_df = self.get_outputs(results_directory)
         if isinstance(output_df, pd.DataFrame) and isinstance(input_df, pd.DataFrame):
 
             reply_df.rename({'sendingTime_ms': 'timeSend_ms'}, axis='columns', inplace=True)
@@ -109,29 +230,31 @@ class CommunicationScenarioDescription:
             if 'calculationStart_ms' in input_df.columns:
                 input_df['calculationStart_ms'] = input_df['calculationStart_ms'].fillna(0)
 
+            # replies get new message ids in OMNeT++ and cannot be assigned to an application
+            if 'application' in input_df.columns:
+                input_df['application'] = input_df['application'].fillna('reply')
+
             input_df.dropna(axis='columns', inplace=True)
             output_df.dropna(axis='columns', inplace=True)
 
             self.results = merge_input_and_output_df(input_df, output_df)
             self.results = pd.concat([description_df, self.results])
 
-            self.results.to_csv(f'{ROOT}/agent_communication_generation_tool/results/data/{self.id}.csv')
+            self.result_file_path = f'{ROOT}/agent_communication_generation_tool/results/data/{self.id}.csv'
+            self.results.to_csv(self.result_file_path)
             plot_traffic_pattern(self,
                                  self.results, f'{self.description_text}')
-        time.sleep(5)
 
-    def get_outputs(self):
+    def get_outputs(self, results_directory='results'):
         """
         Get simulation results from OMNeT++ as pandas DataFrame.
+        :param results_directory: results folder of the OMNeT++ project or run directory.
         :return: Dataframe.
         """
         dfs = []
         reply_dfs = []
-        # change to results folder
-        folder_path = "results"
-        os.chdir(folder_path)
         for agent in self.communication_graph.agents:
-            json_file_path = f'simulation_results_{agent.omnet_name}.json'
+            json_file_path = os.path.join(results_directory, f'simulation_results_{agent.omnet_name}.json')
             # Read the JSON file
             try:
                 with open(json_file_path, 'r') as file:
@@ -1,7 +1,9 @@
-import random
 from abc import ABC, abstractmethod
 from enum import Enum
 
+import numpy as np
+import pandas as pd
+
 
 class PacketSizeTrend(Enum):
     CONSTANT = 0
@@ -14,9 +16,29 @@ class DataSizeGenerator(ABC):
     def __init__(self,
                  packet_size_trend: PacketSizeTrend):
         self.packet_size_trend = packet_size_trend
+        self.rng = np.random.default_rng()
+
+    def set_rng(self, rng: np.random.Generator):
+        """
+        Sets random number generator, e.g. a child stream of the scenario seed.
+        :param rng: random number generator.
+        """
+        self.rng = rng
+
+    def get_data_size(self) -> int:
+        """
+        Draws a single data size.
+        :return: data size in byte.
+        """
+        return int(self.get_data_sizes(1)[0])
 
     @abstractmethod
-    def get_data_size(self):
+    def get_data_sizes(self, n: int) -> np.ndarray:
+        """
+        Draws n data sizes at once, in the order successive calls of get_data_size would return them.
+        :param n: number of data sizes.
+        :return: int64 array of data sizes in byte.
+        """
         pass
 
     @abstractmethod
@@ -30,8 +52,8 @@ class FixedDataSizeGenerator(DataSizeGenerator):
         super().__init__(PacketSizeTrend.CONSTANT)
         self.packet_size_byte = data_size_byte
 
-    def get_data_size(self):
-        return self.packet_size_byte
+    def get_data_sizes(self, n: int) -> np.ndarray:
+        return np.full(n, self.packet_size_byte, dtype=np.int64)
 
     def get_description(self) -> str:
         return f'Fixed data size generator with data size = {self.packet_size_byte} B'
@@ -46,11 +68,27 @@ class IncreasingInIntervalDataSizeGenerator(DataSizeGenerator):
         self.last_packet_size = lower_bound_byte
         super().__init__(PacketSizeTrend.INCREASING)
 
-    def get_data_size(self):
-        self.last_packet_size = random.randint(self.last_packet_size,
-                                               int(self.last_packet_size +
-                                                   (self.upper_bound_byte - self.last_packet_size) * 0.1))
-        return self.last_packet_size
+    def set_rng(self, rng: np.random.Generator):
+        """
+        Sets random number generator and restarts the sequence of data sizes at the lower bound.
+        :param rng: random number generator.
+        """
+        super().set_rng(rng)
+        self.last_packet_size = self.lower_bound_byte
+
+    def get_data_sizes(self, n: int) -> np.ndarray:
+        """
+        Each data size moves a uniformly drawn fraction of at most 10 % of the remaining distance towards the upper
+        bound. The remaining distance therefore shrinks by the factors (1 - 0.1 * u), which gives the whole
+        sequence as a cumulative product.
+        """
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        remaining_distance = (self.upper_bound_byte - self.last_packet_size) * np.cumprod(1 - 0.1 * self.rng.random(n))
+        data_sizes = np.floor(self.upper_bound_byte - remaining_distance).astype(np.int64)
+        data_sizes = np.maximum(data_sizes, self.last_packet_size)
+        self.last_packet_size = int(data_sizes[-1])
+        return data_sizes
 
     def get_description(self) -> str:
         return (f'Increasing data size generator with lower bound = {self.lower_bound_byte} B,'
@@ -65,9 +103,106 @@ class InIntervalDataSizeGenerator(DataSizeGenerator):
         self.upper_bound_byte = upper_bound_byte
         super().__init__(PacketSizeTrend.CONSTANT)
 
-    def get_data_size(self):
-        return random.randint(self.lower_bound_byte, self.upper_bound_byte)
+    def get_data_sizes(self, n: int) -> np.ndarray:
+        return self.rng.integers(self.lower_bound_byte, self.upper_bound_byte, endpoint=True, size=n, dtype=np.int64)
 
     def get_description(self) -> str:
         return (f'In interval data size generator with lower bound = {self.lower_bound_byte} B,'
                 f'upper bound = {self.upper_bound_byte} B')
+
+
+# Illustrative packet size histograms (payload size in byte -> relative frequency).
+# GOOSE: typical IEC 61850 GOOSE APDUs with a small to medium data set.
+# C37.118: IEEE C37.118.2 data frames of a single PMU with 4, 8 or 12 floating point phasors,
+# frequency/ROCOF and one digital word.
+EMPIRICAL_DATA_SIZE_PROFILES = {
+    'IEC_61850_GOOSE': {120: 0.15, 160: 0.35, 200: 0.3, 250: 0.15, 300: 0.05},
+    'IEEE_C37_118': {60: 0.5, 92: 0.35, 124: 0.15}
+}
+
+
+class EmpiricalDataSizeGenerator(DataSizeGenerator):
+    """
+    Draws data sizes from an empirical histogram.
+    A Walker alias table is built once, afterwards each data size is drawn with one uniform integer and one
+    uniform float, independent of the number of histogram bins.
+    """
+
+    def __init__(self,
+                 data_sizes_byte,
+                 weights,
+                 name='custom'):
+        data_sizes_byte = np.asarray(data_sizes_byte, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(data_sizes_byte) == 0 or len(data_sizes_byte) != len(weights):
+            raise ValueError('Empirical data size generator requires one weight per data size.')
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError('Weights of empirical data size generator have to be non-negative with positive sum.')
+        self.data_sizes_byte = data_sizes_byte
+        self.probabilities = weights / weights.sum()
+        self.name = name
+        self.alias_probabilities, self.aliases = build_alias_table(self.probabilities)
+        super().__init__(PacketSizeTrend.CONSTANT)
+
+    @classmethod
+    def from_profile(cls, profile_name: str):
+        """
+        Creates generator from one of the EMPIRICAL_DATA_SIZE_PROFILES.
+        :param profile_name: name of the profile.
+        :return: generator.
+        """
+        if profile_name not in EMPIRICAL_DATA_SIZE_PROFILES:
+            raise ValueError(f'Unknown data size profile {profile_name}. '
+                             f'Available profiles: {list(EMPIRICAL_DATA_SIZE_PROFILES.keys())}')
+        histogram = EMPIRICAL_DATA_SIZE_PROFILES[profile_name]
+        return cls(list(histogram.keys()), list(histogram.values()), name=profile_name)
+
+    @classmethod
+    def from_csv(cls, file_path: str, column='packetSize_B_x'):
+        """
+        Creates generator from the packet sizes in a results file (as written by the scenario description)
+        or any other csv file with a packet size column.
+        :param file_path: path of csv file.
+        :param column: name of the packet size column, falls back to 'packetSize_B'.
+        :return: generator.
+        """
+        df = pd.read_csv(file_path)
+        if column not in df.columns:
+            column = 'packetSize_B'
+        counts = df[column].dropna().astype(np.int64).value_counts().sort_index()
+        return cls(counts.index.to_numpy(), counts.to_numpy(), name=str(file_path))
+
+    def get_data_sizes(self, n: int) -> np.ndarray:
+        bins = self.rng.integers(0, len(self.data_sizes_byte), size=n)
+        use_alias = self.rng.random(n) >= self.alias_probabilities[bins]
+        return self.data_sizes_byte[np.where(use_alias, self.aliases[bins], bins)]
+
+    def get_description(self) -> str:
+        return (f'Empirical data size generator ({self.name}) with {len(self.data_sizes_byte)} data sizes between '
+                f'{self.data_sizes_byte.min()} B and {self.data_sizes_byte.max()} B')
+
+
+def build_alias_table(probabilities: np.ndarray):
+    """
+    Builds alias table with Vose's method.
+    :param probabilities: probabilities that sum up to one.
+    :return: tuple of probability of keeping each bin and alias of each bin.
+    """
+    num_bins = len(probabilities)
+    scaled = probabilities * num_bins
+    alias_probabilities = np.ones(num_bins)
+    aliases = np.arange(num_bins)
+    small = [i for i in range(num_bins) if scaled[i] < 1]
+    large = [i for i in range(num_bins) if scaled[i] >= 1]
+    while small and large:
+        small_bin = small.pop()
+        large_bin = large.pop()
+        alias_probabilities[small_bin] = scaled[small_bin]
+        aliases[small_bin] = large_bin
+        scaled[large_bin] -= 1 - scaled[small_bin]
+        if scaled[large_bin] < 1:
+            small.append(large_bin)
+        else:
+            large.append(large_bin)
+    # remaining bins are full up to rounding errors
+    return alias_probabilities, aliases
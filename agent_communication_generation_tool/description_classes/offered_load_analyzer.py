@@ -0,0 +1,263 @@
+"""
+Pre-flight analysis of the offered load of generated traffic, before running OMNeT++.
+
+The topology is taken from the network extractor (see simbench_network_extractor.py):
+    - agents connected by a wired link (central agents, Ethernet agents) load this link,
+    - Ethernet agents additionally load the link of their router cluster to the central router,
+    - agents without a wired link are associated with the nearest gNB/eNB cell.
+A message loads the elements on the path from the sender up to the core and from the core down to the receiver.
+Links shared by both paths (both agents in one router cluster) are not traversed. Replies are sent back by the
+receiver after replyAfter_ms with the size of the request (see TrafficApp).
+"""
+import numpy as np
+import pandas as pd
+
+from agent_communication_generation_tool.description_classes.agent import Agent, CentralAgent
+from agent_communication_generation_tool.description_classes.agent_communication_pattern import \
+    AgentCommunicationPattern
+
+# nominal capacity of links per direction (full duplex)
+LINK_CAPACITY_MBPS = {
+    'Eth10M': 10,
+    'Eth100M': 100,
+    'Eth1G': 1000,
+    'Eth10G': 10000,
+    'Eth100G': 100000
+}
+
+# rough nominal capacity of one cell per direction, for the configurations of omnetpp.ini
+CELL_CAPACITY_MBPS = {
+    '5G': 40,  # 50 resource blocks
+    'LTE': 4,  # 6 resource blocks
+    'LTE450': 4  # 6 resource blocks
+}
+
+CELL_CLASS_NAMES = ['gNodeB', 'eNodeB']
+
+
+def get_node_name(node) -> str:
+    return node.omnet_name if isinstance(node, Agent) else node.identifier
+
+
+class OfferedLoadAnalyzer:
+    """
+    Computes messages/s and bytes/s per agent, per cell, per router cluster and per central uplink in windows of the
+    simulation time, and flags elements whose offered load exceeds the nominal capacity.
+    Element types:
+        - agent: load sent (direction 'up') and received (direction 'down') by an agent,
+        - cell: uplink and downlink load of a gNB/eNB cell,
+        - cluster: load on the link between the router of an Ethernet cluster and the central router,
+        - central_uplink: load on the link of a central agent,
+        - access_link: load on the link of a non-central wired agent.
+    """
+
+    ELEMENT_TYPES = ['agent', 'cell', 'cluster', 'central_uplink', 'access_link']
+
+    def __init__(self, agent_communication_pattern: AgentCommunicationPattern, network_extractor=None,
+                 window_ms=1000, cell_capacity_mbps=None):
+        """
+        :param agent_communication_pattern: pattern with generated traffic configurations.
+        :param network_extractor: SimbenchNetworkExtractor of the network, only agents are analyzed if None.
+        :param window_ms: length of the windows in ms.
+        :param cell_capacity_mbps: nominal capacity of a cell per direction, taken from CELL_CAPACITY_MBPS if None.
+        """
+        if window_ms <= 0:
+            raise ValueError('Window length has to be positive.')
+        self.agent_communication_pattern = agent_communication_pattern
+        self.network_extractor = network_extractor
+        self.window_ms = window_ms
+        self.cell_capacity_mbps = cell_capacity_mbps
+
+        # elements on the path from an agent up to the core, ordered from the agent to the core
+        self.agent_paths = {}
+        self.element_types = {}
+        self.element_capacities_mbps = {}
+        self.load = None
+        if network_extractor is not None:
+            self.build_agent_paths()
+
+    def get_cell_capacity_mbps(self, cell) -> float:
+        if self.cell_capacity_mbps is not None:
+            return self.cell_capacity_mbps
+        if cell.class_name == 'gNodeB':
+            return CELL_CAPACITY_MBPS['5G']
+        specification = getattr(self.network_extractor, 'specification', None)
+        return CELL_CAPACITY_MBPS.get(specification.name if specification is not None else 'LTE', np.nan)
+
+    def add_element(self, name: str, element_type: str, capacity_mbps: float):
+        self.element_types[name] = element_type
+        self.element_capacities_mbps[name] = capacity_mbps
+
+    def build_agent_paths(self):
+        """
+        Derives the path of every agent up to the core from the connections of the network extractor.
+        """
+        connections = self.network_extractor.get_simulated_connections()
+        agent_links = {}
+        cluster_links = {}
+        for connection in connections:
+            node_1 = connection.connector_1[0]
+            node_2 = connection.connector_2[0]
+            link_name = f'{get_node_name(node_1)}<->{get_node_name(node_2)}'
+            if isinstance(node_1, Agent) != isinstance(node_2, Agent):
+                agent, infrastructure = (node_1, node_2) if isinstance(node_1, Agent) else (node_2, node_1)
+                agent_links[agent.omnet_name] = (link_name, infrastructure.identifier, connection.conn_type)
+            elif not isinstance(node_1, Agent) and node_1.class_name == 'Router' == node_2.class_name:
+                # link of a cluster router to the central router
+                router = node_1 if node_2.identifier == 'router_central' else node_2
+                cluster_links[router.identifier] = (link_name, connection.conn_type)
+
+        cells = [infrastructure for infrastructure in self.network_extractor.communication_infrastructure
+                 if infrastructure.class_name in CELL_CLASS_NAMES]
+        cell_positions = np.array([cell.position for cell in cells], dtype=float).reshape(-1, 2)
+        for cell in cells:
+            self.add_element(cell.identifier, 'cell', self.get_cell_capacity_mbps(cell))
+
+        for agent in self.network_extractor.get_simulated_agents():
+            path = []
+            if agent.omnet_name in agent_links:
+                link_name, router_name, conn_type = agent_links[agent.omnet_name]
+                self.add_element(link_name, 'central_uplink' if isinstance(agent, CentralAgent) else 'access_link',
+                                 LINK_CAPACITY_MBPS.get(conn_type, np.nan))
+                path.append(link_name)
+                if router_name in cluster_links:
+                    cluster_link_name, cluster_conn_type = cluster_links[router_name]
+                    self.add_element(cluster_link_name, 'cluster', LINK_CAPACITY_MBPS.get(cluster_conn_type, np.nan))
+                    path.append(cluster_link_name)
+            elif len(cells) > 0:
+                # dynamic cell association, approximated by the nearest cell
+                distances = np.linalg.norm(cell_positions - np.array(agent.coordinates, dtype=float), axis=1)
+                path.append(cells[int(np.argmin(distances))].identifier)
+            self.agent_paths[agent.omnet_name] = path
+
+    def get_path(self, sender: str, receiver: str) -> list[tuple[str, str]]:
+        """
+        Gets elements traversed by a message, links shared by both paths are not traversed.
+        :param sender: omnet name of the sender.
+        :param receiver: omnet name of the receiver.
+        :return: list of (element, direction).
+        """
+        up = self.agent_paths.get(sender, [])
+        down = self.agent_paths.get(receiver, [])
+        num_shared = 0
+        while (num_shared < min(len(up), len(down)) and up[-1 - num_shared] == down[-1 - num_shared]
+               and self.element_types[up[-1 - num_shared]] != 'cell'):
+            num_shared += 1
+        up = up[:len(up) - num_shared]
+        down = down[:len(down) - num_shared]
+        return ([(sender, 'up')] + [(element, 'up') for element in up] +
+                [(element, 'down') for element in down] + [(receiver, 'down')])
+
+    def aggregate_chunk(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aggregates messages and replies of a chunk of inputs per (sender, receiver, window).
+        """
+        sender = df['sender'].to_numpy()
+        receiver = df['receiver'].to_numpy()
+        time_send_ms = df['timeSend_ms'].to_numpy(dtype=np.int64)
+        packet_size_b = df['packetSize_B'].to_numpy(dtype=np.int64)
+        if 'reply' in df.columns:
+            reply = df['reply'].fillna(False).to_numpy(dtype=bool)
+            reply_after_ms = df['replyAfter_ms'].fillna(0).to_numpy(dtype=np.int64)[reply]
+            # replies travel back from the receiver to the sender
+            sender, receiver = (np.concatenate((sender, receiver[reply])),
+                                np.concatenate((receiver, sender[reply])))
+            time_send_ms = np.concatenate((time_send_ms, time_send_ms[reply] + reply_after_ms))
+            packet_size_b = np.concatenate((packet_size_b, packet_size_b[reply]))
+        messages = pd.DataFrame({'sender': sender,
+                                 'receiver': receiver,
+                                 'window': time_send_ms // self.window_ms,
+                                 'messages': 1,
+                                 'bytes': packet_size_b})
+        return messages.groupby(['sender', 'receiver', 'window'], sort=False).sum().reset_index()
+
+    def analyze(self) -> pd.DataFrame:
+        """
+        Computes the offered load per element, direction and window. Windows without load are omitted.
+        :return: DataFrame with columns element, element_type, direction, window_start_ms, messages_per_s,
+        bytes_per_s, load_mbps, capacity_mbps, utilization.
+        """
+        chunks = [self.aggregate_chunk(df) for df in self.agent_communication_pattern.iter_inputs()]
+        columns = ['element', 'element_type', 'direction', 'window_start_ms', 'messages_per_s', 'bytes_per_s',
+                   'load_mbps', 'capacity_mbps', 'utilization']
+        if len(chunks) == 0:
+            self.load = pd.DataFrame(columns=columns)
+            return self.load
+        pairs = pd.concat(chunks).groupby(['sender', 'receiver', 'window'], sort=False).sum().reset_index()
+
+        # expand each (sender, receiver) pair into the elements on its path
+        unique_pairs = pairs[['sender', 'receiver']].drop_duplicates()
+        paths = [(sender, receiver, element, direction)
+                 for sender, receiver in zip(unique_pairs['sender'], unique_pairs['receiver'])
+                 for element, direction in self.get_path(sender, receiver)]
+        paths = pd.DataFrame(paths, columns=['sender', 'receiver', 'element', 'direction'])
+        load = (pairs.merge(paths, on=['sender', 'receiver'])
+                .groupby(['element', 'direction', 'window'])[['messages', 'bytes']].sum().reset_index())
+
+        window_s = self.window_ms / 1000
+        load['element_type'] = load['element'].map(self.element_types).fillna('agent')
+        load['window_start_ms'] = load['window'] * self.window_ms
+        load['messages_per_s'] = load['messages'] / window_s
+        load['bytes_per_s'] = load['bytes'] / window_s
+        # payload only, headers of the protocol stack are not included
+        load['load_mbps'] = load['bytes_per_s'] * 8 / 1e6
+        load['capacity_mbps'] = load['element'].map(self.element_capacities_mbps).astype(float)
+        load['utilization'] = load['load_mbps'] / load['capacity_mbps']
+        self.load = load[columns].sort_values(['element_type', 'element', 'direction', 'window_start_ms'],
+                                              ignore_index=True)
+        return self.load
+
+    def get_load(self) -> pd.DataFrame:
+        if self.load is None:
+            self.analyze()
+        return self.load
+
+    def get_peak_windows(self, element_type=None) -> pd.DataFrame:
+        """
+        Gets the window with the highest load per element and direction.
+        :param element_type: type of elements (see ELEMENT_TYPES), all types if None.
+        :return: DataFrame in the layout of analyze, one row per element and direction.
+        """
+        load = self.get_load()
+        if element_type is not None:
+            if element_type not in self.ELEMENT_TYPES:
+                raise ValueError(f'Unknown element type {element_type}.')
+            load = load[load['element_type'] == element_type]
+        if len(load) == 0:
+            return load
+        peaks = load.loc[load.groupby(['element', 'direction'])['bytes_per_s'].idxmax()]
+        return peaks.sort_values('load_mbps', ascending=False, ignore_index=True)
+
+    def get_overloaded_elements(self, max_utilization=1.0) -> pd.DataFrame:
+        """
+        Gets peak windows of links and cells whose offered load exceeds the nominal capacity.
+        :param max_utilization: share of the capacity above which an element is flagged.
+        :return: DataFrame in the layout of analyze.
+        """
+        peaks = self.get_peak_windows()
+        return peaks[peaks['utilization'] > max_utilization].reset_index(drop=True)
+
+    def is_feasible(self, max_utilization=1.0) -> bool:
+        return len(self.get_overloaded_elements(max_utilization)) == 0
+
+    def print_summary(self, max_utilization=1.0, num_peaks=5):
+        """
+        Prints peak windows of each element type and overloaded elements.
+        :param max_utilization: share of the capacity above which an element is flagged.
+        :param num_peaks: number of peak windows printed per element type.
+        """
+        print(f'Offered load in windows of {self.window_ms} ms:')
+        for element_type in self.ELEMENT_TYPES:
+            peaks = self.get_peak_windows(element_type)
+            if len(peaks) == 0:
+                continue
+            print(f'{element_type}:')
+            for row in peaks.head(num_peaks).itertuples():
+                print(f'\t{row.element} ({row.direction}) at {row.window_start_ms} ms: '
+                      f'{row.messages_per_s:.1f} msg/s, {row.bytes_per_s:.0f} B/s, {row.load_mbps:.3f} Mbps'
+                      + (f' ({row.utilization:.0%} of {row.capacity_mbps:g} Mbps)'
+                         if not np.isnan(row.capacity_mbps) else ''))
+        overloaded = self.get_overloaded_elements(max_utilization)
+        for row in overloaded.itertuples():
+            print(f'Offered load of {row.element} ({row.direction}) exceeds capacity at {row.window_start_ms} ms: '
+                  f'{row.load_mbps:.3f} Mbps > {max_utilization * row.capacity_mbps:g} Mbps.')
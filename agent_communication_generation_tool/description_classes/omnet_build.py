@@ -0,0 +1,75 @@
+"""
+Build-once cache of the OMNeT++ project binary.
+The C++ sources, message definitions and the Makefile of the project are fingerprinted, make is only run if the
+fingerprint differs from the fingerprint of the last successful build. The build step is protected by a file lock, so
+concurrent runners (also in other processes) share one build.
+"""
+import fcntl
+import glob
+import hashlib
+import os
+import subprocess
+from os.path import abspath
+from pathlib import Path
+
+OMNET_PROJECT_DIRECTORY = str(Path(abspath(__file__)).parent.parent.parent / 'omnet_project_files')
+EXECUTABLE_NAME = 'omnet_project_files'
+FINGERPRINT_FILE_NAME = '.build_fingerprint'
+LOCK_FILE_NAME = '.build.lock'
+SOURCE_FILE_PATTERNS = ['Makefile', '**/*.cc', '**/*.h', '**/*.hpp', '**/*.msg']
+# folders without sources of the binary (build output and run directories)
+EXCLUDED_FOLDERS = ['out', 'runs', 'results']
+
+
+def get_source_fingerprint(project_directory=OMNET_PROJECT_DIRECTORY) -> str:
+    """
+    Computes fingerprint of the sources of the OMNeT++ project (paths and contents).
+    :param project_directory: directory of the OMNeT++ project.
+    :return: sha256 hex digest.
+    """
+    file_paths = set()
+    for pattern in SOURCE_FILE_PATTERNS:
+        file_paths.update(os.path.relpath(file_path, project_directory)
+                          for file_path in glob.glob(os.path.join(project_directory, pattern), recursive=True))
+    fingerprint = hashlib.sha256()
+    for file_path in sorted(file_paths):
+        if Path(file_path).parts[0] in EXCLUDED_FOLDERS:
+            continue
+        fingerprint.update(file_path.encode('utf-8') + b'\0')
+        with open(os.path.join(project_directory, file_path), 'rb') as f:
+            fingerprint.update(hashlib.sha256(f.read()).digest())
+    return fingerprint.hexdigest()
+
+
+def build_omnet_project(project_directory=OMNET_PROJECT_DIRECTORY) -> bool:
+    """
+    Builds the OMNeT++ project if its sources changed since the last successful build.
+    :param project_directory: directory of the OMNeT++ project.
+    :return: True if make was run, False if the cached binary is up to date.
+    """
+    fingerprint_file_path = os.path.join(project_directory, FINGERPRINT_FILE_NAME)
+    with open(os.path.join(project_directory, LOCK_FILE_NAME), 'w') as lock_file:
+        # wait for builds of other runners
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            fingerprint = get_source_fingerprint(project_directory)
+            if os.path.isfile(os.path.join(project_directory, EXECUTABLE_NAME)):
+                try:
+                    with open(fingerprint_file_path, 'r') as f:
+                        if f.read().strip() == fingerprint:
+                            return False
+                except FileNotFoundError:
+                    pass
+
+            print(f'Build OMNeT++ project in {project_directory}.')
+            result = subprocess.run(['make'], cwd=project_directory)
+            if result.returncode != 0:
+                raise RuntimeError(f'Build of the OMNeT++ project failed with exit code {result.returncode}.')
+            # make may regenerate sources (e.g. from message definitions), fingerprint the state after the build
+            temporary_file_path = fingerprint_file_path + '.tmp'
+            with open(temporary_file_path, 'w') as f:
+                f.write(get_source_fingerprint(project_directory))
+            os.replace(temporary_file_path, fingerprint_file_path)
+            return True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
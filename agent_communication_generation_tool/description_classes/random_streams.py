@@ -0,0 +1,46 @@
+"""
+Seeding of the random number generators of a scenario.
+"""
+from enum import Enum
+
+import numpy as np
+
+
+class RandomStream(Enum):
+    """
+    Independent random streams of a scenario.
+    """
+    NETWORK = 0
+    GRAPH = 1
+    PATTERN = 2
+    DATA_SIZE = 3
+
+
+class RandomStreams:
+    """
+    Root SeedSequence of a scenario. Child streams are derived from the root entropy and a spawn key
+    (stream and optional further keys, e.g. a shard index). The same stream therefore always yields the same numbers,
+    independent of the order in which streams are requested or of the process they are requested in.
+    """
+
+    def __init__(self, seed=None):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+
+    def get_seed_sequence(self, stream: RandomStream, *keys: int) -> np.random.SeedSequence:
+        """
+        Gets seed sequence of child stream.
+        :param stream: random stream.
+        :param keys: further spawn keys to derive sub-streams.
+        :return: seed sequence.
+        """
+        return np.random.SeedSequence(self.seed, spawn_key=(stream.value,) + tuple(keys))
+
+    def get_rng(self, stream: RandomStream, *keys: int) -> np.random.Generator:
+        """
+        Gets new random number generator of child stream.
+        :param stream: random stream.
+        :param keys: further spawn keys to derive sub-streams.
+        :return: random number generator.
+        """
+        return np.random.default_rng(self.get_seed_sequence(stream, *keys))
@@ -0,0 +1,178 @@
+"""
+Concurrent runs of scenarios, each in its own run directory.
+"""
+import asyncio
+import glob
+import os
+import re
+import shutil
+import traceback
+
+from agent_communication_generation_tool.description_classes.campaign_queue import CampaignQueue
+from agent_communication_generation_tool.description_classes.communication_scenario_description import \
+    CommunicationScenarioDescription
+from agent_communication_generation_tool.description_classes.omnet_build import OMNET_PROJECT_DIRECTORY, \
+    build_omnet_project
+from agent_communication_generation_tool.description_classes.simulation_process import SimulationProcessManager
+
+RUNS_DIRECTORY = os.path.join(OMNET_PROJECT_DIRECTORY, 'runs')
+LOG_FILE_NAME = 'omnet.log'
+
+
+def rewrite_ned_path(ini_file_path: str, run_directory: str):
+    """
+    Makes the folders of the ned-path in the copy of the omnetpp.ini absolute. If network files were written to the
+    run directory, its networks folder replaces the networks folder of the project.
+    :param ini_file_path: path of the omnetpp.ini in the run directory.
+    :param run_directory: run directory.
+    """
+    def replace_folders(match):
+        folders = []
+        for folder in match.group(2).split(';'):
+            folder = folder.strip()
+            if folder == 'networks' and os.path.isdir(os.path.join(run_directory, 'networks')):
+                folders.append(os.path.join(run_directory, 'networks'))
+            else:
+                folders.append(os.path.normpath(os.path.join(OMNET_PROJECT_DIRECTORY, folder)))
+        return match.group(1) + ';'.join(folders)
+
+    with open(ini_file_path, 'r') as f:
+        content = f.read()
+    content = re.sub(r'^(ned-path\s*=\s*)(.*)$', replace_folders, content, flags=re.MULTILINE)
+    with open(ini_file_path, 'w') as f:
+        f.write(content)
+
+
+class ScenarioRunner:
+    """
+    Runs scenarios concurrently. Each run gets its own run directory (omnet_project_files/runs/<scenario id>) with a
+    copy of the omnetpp.ini, its network files, traffic configurations and results. OMNeT++ is started in the run
+    directory, so runs do not share any files except the executable.
+    Traffic generation and collection of results take place in this process, at most max_concurrent_runs OMNeT++
+    processes run at the same time.
+    """
+
+    def __init__(self, scenarios: list[CommunicationScenarioDescription], max_concurrent_runs=None,
+                 keep_run_directories=False):
+        """
+        :param scenarios: scenarios to run.
+        :param max_concurrent_runs: maximal number of concurrent OMNeT++ processes, number of cores if None.
+        :param keep_run_directories: whether to keep run directories of successful runs (directories of failed runs
+        are always kept).
+        """
+        self.scenarios = scenarios
+        self.max_concurrent_runs = max_concurrent_runs if max_concurrent_runs is not None else os.cpu_count()
+        self.keep_run_directories = keep_run_directories
+        # exit code, wall time and stderr of the OMNeT++ processes by scenario id
+        self.simulation_process_results = {}
+
+    def run(self):
+        """
+        Builds the OMNeT++ project (if its sources changed) and runs all scenarios.
+        """
+        build_omnet_project()
+        asyncio.run(self.run_scenarios())
+
+    async def run_scenarios(self):
+        semaphore = asyncio.Semaphore(self.max_concurrent_runs)
+        await asyncio.gather(*[self.run_scenario(scenario, semaphore) for scenario in self.scenarios])
+
+    def create_run_directory(self, scenario: CommunicationScenarioDescription) -> str:
+        """
+        Creates an empty run directory with a copy of the omnetpp.ini and links to the xml files of the project.
+        :param scenario: scenario of the run.
+        :return: path of the run directory.
+        """
+        run_directory = os.path.join(RUNS_DIRECTORY, str(scenario.id))
+        shutil.rmtree(run_directory, ignore_errors=True)
+        os.makedirs(os.path.join(run_directory, 'results'))
+        shutil.copy(os.path.join(OMNET_PROJECT_DIRECTORY, 'omnetpp.ini'), run_directory)
+        for file_path in glob.glob(os.path.join(OMNET_PROJECT_DIRECTORY, '*.xml')):
+            os.symlink(file_path, os.path.join(run_directory, os.path.basename(file_path)))
+        return run_directory
+
+    async def run_scenario(self, scenario: CommunicationScenarioDescription, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            run_directory = self.create_run_directory(scenario)
+            scenario.run_directory = run_directory
+            run = scenario.prepare_run(run_directory)
+            if run is None:
+                shutil.rmtree(run_directory)
+                scenario.run_directory = None
+                return
+            command, description_df = run
+            rewrite_ned_path(os.path.join(run_directory, 'omnetpp.ini'), run_directory)
+
+            print(f'Run simulation {scenario.description_text} '
+                  f'with network {scenario.communication_network_description.id} in {run_directory}.')
+            results_directory = os.path.join(run_directory, 'results')
+            with open(os.path.join(run_directory, LOG_FILE_NAME), 'w') as log:
+                result = await SimulationProcessManager(scenario.simulation_timeout_s).run_async(
+                    command, run_directory, scenario.get_result_file_paths(results_directory), stdout=log)
+        scenario.simulation_process_result = result
+        self.simulation_process_results[scenario.id] = result
+
+        scenario.collect_results(description_df, results_directory)
+        if not result.is_successful():
+            print(f'Simulation {scenario.description_text} {result.get_description()}, '
+                  f'see {os.path.join(run_directory, LOG_FILE_NAME)}.')
+            if result.stderr:
+                print(result.stderr)
+        elif not self.keep_run_directories:
+            shutil.rmtree(run_directory)
+            scenario.run_directory = None
+
+
+class CampaignWorker(ScenarioRunner):
+    """
+    Drains a campaign queue: claims jobs, creates their scenarios and runs them like the ScenarioRunner (at most
+    max_concurrent_runs concurrent OMNeT++ processes). Several workers (processes) may drain the same queue.
+    """
+
+    def __init__(self, campaign_queue: CampaignQueue, create_scenario, max_concurrent_runs=None,
+                 keep_run_directories=False):
+        """
+        :param campaign_queue: queue of the campaign.
+        :param create_scenario: function that creates the scenario of an entry of the queue.
+        :param max_concurrent_runs: maximal number of concurrent OMNeT++ processes, number of cores if None.
+        :param keep_run_directories: whether to keep run directories of successful runs.
+        """
+        super().__init__([], max_concurrent_runs, keep_run_directories)
+        self.campaign_queue = campaign_queue
+        self.create_scenario = create_scenario
+
+    async def run_scenarios(self):
+        recovered_jobs = self.campaign_queue.recover_jobs()
+        if recovered_jobs > 0:
+            print(f'Returned {recovered_jobs} jobs of crashed workers to the queue.')
+        semaphore = asyncio.Semaphore(self.max_concurrent_runs)
+        await asyncio.gather(*[self.run_jobs(semaphore) for _ in range(self.max_concurrent_runs)])
+        self.campaign_queue.print_summary()
+
+    async def run_jobs(self, semaphore: asyncio.Semaphore):
+        while True:
+            job = self.campaign_queue.claim_job()
+            if job is None:
+                return
+            fingerprint, entry = job
+            error = None
+            scenario = None
+            try:
+                scenario = self.create_scenario(entry)
+                await self.run_scenario(scenario, semaphore)
+                result = scenario.simulation_process_result
+                # scenarios with too high offered load are skipped without result
+                if result is not None and not result.is_successful():
+                    error = f'{result.get_description()}\n{result.stderr}'
+            except Exception:
+                error = traceback.format_exc()
+                print(f'Job {fingerprint} failed:\n{error}')
+            except BaseException:
+                # interrupted runs (KeyboardInterrupt, cancelled tasks) do not use up the retry budget of the job
+                self.campaign_queue.release_job(fingerprint)
+                raise
+            if scenario is None:
+                self.campaign_queue.complete_job(fingerprint, error)
+            else:
+                self.campaign_queue.complete_job(fingerprint, error, scenario.id, scenario.result_file_path,
+                                                 scenario.run_directory)
@@ -0,0 +1,154 @@
+"""
+Lifecycle of OMNeT++ processes: start in an own process group, wait for the exit (with wall-clock timeout), check that
+the result files are complete and record exit code, wall time and stderr.
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import time
+
+# runs are killed after this wall time
+DEFAULT_SIMULATION_TIMEOUT_S = 12 * 3600
+# time to wait for result files that are not complete directly after the exit of a successful run
+RESULT_FILE_WAIT_S = 2
+# number of characters of stderr that are kept
+MAX_STDERR_LENGTH = 10000
+
+
+def is_complete_result_file(file_path: str) -> bool:
+    """
+    Checks whether a json result file is completely written (ends with a closing bracket).
+    :param file_path: path of the result file.
+    :return: bool.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - 64, 0))
+            end = f.read().rstrip()
+    except OSError:
+        return False
+    return end.endswith(b']') or end.endswith(b'}')
+
+
+def kill_process_group(pid: int):
+    """
+    Kills the process group of a process started with start_new_session (the shell and the OMNeT++ process).
+    :param pid: process id of the group leader.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class SimulationProcessResult:
+    """
+    Record of a finished OMNeT++ process.
+    """
+
+    def __init__(self, command: str, return_code: int, wall_time_s: float, stderr: str, timed_out: bool,
+                 incomplete_result_files: list[str]):
+        self.command = command
+        self.return_code = return_code
+        self.wall_time_s = wall_time_s
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.incomplete_result_files = incomplete_result_files
+
+    def is_successful(self) -> bool:
+        return self.return_code == 0 and not self.timed_out and len(self.incomplete_result_files) == 0
+
+    def get_description(self) -> str:
+        if self.timed_out:
+            return f'timed out after {self.wall_time_s:.1f} s'
+        description = f'exit code {self.return_code} after {self.wall_time_s:.1f} s'
+        if len(self.incomplete_result_files) > 0:
+            description += f', {len(self.incomplete_result_files)} incomplete result files'
+        return description
+
+
+class SimulationProcessManager:
+    """
+    Runs OMNeT++ commands in an own process group. Instead of fixed sleeps, the manager waits for the exit of the
+    process and for complete result files. On timeout, only the own process group is killed.
+    """
+
+    def __init__(self, timeout_s=DEFAULT_SIMULATION_TIMEOUT_S, result_file_wait_s=RESULT_FILE_WAIT_S):
+        """
+        :param timeout_s: wall-clock timeout of a run in seconds, no timeout if None.
+        :param result_file_wait_s: time to wait for incomplete result files after a successful run.
+        """
+        self.timeout_s = timeout_s
+        self.result_file_wait_s = result_file_wait_s
+
+    def run(self, command: str, cwd: str, result_file_paths=(), stdout=None) -> SimulationProcessResult:
+        """
+        Runs a command and waits for its exit.
+        :param command: shell command.
+        :param cwd: working directory of the process.
+        :param result_file_paths: result files that have to be complete after the run.
+        :param stdout: file for stdout, inherited if None.
+        :return: result of the run.
+        """
+        start_time = time.monotonic()
+        process = subprocess.Popen(command, shell=True, cwd=cwd, stdout=stdout, stderr=subprocess.PIPE,
+                                   start_new_session=True)
+        timed_out = False
+        try:
+            _, stderr = process.communicate(timeout=self.timeout_s)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            kill_process_group(process.pid)
+            _, stderr = process.communicate()
+        # remaining child processes of the shell
+        kill_process_group(process.pid)
+        wall_time_s = time.monotonic() - start_time
+
+        incomplete_result_files = self.get_incomplete_result_files(result_file_paths)
+        if process.returncode == 0 and not timed_out:
+            deadline = time.monotonic() + self.result_file_wait_s
+            while len(incomplete_result_files) > 0 and time.monotonic() < deadline:
+                time.sleep(0.1)
+                incomplete_result_files = self.get_incomplete_result_files(incomplete_result_files)
+        return self.create_result(command, process.returncode, wall_time_s, stderr, timed_out,
+                                  incomplete_result_files)
+
+    async def run_async(self, command: str, cwd: str, result_file_paths=(), stdout=None) -> SimulationProcessResult:
+        """
+        Runs a command and waits for its exit without blocking the event loop (see run).
+        """
+        start_time = time.monotonic()
+        process = await asyncio.create_subprocess_shell(command, cwd=cwd, stdout=stdout,
+                                                        stderr=asyncio.subprocess.PIPE, start_new_session=True)
+        stderr_task = asyncio.create_task(process.stderr.read())
+        timed_out = False
+        try:
+            await asyncio.wait_for(process.wait(), self.timeout_s)
+        except asyncio.TimeoutError:
+            timed_out = True
+            kill_process_group(process.pid)
+            await process.wait()
+        kill_process_group(process.pid)
+        stderr = await stderr_task
+        wall_time_s = time.monotonic() - start_time
+
+        incomplete_result_files = self.get_incomplete_result_files(result_file_paths)
+        if process.returncode == 0 and not timed_out:
+            deadline = time.monotonic() + self.result_file_wait_s
+            while len(incomplete_result_files) > 0 and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+                incomplete_result_files = self.get_incomplete_result_files(incomplete_result_files)
+        return self.create_result(command, process.returncode, wall_time_s, stderr, timed_out,
+                                  incomplete_result_files)
+
+    @staticmethod
+    def get_incomplete_result_files(result_file_paths) -> list[str]:
+        return [file_path for file_path in result_file_paths if not is_complete_result_file(file_path)]
+
+    @staticmethod
+    def create_result(command, return_code, wall_time_s, stderr: bytes, timed_out,
+                      incomplete_result_files) -> SimulationProcessResult:
+        stderr = stderr.decode('utf-8', errors='replace')[-MAX_STDERR_LENGTH:]
+        return SimulationProcessResult(command, return_code, wall_time_s, stderr, timed_out, incomplete_result_files)
@@ -0,0 +1,158 @@
+"""
+Packed binary bundle of the traffic configurations of all agents of a scenario.
+
+Layout (all values little-endian):
+    header      magic 'TRCB', version (uint32), number of agents (uint32), record size (uint32),
+                offset of the first record in bytes (uint64)
+    index       per agent: offset of the name in the name table (uint32), length of the name (uint32),
+                index of the first record of the agent (uint64), number of records of the agent (uint64)
+    name table  utf-8 encoded agent names, padded to a multiple of 8 bytes
+    records     fixed-width message records (RECORD_TYPE), grouped by sender
+
+Receivers are stored as index into the agent table. The TrafficApp reads the bundle if the parameter
+trafficBundlePath is set.
+"""
+import numpy as np
+import pandas as pd
+
+from agent_communication_generation_tool.description_classes.traffic_configuration import TrafficConfiguration
+
+MAGIC = b'TRCB'
+VERSION = 1
+HEADER_TYPE = np.dtype([('magic', 'S4'), ('version', '<u4'), ('num_agents', '<u4'), ('record_size', '<u4'),
+                        ('records_offset', '<u8')])
+INDEX_TYPE = np.dtype([('name_offset', '<u4'), ('name_length', '<u4'), ('first_record', '<u8'),
+                       ('num_records', '<u8')])
+RECORD_TYPE = np.dtype([('msgId', '<i4'), ('timeSend_ms', '<i4'), ('receiver', '<i4'), ('receiverPort', '<i4'),
+                        ('packetSize_B', '<i4'), ('reply', '<i4'), ('replyAfter_ms', '<i4')])
+
+
+def write_traffic_bundle(file_path: str, configurations: list[TrafficConfiguration]):
+    """
+    Writes traffic configurations into one bundle file with a single sequential write.
+    Stream rules are expanded into records.
+    :param file_path: path of bundle file.
+    :param configurations: traffic configurations (one per sender).
+    """
+    agent_codes = {}
+    for config in configurations:
+        agent_codes.setdefault(config.sender, len(agent_codes))
+    for config in configurations:
+        for receiver in config.receivers:
+            agent_codes.setdefault(receiver.omnet_name, len(agent_codes))
+
+    encoded_names = [name.encode('utf-8') for name in agent_codes]
+    name_lengths = np.array([len(name) for name in encoded_names], dtype=np.uint64)
+    name_table = b''.join(encoded_names)
+    name_table += b'\0' * (-len(name_table) % 8)
+
+    index = np.zeros(len(agent_codes), dtype=INDEX_TYPE)
+    index['name_offset'] = np.cumsum(name_lengths) - name_lengths
+    index['name_length'] = name_lengths
+
+    record_blocks = []
+    num_records = 0
+    for config in configurations:
+        columns = config.get_all_columns()
+        records = np.empty(len(columns['msgId']), dtype=RECORD_TYPE)
+        # map receiver codes of the configuration to codes of the bundle
+        receiver_codes = np.array([agent_codes[receiver.omnet_name] for receiver in config.receivers] + [-1],
+                                  dtype=np.int32)
+        records['receiver'] = receiver_codes[columns['receiver']]
+        for name in ['msgId', 'timeSend_ms', 'receiverPort', 'packetSize_B', 'reply', 'replyAfter_ms']:
+            records[name] = columns[name]
+        code = agent_codes[config.sender]
+        index[code]['first_record'] = num_records
+        index[code]['num_records'] = len(records)
+        record_blocks.append(records)
+        num_records += len(records)
+
+    header = np.zeros(1, dtype=HEADER_TYPE)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['num_agents'] = len(agent_codes)
+    header['record_size'] = RECORD_TYPE.itemsize
+    header['records_offset'] = HEADER_TYPE.itemsize + index.nbytes + len(name_table)
+
+    with open(file_path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(index.tobytes())
+        f.write(name_table)
+        for records in record_blocks:
+            f.write(records.tobytes())
+
+
+class TrafficBundle:
+    """
+    Reader of a traffic bundle. Records are memory-mapped, the records of an agent are returned as view without
+    copying.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        header = np.fromfile(file_path, dtype=HEADER_TYPE, count=1)
+        if len(header) == 0 or header['magic'][0] != MAGIC:
+            raise ValueError(f'{file_path} is not a traffic bundle.')
+        if header['version'][0] != VERSION or header['record_size'][0] != RECORD_TYPE.itemsize:
+            raise ValueError(f'Unsupported traffic bundle version {header["version"][0]}.')
+        num_agents = int(header['num_agents'][0])
+        records_offset = int(header['records_offset'][0])
+
+        self.index = np.fromfile(file_path, dtype=INDEX_TYPE, count=num_agents, offset=HEADER_TYPE.itemsize)
+        with open(file_path, 'rb') as f:
+            f.seek(HEADER_TYPE.itemsize + self.index.nbytes)
+            name_table = f.read(records_offset - HEADER_TYPE.itemsize - self.index.nbytes)
+        self.agent_names = [name_table[offset:offset + length].decode('utf-8')
+                            for offset, length in zip(self.index['name_offset'].tolist(),
+                                                      self.index['name_length'].tolist())]
+        self.agent_codes = {name: code for code, name in enumerate(self.agent_names)}
+
+        num_records = int(self.index['num_records'].sum())
+        if num_records > 0:
+            self.records = np.memmap(file_path, dtype=RECORD_TYPE, mode='r', offset=records_offset,
+                                     shape=(num_records,))
+        else:
+            self.records = np.empty(0, dtype=RECORD_TYPE)
+
+    def get_records(self, agent_name: str) -> np.ndarray:
+        """
+        Gets records sent by an agent.
+        :param agent_name: omnet name of sender.
+        :return: structured array (view on the memory-mapped file).
+        """
+        code = self.agent_codes.get(agent_name)
+        if code is None:
+            return self.records[:0]
+        first = int(self.index['first_record'][code])
+        return self.records[first:first + int(self.index['num_records'][code])]
+
+    def to_dataframe(self, agent_name=None) -> pd.DataFrame:
+        """
+        Builds DataFrame in the layout of TrafficConfiguration.to_dataframe.
+        :param agent_name: omnet name of sender, all senders if None.
+        :return: DataFrame.
+        """
+        if agent_name is None:
+            records = self.records
+            sender_codes = np.repeat(np.arange(len(self.agent_names)), self.index['num_records'].astype(np.int64))
+        else:
+            records = self.get_records(agent_name)
+            sender_codes = np.full(len(records), self.agent_codes.get(agent_name, 0))
+        names = np.array(self.agent_names + [''], dtype=object)
+        df = pd.DataFrame({
+            'msgId': records['msgId'],
+            'timeSend_ms': records['timeSend_ms'],
+            'receiver': names[records['receiver']],
+            'receiverPort': records['receiverPort'],
+            'packetSize_B': records['packetSize_B']
+        })
+        reply = records['reply'].astype(bool)
+        if reply.any():
+            if reply.all():
+                df['reply'] = reply
+                df['replyAfter_ms'] = records['replyAfter_ms']
+            else:
+                df['reply'] = pd.Series(reply).where(reply)
+                df['replyAfter_ms'] = pd.Series(records['replyAfter_ms']).where(reply)
+        df['sender'] = names[sender_codes]
+        return df
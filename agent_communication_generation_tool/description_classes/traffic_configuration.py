@@ -0,0 +1,544 @@
+"""
+Columnar message store for the traffic configuration of a sending agent.
+Besides explicit messages, a configuration can hold periodic stream rules that are only expanded when needed.
+Configurations can be written incrementally (TrafficConfigurationWriter) and read back in chunks
+(read_traffic_configuration_chunks).
+"""
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from agent_communication_generation_tool.description_classes.agent import Agent
+
+SPLITMIX64_INCREMENT = np.uint64(0x9E3779B97F4A7C15)
+SPLITMIX64_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+SPLITMIX64_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+
+
+def splitmix64(seed: int, counters: np.ndarray) -> np.ndarray:
+    """
+    Counter-based hash (SplitMix64) that derives pseudo-random numbers of stream rules.
+    The same function is implemented in the TrafficApp, so Python and OMNeT++ expand stream rules identically.
+    :param seed: seed of the stream rule.
+    :param counters: array of counters.
+    :return: uint64 array with one value per counter.
+    """
+    with np.errstate(over='ignore'):
+        z = np.uint64(seed) + (np.asarray(counters, dtype=np.uint64) + np.uint64(1)) * SPLITMIX64_INCREMENT
+        z = (z ^ (z >> np.uint64(30))) * SPLITMIX64_MULTIPLIER_1
+        z = (z ^ (z >> np.uint64(27))) * SPLITMIX64_MULTIPLIER_2
+        return z ^ (z >> np.uint64(31))
+
+
+def draw_from_counter_range(seed: int, counters: np.ndarray, low, high) -> np.ndarray:
+    """
+    Maps hashed counters to integers in [low, high] (including both bounds).
+    :param seed: seed of the stream rule.
+    :param counters: array of counters.
+    :param low: lower bounds (scalar or per counter).
+    :param high: upper bounds (scalar or per counter).
+    :return: int64 array.
+    """
+    low = np.asarray(low, dtype=np.int64)
+    range_sizes = (np.asarray(high, dtype=np.int64) - low + 1).astype(np.uint64)
+    return low + (splitmix64(seed, counters) % range_sizes).astype(np.int64)
+
+
+class StreamRule:
+    """
+    Periodic stream of messages from the sender to one receiver.
+    Message k (k = 0, ..., count - 1) is sent at start_ms + k * period_ms with message id
+    first_msg_id + k * msg_id_stride. Packet sizes and reply delays are drawn from their ranges with the counter-based
+    hash of the rule seed (counter 2k for the packet size, 2k + 1 for the reply delay).
+    """
+
+    def __init__(self,
+                 receiver: Agent,
+                 start_ms: int,
+                 period_ms: int,
+                 count: int,
+                 first_msg_id: int,
+                 msg_id_stride: int,
+                 packet_size_range_bytes: tuple[int, int],
+                 reply=False,
+                 reply_after_ms_range=(0, 0),
+                 seed=0):
+        self.receiver = receiver
+        self.start_ms = start_ms
+        self.period_ms = period_ms
+        self.count = count
+        self.first_msg_id = first_msg_id
+        self.msg_id_stride = msg_id_stride
+        self.packet_size_range_bytes = packet_size_range_bytes
+        self.reply = reply
+        self.reply_after_ms_range = reply_after_ms_range
+        self.seed = seed
+
+    @classmethod
+    def from_json_dict(cls, stream: dict, receiver=None):
+        """
+        Creates rule from an entry of the streamList.
+        :param stream: dict as returned by to_json_dict.
+        :param receiver: receiving agent, if known.
+        :return: stream rule.
+        """
+        return cls(receiver=receiver,
+                   start_ms=stream['start_ms'],
+                   period_ms=stream['period_ms'],
+                   count=stream['count'],
+                   first_msg_id=stream['firstMsgId'],
+                   msg_id_stride=stream['msgIdStride'],
+                   packet_size_range_bytes=(stream['packetSizeMin_B'], stream['packetSizeMax_B']),
+                   reply=stream['reply'],
+                   reply_after_ms_range=(stream['replyAfterMin_ms'], stream['replyAfterMax_ms']),
+                   seed=stream['seed'])
+
+    def get_message_columns(self, k: np.ndarray) -> dict:
+        """
+        Materializes the messages with the given indices.
+        :param k: int64 array of message indices within the rule.
+        :return: dict of columns msgId, timeSend_ms, packetSize_B, reply and replyAfter_ms.
+        """
+        counters = 2 * k.astype(np.uint64)
+        reply_after_ms = np.zeros(len(k), dtype=np.int64)
+        if self.reply:
+            reply_after_ms = draw_from_counter_range(self.seed, counters + np.uint64(1), *self.reply_after_ms_range)
+        return {'msgId': self.first_msg_id + k * self.msg_id_stride,
+                'timeSend_ms': self.start_ms + k * self.period_ms,
+                'packetSize_B': draw_from_counter_range(self.seed, counters, *self.packet_size_range_bytes),
+                'reply': np.full(len(k), self.reply, dtype=np.bool_),
+                'replyAfter_ms': reply_after_ms}
+
+    def to_json_dict(self) -> dict:
+        """
+        Gets the rule in the layout of the streamList of the OMNeT++ traffic configuration.
+        :return: dict.
+        """
+        return {'receiver': self.receiver.omnet_name,
+                'receiverPort': self.receiver.omnet_port,
+                'start_ms': self.start_ms,
+                'period_ms': self.period_ms,
+                'count': self.count,
+                'firstMsgId': self.first_msg_id,
+                'msgIdStride': self.msg_id_stride,
+                'packetSizeMin_B': self.packet_size_range_bytes[0],
+                'packetSizeMax_B': self.packet_size_range_bytes[1],
+                'reply': self.reply,
+                'replyAfterMin_ms': self.reply_after_ms_range[0],
+                'replyAfterMax_ms': self.reply_after_ms_range[1],
+                'seed': self.seed}
+
+
+class TrafficConfiguration:
+    """
+    Struct-of-arrays store of all messages one agent sends during a scenario.
+    Receivers are integer-encoded, all other message fields are kept in NumPy columns with amortized growth.
+    Periodic traffic can be stored as stream rules instead, which are expanded lazily into the same columns.
+    """
+    COLUMN_TYPES = {
+        'msgId': np.int64,
+        'timeSend_ms': np.int64,
+        'receiver': np.int32,
+        'receiverPort': np.int32,
+        'packetSize_B': np.int64,
+        'reply': np.bool_,
+        'replyAfter_ms': np.int64
+    }
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, sender):
+        self.sender = sender.omnet_name if isinstance(sender, Agent) else sender
+        # receiver table: the receiver column holds indices into this list
+        self.receivers = list()
+        self._receiver_codes = dict()
+
+        self._num_messages = 0
+        self._columns = {name: np.empty(self.INITIAL_CAPACITY, dtype=dtype)
+                         for name, dtype in self.COLUMN_TYPES.items()}
+        self.stream_rules = list()
+
+    def __len__(self):
+        return self._num_messages + sum(rule.count for rule in self.stream_rules)
+
+    def get_column(self, name: str) -> np.ndarray:
+        """
+        Gets a view on a message column without copying.
+        :param name: name of the column (see COLUMN_TYPES).
+        :return: array with one entry per message.
+        """
+        return self._columns[name][:self._num_messages]
+
+    def set_column(self, name: str, values):
+        """
+        Overwrites a message column of the explicit messages.
+        :param name: name of the column (see COLUMN_TYPES).
+        :param values: scalar or array with one entry per message.
+        """
+        self._columns[name][:self._num_messages] = values
+
+    def copy(self):
+        """
+        Copies the configuration, columns and stream rules are not shared with the copy (receivers are).
+        :return: traffic configuration.
+        """
+        config = copy.copy(self)
+        config.receivers = list(self.receivers)
+        config._receiver_codes = dict(self._receiver_codes)
+        config._columns = {name: column.copy() for name, column in self._columns.items()}
+        config.stream_rules = [copy.copy(rule) for rule in self.stream_rules]
+        return config
+
+    def encode_receiver(self, receiver: Agent) -> int:
+        """
+        Gets integer code of receiver, receivers are registered on first use.
+        :param receiver: receiving agent.
+        :return: index in receiver table.
+        """
+        code = self._receiver_codes.get(receiver)
+        if code is None:
+            code = len(self.receivers)
+            self._receiver_codes[receiver] = code
+            self.receivers.append(receiver)
+        return code
+
+    def _reserve(self, num_additional_messages: int):
+        required = self._num_messages + num_additional_messages
+        capacity = len(self._columns['msgId'])
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._num_messages] = column[:self._num_messages]
+            self._columns[name] = grown
+
+    def add_message(self,
+                    msg_id: int,
+                    time_send_ms: int,
+                    receiver: Agent,
+                    packet_size_bytes: int,
+                    reply=False,
+                    reply_after_ms=0):
+        """
+        Appends a single message.
+        """
+        self._reserve(1)
+        i = self._num_messages
+        self._columns['msgId'][i] = msg_id
+        self._columns['timeSend_ms'][i] = time_send_ms
+        self._columns['receiver'][i] = self.encode_receiver(receiver)
+        self._columns['receiverPort'][i] = receiver.omnet_port
+        self._columns['packetSize_B'][i] = packet_size_bytes
+        self._columns['reply'][i] = reply
+        self._columns['replyAfter_ms'][i] = reply_after_ms
+        self._num_messages += 1
+
+    def add_messages(self,
+                     msg_ids,
+                     times_send_ms,
+                     receiver_codes,
+                     packet_sizes_bytes,
+                     reply=False,
+                     reply_after_ms=0):
+        """
+        Appends a batch of messages. Scalars are broadcast to the length of msg_ids.
+        :param msg_ids: array of message ids.
+        :param times_send_ms: sending times.
+        :param receiver_codes: receiver indices as returned by encode_receiver.
+        :param packet_sizes_bytes: packet sizes.
+        :param reply: whether the receiver replies.
+        :param reply_after_ms: reply delays.
+        """
+        msg_ids = np.asarray(msg_ids)
+        num_messages = len(msg_ids)
+        if num_messages == 0:
+            return
+        self._reserve(num_messages)
+        batch = slice(self._num_messages, self._num_messages + num_messages)
+        receiver_codes = np.broadcast_to(receiver_codes, num_messages)
+        receiver_ports = np.array([receiver.omnet_port for receiver in self.receivers], dtype=np.int32)
+
+        self._columns['msgId'][batch] = msg_ids
+        self._columns['timeSend_ms'][batch] = times_send_ms
+        self._columns['receiver'][batch] = receiver_codes
+        self._columns['receiverPort'][batch] = receiver_ports[receiver_codes]
+        self._columns['packetSize_B'][batch] = packet_sizes_bytes
+        self._columns['reply'][batch] = reply
+        self._columns['replyAfter_ms'][batch] = reply_after_ms
+        self._num_messages += num_messages
+
+    def add_stream_rule(self, stream_rule: StreamRule):
+        """
+        Appends a periodic stream rule, the receiver is registered in the receiver table.
+        :param stream_rule: stream rule.
+        """
+        self.encode_receiver(stream_rule.receiver)
+        self.stream_rules.append(stream_rule)
+
+    def expand_stream_rules(self) -> dict:
+        """
+        Materializes the messages of all stream rules.
+        :return: dict of columns (see COLUMN_TYPES).
+        """
+        rule_columns = []
+        for rule in self.stream_rules:
+            columns = rule.get_message_columns(np.arange(rule.count, dtype=np.int64))
+            columns['receiver'] = np.full(rule.count, self.encode_receiver(rule.receiver), dtype=np.int32)
+            columns['receiverPort'] = np.full(rule.count, rule.receiver.omnet_port, dtype=np.int32)
+            rule_columns.append(columns)
+        return {name: np.concatenate([columns[name] for columns in rule_columns]).astype(dtype)
+                for name, dtype in self.COLUMN_TYPES.items()}
+
+    def get_all_columns(self) -> dict:
+        """
+        Gets columns of all messages, explicit messages and expanded stream rules.
+        If there are stream rules, messages are ordered by message id.
+        :return: dict of columns (see COLUMN_TYPES).
+        """
+        columns = {name: self.get_column(name) for name in self.COLUMN_TYPES}
+        if len(self.stream_rules) == 0:
+            return columns
+        stream_columns = self.expand_stream_rules()
+        columns = {name: np.concatenate((columns[name], stream_columns[name])) for name in self.COLUMN_TYPES}
+        order = np.argsort(columns['msgId'], kind='stable')
+        return {name: column[order] for name, column in columns.items()}
+
+    def get_end_time_ms(self) -> int:
+        """
+        Gets the latest point in time at which a message or its reply is sent (sending time plus reply delay).
+        For stream rules, the upper bound of the reply delay range is used.
+        :return: end time in ms, -1 if there are no messages.
+        """
+        end_time_ms = -1
+        if self._num_messages > 0:
+            reply_after_ms = np.where(self.get_column('reply'), self.get_column('replyAfter_ms'), 0)
+            end_time_ms = int((self.get_column('timeSend_ms') + reply_after_ms).max())
+        for rule in self.stream_rules:
+            if rule.count == 0:
+                continue
+            rule_end_time_ms = rule.start_ms + (rule.count - 1) * rule.period_ms
+            if rule.reply:
+                rule_end_time_ms += rule.reply_after_ms_range[1]
+            end_time_ms = max(end_time_ms, rule_end_time_ms)
+        return end_time_ms
+
+    def get_receiver_names(self, receiver_codes=None) -> np.ndarray:
+        """
+        Decodes the receiver column.
+        :param receiver_codes: receiver codes to decode, defaults to the receiver column of explicit messages.
+        :return: array with omnet name of receiver per message.
+        """
+        if receiver_codes is None:
+            receiver_codes = self.get_column('receiver')
+        names = np.array([receiver.omnet_name for receiver in self.receivers] + [''], dtype=object)
+        return names[receiver_codes]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Builds DataFrame of the messages in the layout of the OMNeT++ traffic configuration.
+        Stream rules are expanded into single messages.
+        Reply columns are only present if at least one message expects a reply, non-reply messages have NaN entries.
+        :return: DataFrame.
+        """
+        columns = self.get_all_columns()
+        df = pd.DataFrame({
+            'msgId': columns['msgId'],
+            'timeSend_ms': columns['timeSend_ms'],
+            'receiver': self.get_receiver_names(columns['receiver']),
+            'receiverPort': columns['receiverPort'],
+            'packetSize_B': columns['packetSize_B']
+        })
+        reply = columns['reply']
+        if reply.any():
+            if reply.all():
+                df['reply'] = reply
+                df['replyAfter_ms'] = columns['replyAfter_ms']
+            else:
+                df['reply'] = pd.Series(reply).where(reply)
+                df['replyAfter_ms'] = pd.Series(columns['replyAfter_ms']).where(reply)
+        df['sender'] = self.sender
+        return df
+
+    def get_message_lines(self) -> list[str]:
+        """
+        Serializes explicit messages, one json object per line.
+        :return: list of lines.
+        """
+        encoded_names = [json.dumps(receiver.omnet_name) for receiver in self.receivers]
+        lines = []
+        for msg_id, time_send, receiver, port, size, reply, reply_after in zip(
+                *(self.get_column(name).tolist() for name in self.COLUMN_TYPES)):
+            line = (f'    {{"msgId": {msg_id}, "timeSend_ms": {time_send}, "receiver": {encoded_names[receiver]}, '
+                    f'"receiverPort": {port}, "packetSize_B": {size}')
+            if reply:
+                line += f', "reply": true, "replyAfter_ms": {reply_after}'
+            lines.append(line + '}')
+        return lines
+
+    def get_stream_rule_lines(self) -> list[str]:
+        """
+        Serializes stream rules, one json object per line.
+        :return: list of lines.
+        """
+        return [f'    {json.dumps(rule.to_json_dict())}' for rule in self.stream_rules]
+
+    def to_json(self) -> str:
+        """
+        Serializes the configuration to the json format read by the TrafficApp in OMNeT++.
+        Each message and each stream rule is written in one line.
+        :return: json string.
+        """
+        return (get_config_json_header(self.sender) + ',\n'.join(self.get_message_lines()) +
+                get_config_json_footer(self.get_stream_rule_lines()))
+
+
+def merge_traffic_configurations(configs: list[TrafficConfiguration], msg_id_offsets: list[int]) -> TrafficConfiguration:
+    """
+    Merges configurations of the same sender (e.g. of several applications) into one configuration ordered by sending
+    time. Stream rules are expanded. The TrafficApp schedules at most one message per receiver and sending time, so
+    colliding messages are delayed by 1 ms until all pairs of receiver and sending time are unique.
+    :param configs: traffic configurations of the sender.
+    :param msg_id_offsets: offset added to the message ids of each configuration.
+    :return: merged traffic configuration.
+    """
+    merged = TrafficConfiguration(configs[0].sender)
+    all_columns = []
+    for config, msg_id_offset in zip(configs, msg_id_offsets):
+        columns = config.get_all_columns()
+        receiver_codes = np.array([merged.encode_receiver(receiver) for receiver in config.receivers] + [-1],
+                                  dtype=np.int32)
+        columns['receiver'] = receiver_codes[columns['receiver']]
+        columns['msgId'] = columns['msgId'] + msg_id_offset
+        all_columns.append(columns)
+    columns = {name: np.concatenate([c[name] for c in all_columns]) for name in TrafficConfiguration.COLUMN_TYPES}
+
+    times_send_ms = columns['timeSend_ms'].copy()
+    num_receivers = max(len(merged.receivers), 1)
+    while len(times_send_ms) > 0:
+        _, first_indices = np.unique(times_send_ms * num_receivers + columns['receiver'], return_index=True)
+        collisions = np.ones(len(times_send_ms), dtype=np.bool_)
+        collisions[first_indices] = False
+        if not collisions.any():
+            break
+        times_send_ms[collisions] += 1
+
+    # stable sort: merges the time-sorted message lists and keeps the order of messages with equal sending times
+    order = np.argsort(times_send_ms, kind='stable')
+    merged.add_messages(msg_ids=columns['msgId'][order],
+                        times_send_ms=times_send_ms[order],
+                        receiver_codes=columns['receiver'][order],
+                        packet_sizes_bytes=columns['packetSize_B'][order],
+                        reply=columns['reply'][order],
+                        reply_after_ms=columns['replyAfter_ms'][order])
+    return merged
+
+
+def get_config_json_header(sender: str) -> str:
+    return f'{{\n  "sender": {json.dumps(sender)},\n  "messageList": [\n'
+
+
+def get_config_json_footer(stream_rule_lines: list[str]) -> str:
+    footer = '\n  ]'
+    if len(stream_rule_lines) > 0:
+        footer += ',\n  "streamList": [\n' + ',\n'.join(stream_rule_lines) + '\n  ]'
+    return footer + '\n}\n'
+
+
+class TrafficConfigurationWriter:
+    """
+    Writes the traffic configuration of a sender incrementally.
+    Each appended slice of messages is written to the file right away, so only the current slice is kept in memory.
+    Stream rules are collected and written when the writer is closed.
+    """
+
+    def __init__(self, file_path: str, sender: str):
+        self.file_path = file_path
+        self.sender = sender
+        self.num_messages = 0
+        self.stream_rule_lines = list()
+        self.closed = False
+        with open(self.file_path, 'w') as f:
+            f.write(get_config_json_header(self.sender))
+
+    def append(self, config: TrafficConfiguration):
+        """
+        Appends messages and stream rules of a configuration slice.
+        :param config: traffic configuration of the sender.
+        """
+        if self.closed:
+            raise ValueError(f'Traffic configuration of {self.sender} is already closed.')
+        lines = config.get_message_lines()
+        if len(lines) > 0:
+            with open(self.file_path, 'a') as f:
+                if self.num_messages > 0:
+                    f.write(',\n')
+                f.write(',\n'.join(lines))
+            self.num_messages += len(lines)
+        self.stream_rule_lines.extend(config.get_stream_rule_lines())
+
+    def close(self):
+        """
+        Completes the json file.
+        """
+        if self.closed:
+            return
+        with open(self.file_path, 'a') as f:
+            f.write(get_config_json_footer(self.stream_rule_lines))
+        self.closed = True
+
+
+def read_traffic_configuration_chunks(file_path: str, chunk_size=100000):
+    """
+    Reads a traffic configuration file written with one message or stream rule per line in chunks.
+    Stream rules are expanded chunk by chunk as well. Chunks are yielded in the order of the file.
+    :param file_path: path of traffic configuration file.
+    :param chunk_size: maximal number of messages per chunk.
+    :return: iterator of DataFrames in the layout of TrafficConfiguration.to_dataframe.
+    """
+    sender = None
+    rows = []
+    with open(file_path, 'r') as f:
+        for line in f:
+            line = line.strip().rstrip(',')
+            if line.startswith('"sender"'):
+                sender = json.loads('{' + line + '}')['sender']
+            elif line.startswith('{"msgId"'):
+                rows.append(json.loads(line))
+                if len(rows) >= chunk_size:
+                    yield pd.DataFrame(rows).assign(sender=sender)
+                    rows = []
+            elif line.startswith('{"receiver"'):
+                # messages before the stream rule come first, as in the file
+                if len(rows) > 0:
+                    yield pd.DataFrame(rows).assign(sender=sender)
+                    rows = []
+                stream = json.loads(line)
+                rule = StreamRule.from_json_dict(stream)
+                for k_start in range(0, rule.count, chunk_size):
+                    columns = rule.get_message_columns(np.arange(k_start, min(k_start + chunk_size, rule.count),
+                                                                 dtype=np.int64))
+                    df = pd.DataFrame({'msgId': columns['msgId'],
+                                       'timeSend_ms': columns['timeSend_ms'],
+                                       'receiver': stream['receiver'],
+                                       'receiverPort': stream['receiverPort'],
+                                       'packetSize_B': columns['packetSize_B']})
+                    if rule.reply:
+                        df['reply'] = True
+                        df['replyAfter_ms'] = columns['replyAfter_ms']
+                    yield df.assign(sender=sender)
+    if len(rows) > 0:
+        yield pd.DataFrame(rows).assign(sender=sender)
+
+
+def get_config_file_path(directory: str, sender: str) -> str:
+    """
+    Gets path of the traffic configuration file of a sender.
+    :param directory: directory of traffic configurations.
+    :param sender: omnet name of sender.
+    :return: file path.
+    """
+    return os.path.join(directory, f'traffic_config_{sender}.json')
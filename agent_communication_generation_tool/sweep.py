@@ -0,0 +1,375 @@
+"""
+Declarative sweeps of scenarios and command line entry point to run them.
+
+A sweep specification (YAML or JSON) describes networks, communication graphs and agent communication patterns.
+Lists in the specification are sweep axes, all combinations are expanded into a deduplicated list of entries.
+Networks and communication graphs are created once and shared by all scenarios that use them, the scenarios are run
+concurrently by the ScenarioRunner. Repetitions get their own seed (derived from the seed of the sweep) and share
+networks and communication graphs.
+
+Example (see sweeps/ for complete specifications):
+    simulation_duration_ms: 30000
+    seed: 0
+    networks:
+      simbench_codes: all
+      technologies: [5G, LTE, LTE450, Ethernet]
+      system_states: [NORMAL]
+      num_agents: [100]
+    scenarios:
+      - pattern: DemandSupplyBalancing
+        graph: star_aggregator
+        parameters:
+          organizational_structure: CENTRALIZED
+          data_size_generator: [increasing 8-50B, increasing 50-200B]
+          t_central_optimization_range: [immediate, low, medium, high]
+
+Parameters are passed to the constructor of the pattern. Values are resolved by name of the parameter:
+    - data_size_generator: name in data_size_generators or 'increasing <name>' in data_size_generators_increasing
+      (simulation_run_variables.py),
+    - organizational_structure, communication_mode: name of the enum member,
+    - parameters ending with _range: name in complexities or [lower, upper] (as axis: [[lower, upper], ...]).
+
+With --queue, the scenarios are added to a SQLite campaign queue (see description_classes/campaign_queue.py) keyed by
+the fingerprint of their entry. Scenarios that are done are skipped when the sweep is started again, so an interrupted
+campaign is resumed by running the same command. Several workers may drain the same queue.
+
+Usage:
+    python -m agent_communication_generation_tool.sweep <specification> [--dry-run] [--max-concurrent-runs N]
+        [--queue campaign.sqlite] [--max-attempts N] [--retry-failed]
+"""
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory of "agent_communication_generation_tool" to sys.path
+sys.path.append(Path(__file__).parent.parent.absolute().__str__())
+
+from agent_communication_generation_tool.simulation_run_variables import data_size_generators, \
+    data_size_generators_increasing, complexities
+from agent_communication_generation_tool.description_classes import agent_communication_pattern
+from agent_communication_generation_tool.description_classes.agent_communication_pattern import \
+    AgentCommunicationPattern, OrganizationalStructure, CommunicationMode
+from agent_communication_generation_tool.description_classes.campaign_queue import CampaignQueue, DEFAULT_MAX_ATTEMPTS
+from agent_communication_generation_tool.description_classes.communication_graph import StarCommunicationGraph, \
+    RingOverlayGraph, SmallWorldOverlayGraph, CompleteOverlayGraph
+from agent_communication_generation_tool.description_classes.communication_network_description import \
+    Simbench5GNetworkDescription, SimbenchLTENetworkDescription, SimbenchEthernetNetworkDescription
+from agent_communication_generation_tool.description_classes.communication_scenario_description import \
+    CommunicationScenarioDescription
+from agent_communication_generation_tool.description_classes.random_streams import RandomStreams, RandomStream
+from agent_communication_generation_tool.description_classes.scenario_runner import ScenarioRunner, CampaignWorker
+from agent_communication_generation_tool.description_classes.simbench_codes import codes_nan_filtered
+from network_generation.simbench_network_extractor import SystemState
+
+DATA_SIZE_GENERATORS = {**data_size_generators,
+                        **{f'increasing {name}': generator for name, generator in
+                           data_size_generators_increasing.items()}}
+
+# network description class and specification per technology
+TECHNOLOGIES = {
+    '5G': (Simbench5GNetworkDescription, None),
+    'LTE': (SimbenchLTENetworkDescription, SimbenchLTENetworkDescription.Specification.LTE),
+    'LTE450': (SimbenchLTENetworkDescription, SimbenchLTENetworkDescription.Specification.LTE450),
+    'Ethernet': (SimbenchEthernetNetworkDescription, None)
+}
+
+GRAPH_TYPES = {
+    'star': lambda network, num_agents, rng: StarCommunicationGraph(
+        agents=network.agents, central_agent=network.get_central_agent(),
+        max_number_of_agents_per_type=num_agents, rng=rng),
+    'star_aggregator': lambda network, num_agents, rng: StarCommunicationGraph(
+        agents=network.agents, central_agent=network.get_central_agent(), aggregator_agent=network.aggregator_agent,
+        max_number_of_agents_per_type=num_agents, rng=rng),
+    'ring': lambda network, num_agents, rng: RingOverlayGraph(
+        agents=network.agents, central_agent=network.control_center_agent,
+        max_number_of_agents_per_type=num_agents, rng=rng),
+    'small_world': lambda network, num_agents, rng: SmallWorldOverlayGraph(
+        agents=network.agents, central_agent=network.control_center_agent, p=0.5,
+        max_number_of_agents_per_type=num_agents, rng=rng),
+    'complete': lambda network, num_agents, rng: CompleteOverlayGraph(
+        agents=network.agents, central_agent=network.control_center_agent,
+        max_number_of_agents_per_type=num_agents, rng=rng)
+}
+
+
+def as_axis(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def resolve_parameter(name: str, value):
+    """
+    Resolves value of a pattern parameter from the specification (see module description).
+    :param name: name of the parameter.
+    :param value: value in the specification.
+    :return: value passed to the pattern.
+    """
+    if name == 'data_size_generator':
+        if value not in DATA_SIZE_GENERATORS:
+            raise ValueError(f'Unknown data size generator {value}.')
+        # each scenario seeds its generator and increasing generators keep state, so generators are not shared
+        return copy.deepcopy(DATA_SIZE_GENERATORS[value])
+    if name == 'organizational_structure':
+        return OrganizationalStructure[value]
+    if name == 'communication_mode':
+        return CommunicationMode[value]
+    if name.endswith('_range'):
+        if isinstance(value, str):
+            if value not in complexities:
+                raise ValueError(f'Unknown complexity {value}.')
+            return complexities[value]
+        return tuple(value)
+    return value
+
+
+def get_canonical_parameter(name: str, value):
+    # ranges given by name and by bounds are the same parameter
+    if name.endswith('_range'):
+        return list(resolve_parameter(name, value))
+    return value
+
+
+def get_entry_key(entry: dict) -> str:
+    """
+    Gets canonical representation of an entry, entries with the same key describe the same scenario.
+    :param entry: entry (see SweepSpecification.expand).
+    :return: json string.
+    """
+    canonical_entry = dict(entry)
+    canonical_entry['parameters'] = {name: get_canonical_parameter(name, value)
+                                     for name, value in entry['parameters'].items()}
+    return json.dumps(canonical_entry, sort_keys=True)
+
+
+def get_entry_fingerprint(entry: dict) -> str:
+    """
+    Gets fingerprint of an entry (sha256 of its key).
+    :param entry: entry (see SweepSpecification.expand).
+    :return: hex digest.
+    """
+    return hashlib.sha256(get_entry_key(entry).encode('utf-8')).hexdigest()
+
+
+def sort_entries(entries: list[dict]) -> list[dict]:
+    """
+    Sorts entries by network, so scenarios of the same network follow each other.
+    :param entries: entries (see SweepSpecification.expand).
+    :return: sorted list of entries.
+    """
+    return sorted(entries, key=lambda entry: json.dumps(entry['network'], sort_keys=True))
+
+
+def get_description_text(entry: dict) -> str:
+    parameters = '_'.join(f'{name}_{get_canonical_parameter(name, value)}'
+                          for name, value in sorted(entry['parameters'].items()))
+    network = entry['network']
+    description_text = (f'{entry["name"]}_{parameters}_{entry["graph"]}_'
+                        f'num_agents_{network["num_agents"]}_simbench_network_{network["simbench_code"]}_'
+                        f'{network["technology"]}_system_state_{network["system_state"]}')
+    if entry['repetition'] > 0:
+        description_text += f'_repetition_{entry["repetition"]}'
+    # lists of parameter values are written like 1_2 (not [1, 2]) to get usable file names
+    for character in '[],\'':
+        description_text = description_text.replace(character, '')
+    return description_text.replace(' ', '_')
+
+
+class SweepSpecification:
+    """
+    Sweep of scenarios described by a specification (see module description).
+    """
+
+    def __init__(self, specification: dict):
+        self.specification = specification
+        self.simulation_duration_ms = specification['simulation_duration_ms']
+        self.seed = specification.get('seed')
+        self.repetitions = specification.get('repetitions', 1)
+        if 'scenarios' not in specification or len(specification['scenarios']) == 0:
+            raise ValueError('Sweep specification without scenarios.')
+
+        # shared by all scenarios of the sweep
+        self.network_descriptions = {}
+        self.communication_graphs = {}
+
+    @staticmethod
+    def from_file(file_path: str):
+        """
+        Reads specification from YAML (.yaml, .yml) or JSON file.
+        :param file_path: path of the specification.
+        :return: SweepSpecification.
+        """
+        with open(file_path, 'r') as f:
+            if file_path.endswith('.yaml') or file_path.endswith('.yml'):
+                import yaml
+                return SweepSpecification(yaml.safe_load(f))
+            return SweepSpecification(json.load(f))
+
+    def get_networks(self) -> list[dict]:
+        networks = self.specification.get('networks', {})
+        simbench_codes = networks.get('simbench_codes', 'all')
+        simbench_codes = codes_nan_filtered if simbench_codes == 'all' else as_axis(simbench_codes)
+        for technology in as_axis(networks.get('technologies', list(TECHNOLOGIES.keys()))):
+            if technology not in TECHNOLOGIES:
+                raise ValueError(f'Unknown technology {technology}.')
+        return [{'simbench_code': simbench_code, 'technology': technology, 'system_state': system_state,
+                 'num_agents': num_agents}
+                for num_agents in as_axis(networks.get('num_agents', [None]))
+                for system_state in as_axis(networks.get('system_states', [SystemState.NORMAL.name]))
+                for simbench_code in simbench_codes
+                for technology in as_axis(networks.get('technologies', list(TECHNOLOGIES.keys())))]
+
+    def expand(self) -> list[dict]:
+        """
+        Expands the specification into entries, one per scenario. Duplicates (same pattern, parameters, graph,
+        network and seed) are removed, the order of the specification is kept.
+        :return: list of entries.
+        """
+        entries = []
+        keys = set()
+        networks = self.get_networks()
+        for scenario in self.specification['scenarios']:
+            pattern_name = scenario['pattern']
+            pattern_class = getattr(agent_communication_pattern, pattern_name, None)
+            if not (isinstance(pattern_class, type) and issubclass(pattern_class, AgentCommunicationPattern)):
+                raise ValueError(f'Unknown agent communication pattern {pattern_name}.')
+            graphs = as_axis(scenario.get('graph', 'star'))
+            for graph in graphs:
+                if graph not in GRAPH_TYPES:
+                    raise ValueError(f'Unknown communication graph {graph}.')
+            parameter_names = list(scenario.get('parameters', {}).keys())
+            parameter_axes = [as_axis(value) for value in scenario.get('parameters', {}).values()]
+            for network, graph, values, repetition in itertools.product(networks, graphs,
+                                                                        itertools.product(*parameter_axes),
+                                                                        range(self.repetitions)):
+                entry = {'name': scenario.get('name', pattern_name),
+                         'pattern': pattern_name,
+                         'parameters': dict(zip(parameter_names, values)),
+                         'graph': graph,
+                         'network': network,
+                         'simulation_duration_ms': scenario.get('simulation_duration_ms',
+                                                                self.simulation_duration_ms),
+                         'repetition': repetition,
+                         'seed': self.get_scenario_seed(repetition)}
+                key = get_entry_key(entry)
+                if key in keys:
+                    continue
+                keys.add(key)
+                entries.append(entry)
+        return entries
+
+    def get_scenario_seed(self, repetition: int):
+        if self.seed is None:
+            return None
+        return int(np.random.SeedSequence(self.seed, spawn_key=(repetition,)).generate_state(1)[0])
+
+    def get_network_description(self, network: dict):
+        """
+        Gets network description, created once per network.
+        :param network: network of an entry.
+        :return: network description.
+        """
+        key = json.dumps(network, sort_keys=True)
+        if key not in self.network_descriptions:
+            network_description_class, specification = TECHNOLOGIES[network['technology']]
+            rng = None if self.seed is None else RandomStreams(self.seed).get_rng(RandomStream.NETWORK)
+            self.network_descriptions[key] = network_description_class(
+                simbench_code=network['simbench_code'],
+                specification=specification,
+                system_state=SystemState[network['system_state']],
+                max_number_of_agents_per_type=network['num_agents'],
+                rng=rng)
+        return self.network_descriptions[key]
+
+    def get_communication_graph(self, network: dict, graph: str):
+        """
+        Gets communication graph, created once per network and graph type.
+        :param network: network of an entry.
+        :param graph: graph type of an entry.
+        :return: communication graph.
+        """
+        key = (json.dumps(network, sort_keys=True), graph)
+        if key not in self.communication_graphs:
+            rng = None if self.seed is None else RandomStreams(self.seed).get_rng(RandomStream.GRAPH)
+            self.communication_graphs[key] = GRAPH_TYPES[graph](self.get_network_description(network),
+                                                                network['num_agents'], rng)
+        return self.communication_graphs[key]
+
+    def create_scenario(self, entry: dict) -> CommunicationScenarioDescription:
+        """
+        Creates scenario of an entry.
+        :param entry: entry (see expand).
+        :return: scenario.
+        """
+        network_description = self.get_network_description(entry['network'])
+        communication_graph = self.get_communication_graph(entry['network'], entry['graph'])
+        parameters = {name: resolve_parameter(name, value) for name, value in entry['parameters'].items()}
+        pattern = getattr(agent_communication_pattern, entry['pattern'])(
+            simulation_duration_ms=entry['simulation_duration_ms'],
+            communication_graph=communication_graph,
+            **parameters)
+        return CommunicationScenarioDescription(description_text=get_description_text(entry),
+                                                communication_network_description=network_description,
+                                                agent_communication_pattern=pattern,
+                                                communication_graph=communication_graph,
+                                                seed=entry['seed'])
+
+    def create_scenarios(self, entries=None) -> list[CommunicationScenarioDescription]:
+        """
+        Creates scenarios of all entries, entries are sorted by network so each network is extracted once in a row.
+        :param entries: entries, expanded from the specification if None.
+        :return: list of scenarios.
+        """
+        entries = self.expand() if entries is None else entries
+        return [self.create_scenario(entry) for entry in sort_entries(entries)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a sweep of scenarios described by a YAML or JSON file.')
+    parser.add_argument('specification', help='path of the sweep specification')
+    parser.add_argument('--dry-run', action='store_true', help='only list the scenarios of the sweep')
+    parser.add_argument('--max-concurrent-runs', type=int, default=None,
+                        help='maximal number of concurrent simulations (default: number of cores)')
+    parser.add_argument('--keep-run-directories', action='store_true',
+                        help='keep run directories of successful runs')
+    parser.add_argument('--queue', default=None,
+                        help='path of a SQLite campaign queue: scenarios that are done are skipped, several workers '
+                             'can run the same sweep with the same queue')
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help='runs of a scenario of the queue before it is failed')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='return failed scenarios of the queue to the queue')
+    args = parser.parse_args(argv)
+
+    sweep_specification = SweepSpecification.from_file(args.specification)
+    entries = sweep_specification.expand()
+    print(f'Sweep {os.path.basename(args.specification)} with {len(entries)} scenarios.')
+    if args.dry_run:
+        for entry in entries:
+            print(get_description_text(entry))
+        return
+    if args.queue is None:
+        scenarios = sweep_specification.create_scenarios(entries)
+        ScenarioRunner(scenarios, args.max_concurrent_runs, args.keep_run_directories).run()
+        return
+
+    campaign_queue = CampaignQueue(args.queue, args.max_attempts)
+    added_jobs = campaign_queue.add_jobs({get_entry_fingerprint(entry): entry for entry in sort_entries(entries)})
+    print(f'Added {added_jobs} scenarios to {args.queue}.')
+    if args.retry_failed:
+        print(f'Returned {campaign_queue.retry_failed_jobs()} failed scenarios to the queue.')
+    campaign_queue.print_summary()
+    try:
+        CampaignWorker(campaign_queue, sweep_specification.create_scenario, args.max_concurrent_runs,
+                       args.keep_run_directories).run()
+    finally:
+        campaign_queue.close()
+
+
+if __name__ == '__main__':
+    main()
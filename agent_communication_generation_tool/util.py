@@ -1,3 +1,4 @@
+import os
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -9,6 +10,8 @@ import matplotlib.pyplot as plt
 
 from agent_communication_generation_tool.description_classes.passwords import MAIL_ADDRESS, PASSWORD
 
+PLOT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'plots')
+
 
 def merge_input_and_output_df(input_df, output_df):
     try:
@@ -133,6 +136,6 @@ def plot_traffic_pattern(scenario_description,
     plt.tight_layout()
 
     # Save the plot
-    plt.savefig(f'../../agent_communication_generation_tool/results/plots/{scenario_description.id}')
+    plt.savefig(os.path.join(PLOT_DIRECTORY, f'{scenario_description.id}'))
     plt.clf()
     plt.close()
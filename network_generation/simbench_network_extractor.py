@@ -1,5 +1,4 @@
 import math
-import random
 import warnings
 import os
 from abc import ABC, abstractmethod
@@ -17,6 +16,7 @@ from agent_communication_generation_tool.description_classes.agent import LeafAg
 warnings.filterwarnings('ignore')
 
 ROOT = str(Path(abspath(__file__)).parent.parent)
+OMNET_PROJECT_DIRECTORY = os.path.join(ROOT, 'omnet_project_files')
 
 
 class SystemState(Enum):
@@ -52,9 +52,9 @@ class CommunicationConnection:
         return f'{name_1}.{self.connector_1[1]} <--> {self.conn_type} <--> {name_2}.{self.connector_2[1]}'
 
 
-def delete_old_config_section():
+def delete_old_config_section(ini_file_path='omnet_project_files/omnetpp.ini'):
     # Open the file and read its contents
-    with open('omnet_project_files/omnetpp.ini', 'r') as file:
+    with open(ini_file_path, 'r') as file:
         content = file.read()
 
     # Create the pattern string to search for
@@ -73,7 +73,7 @@ def delete_old_config_section():
             modified_content = content[:start_index]
 
         # Write the modified content back to the file
-        with open('omnet_project_files/omnetpp.ini', 'w') as file:
+        with open(ini_file_path, 'w') as file:
             file.write(modified_content)
         print("File modified successfully.")
     else:
@@ -81,8 +81,11 @@ def delete_old_config_section():
 
 
 class SimbenchNetworkExtractor(ABC):
-    def __init__(self, simbench_code, system_state=SystemState.NORMAL, max_number_of_agents_per_type=None):
+    def __init__(self, simbench_code, system_state=SystemState.NORMAL, max_number_of_agents_per_type=None,
+                 rng: np.random.Generator = None):
         self.simbench_code = simbench_code
+        # random number generator of traffic devices (positions and destinations)
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.simbench_network = None
         self.system_state = system_state
         self.max_number_of_agents_per_type = max_number_of_agents_per_type
@@ -96,6 +99,15 @@ class SimbenchNetworkExtractor(ABC):
 
         self.agents = list()
         self.traffic_devices = list()
+        # destination of each traffic device and index of its replacement if the destination is pruned, drawn once
+        # so the files do not depend on how often the network is written
+        self.traffic_device_destinations = list()
+        self.traffic_device_replacement_indices = list()
+        # omnet names of agents that are left out of the OMNeT++ network in the files that are written
+        # (see prune_agents)
+        self.pruned_agent_names = set()
+        # pruned agents of the files written to each directory
+        self.pruned_agent_names_by_directory = dict()
 
         self.network_size = (0, 0)
 
@@ -115,7 +127,6 @@ class SimbenchNetworkExtractor(ABC):
         self.grid_operator_agent = None
 
     def initialize_network(self):
-        config_name = 'SimbenchNetwork' + self.simbench_code.replace('-', '_')
         self.simbench_network = sb.get_simbench_net(self.simbench_code)
 
         self.get_agents_from_simbench_network()
@@ -132,22 +143,37 @@ class SimbenchNetworkExtractor(ABC):
         if self.system_state == SystemState.LIMITED or self.system_state == SystemState.FAILED:
             self.add_traffic_devices()
         self.place_communication_infrastructure()
+        self.draw_traffic_device_destinations()
 
         os.chdir(ROOT)
 
-        delete_old_config_section()
+        self.write_omnet_files(save_as_result=True)
+        self.pruned_agent_names_by_directory[OMNET_PROJECT_DIRECTORY] = set()
+
+    def write_omnet_files(self, save_as_result=False, project_directory='omnet_project_files'):
+        """
+        Writes the .ned network description and the config section of the omnetpp.ini.
+        :param save_as_result: whether to save the files in the results folder as well (if they do not exist yet).
+        :param project_directory: OMNeT++ project or run directory (with a copy of the omnetpp.ini) to write to.
+        """
+        config_name = 'SimbenchNetwork' + self.simbench_code.replace('-', '_')
+        delete_old_config_section(os.path.join(project_directory, 'omnetpp.ini'))
 
         network_description = self.get_omnet_network_description()
         ini_config = self.get_omnet_ini_config()
 
-        with open(f'omnet_project_files/networks/SimbenchNetwork.ned', 'w') as f:
+        os.makedirs(os.path.join(project_directory, 'networks'), exist_ok=True)
+        with open(os.path.join(project_directory, 'networks', 'SimbenchNetwork.ned'), 'w') as f:
             f.write(network_description)
             f.close()
 
-        with open(f'omnet_project_files/omnetpp.ini', 'a') as config:
+        with open(os.path.join(project_directory, 'omnetpp.ini'), 'a') as config:
             config.write(ini_config)
             config.close()
 
+        if not save_as_result:
+            return
+
         # save as result
         directory = "agent_communication_generation_tool/results/ned_files"
 
@@ -162,6 +188,52 @@ class SimbenchNetworkExtractor(ABC):
             with open(ini_file_path, 'w') as f:
                 f.write(ini_config)
 
+    def get_simulated_agents(self) -> list[Agent]:
+        """
+        Gets agents that are part of the OMNeT++ network (all agents that are not pruned).
+        :return: list of agents.
+        """
+        if len(self.pruned_agent_names) == 0:
+            return self.agents
+        return [agent for agent in self.agents if agent.omnet_name not in self.pruned_agent_names]
+
+    def get_simulated_connections(self) -> list[CommunicationConnection]:
+        """
+        Gets connections without connections to pruned agents.
+        :return: list of connections.
+        """
+        if len(self.pruned_agent_names) == 0:
+            return self.communication_connections
+        return [connection for connection in self.communication_connections
+                if not any(isinstance(connector[0], Agent) and connector[0].omnet_name in self.pruned_agent_names
+                           for connector in (connection.connector_1, connection.connector_2))]
+
+    def prune_agents(self, active_agent_names=None, project_directory=None):
+        """
+        Leaves agents that neither send nor receive out of the OMNeT++ network (submodules, connections and app
+        parameters) and rewrites the .ned and .ini files. Pruning is always applied to the full set of agents, so
+        pruning with None restores the complete network.
+        :param active_agent_names: omnet names of agents that send or receive messages, None to keep all agents.
+        :param project_directory: run directory to write the files to (always written), the files of the OMNeT++
+        project are rewritten if None (only if the pruned agents of these files changed).
+        :return: omnet names of the pruned agents.
+        """
+        pruned_agent_names = set()
+        if active_agent_names is not None:
+            pruned_agent_names = {agent.omnet_name for agent in self.agents
+                                  if agent.omnet_name not in active_agent_names}
+        self.pruned_agent_names = pruned_agent_names
+        if project_directory is not None:
+            self.write_omnet_files(project_directory=project_directory)
+            self.pruned_agent_names_by_directory[os.path.abspath(project_directory)] = pruned_agent_names
+            return pruned_agent_names
+        if pruned_agent_names == self.pruned_agent_names_by_directory.get(OMNET_PROJECT_DIRECTORY):
+            return pruned_agent_names
+        self.write_omnet_files(project_directory=OMNET_PROJECT_DIRECTORY)
+        self.pruned_agent_names_by_directory[OMNET_PROJECT_DIRECTORY] = pruned_agent_names
+        print(f'Pruned {len(pruned_agent_names)} idle agents from the network.')
+        return pruned_agent_names
+
     def get_network_area(self, agents=None):
         if not agents:
             agents = self.agents
@@ -332,9 +404,31 @@ class SimbenchNetworkExtractor(ABC):
         self.traffic_devices.extend([CommunicationInfrastructure(
             class_name='StandardHost',
             identifier=f'traffic_device_{i}',
-            position=(random.randint(10, 100), random.randint(10, 100))
+            position=tuple(self.rng.integers(10, 100, endpoint=True, size=2).tolist())
         ) for i in range(num_traffic_devices)])
 
+    def draw_traffic_device_destinations(self):
+        """
+        Draws the destination of each traffic device among all agents and the index of its replacement among the
+        simulated agents, in case the destination is pruned.
+        """
+        self.traffic_device_destinations = [self.agents[int(self.rng.integers(len(self.agents)))]
+                                            for _ in self.traffic_devices]
+        self.traffic_device_replacement_indices = self.rng.integers(len(self.agents),
+                                                                    size=len(self.traffic_devices)).tolist()
+
+    def get_traffic_device_destination(self, i: int) -> Agent:
+        """
+        Gets destination of a traffic device, pruned destinations are replaced by a simulated agent.
+        :param i: index of the traffic device.
+        :return: agent.
+        """
+        destination = self.traffic_device_destinations[i]
+        if destination.omnet_name not in self.pruned_agent_names:
+            return destination
+        agents = self.get_simulated_agents()
+        return agents[self.traffic_device_replacement_indices[i] % len(agents)]
+
     def add_aggregator_level_agents(self, centroid: tuple, cluster_id: int):
         new_agents = []
         # per cluster
@@ -401,8 +495,8 @@ class SimbenchNetworkExtractor(ABC):
 
 
 class Simbench5GNetworkExtractor(SimbenchNetworkExtractor):
-    def __init__(self, simbench_code, system_state, max_number_agents_per_type=None):
-        super().__init__(simbench_code, system_state, max_number_agents_per_type)
+    def __init__(self, simbench_code, system_state, max_number_agents_per_type=None, rng: np.random.Generator = None):
+        super().__init__(simbench_code, system_state, max_number_agents_per_type, rng)
         self.gNodeBs = []
 
     def place_communication_infrastructure(self):
@@ -576,7 +670,7 @@ class Simbench5GNetworkExtractor(SimbenchNetworkExtractor):
         for module in self.traffic_devices:
             submodules += (f'\t{module.identifier}: NRUe' + '{' +
                            f'@display("p={int(module.position[0])},{int(module.position[1])}");' + '}\n')
-        for agent in self.agents:
+        for agent in self.get_simulated_agents():
             if isinstance(agent, CentralAgent):
                 submodules += (
                         f'\t{agent.omnet_name}: StandardHost ' +
@@ -586,7 +680,7 @@ class Simbench5GNetworkExtractor(SimbenchNetworkExtractor):
                                '{@display("p=' + f'{int(agent.coordinates[0])},{int(agent.coordinates[1])}' + '");}\n')
 
         connections = 'connections:\n'
-        for connection in self.communication_connections:
+        for connection in self.get_simulated_connections():
             connections += '\t' + connection.get_connection_string() + ';\n'
 
         return imports + network + parameters + submodules + connections + '}'
@@ -596,7 +690,7 @@ class Simbench5GNetworkExtractor(SimbenchNetworkExtractor):
                          f'network = SimbenchNetwork5G\n'
                          f'extends = Net5G\n')
 
-        for i, agent in enumerate(self.agents):  # TODO: if multiple agents: assign to antenna
+        for i, agent in enumerate(self.get_simulated_agents()):  # TODO: if multiple agents: assign to antenna
             config_string += f'**.{agent.omnet_name}.app[0].localPort = {agent.omnet_port}\n'
             config_string += \
                 (f'**.{agent.omnet_name}.app[0].trafficConfigPath = '
@@ -614,15 +708,16 @@ class Simbench5GNetworkExtractor(SimbenchNetworkExtractor):
         if len(self.gNodeBs) > 1:
             config_string += f'*.gNB*.numX2Apps = {len(self.gNodeBs)-1}\n*.gNB*.x2App[*].server.localPort = 5000 + ancestorIndex(1)\n'
 
-        for traffic_device in self.traffic_devices:
-            config_string += f'*.{traffic_device.identifier}.app[*].destAddress = "{random.choice(self.agents).omnet_name}"\n'
+        for i, traffic_device in enumerate(self.traffic_devices):
+            config_string += (f'*.{traffic_device.identifier}.app[*].destAddress = '
+                              f'"{self.get_traffic_device_destination(i).omnet_name}"\n')
         return config_string
 
 
 class SimbenchEthernetNetworkExtractor(SimbenchNetworkExtractor):
 
-    def __init__(self, simbench_code, system_state, max_number_of_agents_per_type):
-        super().__init__(simbench_code, system_state, max_number_of_agents_per_type)
+    def __init__(self, simbench_code, system_state, max_number_of_agents_per_type, rng: np.random.Generator = None):
+        super().__init__(simbench_code, system_state, max_number_of_agents_per_type, rng)
 
     def place_communication_infrastructure(self):
         non_central_agents = [agent for agent in self.agents if not isinstance(agent, CentralAgent)]
@@ -723,7 +818,7 @@ class SimbenchEthernetNetworkExtractor(SimbenchNetworkExtractor):
         for module in self.communication_infrastructure:
             submodules += (f'\t{module.identifier}: {module.class_name}' + '{' +
                            f'@display("p={int(module.position[0])},{int(module.position[1])}");' + '}\n')
-        for agent in self.agents:
+        for agent in self.get_simulated_agents():
             submodules += (
                     f'\t{agent.omnet_name}: StandardHost ' +
                     '{@display("p=' + f'{int(agent.coordinates[0])},{int(agent.coordinates[1])}' + '");}\n')
@@ -732,7 +827,7 @@ class SimbenchEthernetNetworkExtractor(SimbenchNetworkExtractor):
             submodules += (f'\t{traffic_device.identifier}: Ue ' +
                            '{@display("p=' + f'{int(traffic_device.position[0])},{int(traffic_device.position[1])}' + '");}\n')
         connections = 'connections:\n'
-        for connection in self.communication_connections:
+        for connection in self.get_simulated_connections():
             connections += '\t' + connection.get_connection_string() + ';\n'
 
         return imports + network + parameters + submodules + connections + '}'
@@ -742,24 +837,25 @@ class SimbenchEthernetNetworkExtractor(SimbenchNetworkExtractor):
                          f'network = SimbenchNetwork\n'
                          f'extends = Ethernet\n')
 
-        for i, agent in enumerate(self.agents):
+        for i, agent in enumerate(self.get_simulated_agents()):
             config_string += f'**.{agent.omnet_name}.app[0].localPort = {agent.omnet_port}\n'
             config_string += \
                 (f'**.{agent.omnet_name}.app[0].trafficConfigPath = '
                  f'"modules/traffic_configurations/traffic_config_{agent.omnet_name}.json"\n')
         config_string += '*.server.numApps=0\n'
-        for traffic_device in self.traffic_devices:
+        for i, traffic_device in enumerate(self.traffic_devices):
             config_string += (f'*.{traffic_device.identifier}.app[*].destAddress = '
-                              f'"{random.choice(self.agents).omnet_name}"\n')
+                              f'"{self.get_traffic_device_destination(i).omnet_name}"\n')
         return config_string
 
 
 class SimbenchLTENetworkExtractor(SimbenchNetworkExtractor):
 
-    def __init__(self, simbench_code, system_state, specification, max_number_of_agents_per_type):
+    def __init__(self, simbench_code, system_state, specification, max_number_of_agents_per_type,
+                 rng: np.random.Generator = None):
         self.eNodeBs = []
         self.specification = specification
-        super().__init__(simbench_code, system_state, max_number_of_agents_per_type)
+        super().__init__(simbench_code, system_state, max_number_of_agents_per_type, rng)
 
     def place_communication_infrastructure(self):
         # place channel control
@@ -905,7 +1001,7 @@ class SimbenchLTENetworkExtractor(SimbenchNetworkExtractor):
         for module in self.communication_infrastructure:
             submodules += (f'\t{module.identifier}: {module.class_name}' + '{' +
                            f'@display("p={int(module.position[0])},{int(module.position[1])};is=vl");' + '}\n')
-        for agent in self.agents:
+        for agent in self.get_simulated_agents():
             if isinstance(agent, CentralAgent):
                 submodules += (
                         f'\t{agent.omnet_name}: StandardHost ' +
@@ -918,7 +1014,7 @@ class SimbenchLTENetworkExtractor(SimbenchNetworkExtractor):
             submodules += (f'\t{traffic_device.identifier}: Ue ' +
                            '{@display("p=' + f'{int(traffic_device.position[0])},{int(traffic_device.position[1])}' + '");}\n')
         connections = 'connections:\n'
-        for connection in self.communication_connections:
+        for connection in self.get_simulated_connections():
             connections += '\t' + connection.get_connection_string() + ';\n'
 
         return imports + network + parameters + submodules + connections + '}'
@@ -928,7 +1024,7 @@ class SimbenchLTENetworkExtractor(SimbenchNetworkExtractor):
                          f'network = SimbenchNetwork\n'
                          f'extends = {self.specification.name}\n')
 
-        for i, agent in enumerate(self.agents):  # TODO: if multiple agents: assign to antenna
+        for i, agent in enumerate(self.get_simulated_agents()):  # TODO: if multiple agents: assign to antenna
             config_string += f'**.{agent.omnet_name}.app[0].localPort = {agent.omnet_port}\n'
             config_string += \
                 (f'**.{agent.omnet_name}.app[0].trafficConfigPath = '
@@ -947,7 +1043,7 @@ class SimbenchLTENetworkExtractor(SimbenchNetworkExtractor):
         if len(self.eNodeBs) > 1:
             config_string += f'*.eNB*.numX2Apps = {len(self.eNodeBs)-1}\n*.eNB*.x2App[*].server.localPort = 5000 + ancestorIndex(1)\n'
 
-        for traffic_device in self.traffic_devices:
+        for i, traffic_device in enumerate(self.traffic_devices):
             config_string += (f'*.{traffic_device.identifier}.app[*].destAddress = '
-                              f'"{random.choice(self.agents).omnet_name}"\n')
+                              f'"{self.get_traffic_device_destination(i).omnet_name}"\n')
         return config_string
@@ -51,6 +51,12 @@ void TrafficApp::initialize(int stage) {
 
 
 void TrafficApp::initializeTrafficMessages() {
+    std::string bundlePath = par("trafficBundlePath").stdstringValue();
+    if (!bundlePath.empty()) {
+        initializeTrafficMessagesFromBundle(bundlePath);
+        return;
+    }
+
     std::ifstream f(par("trafficConfigPath").stringValue());
     if (!f.is_open()) {
         return;
@@ -76,31 +82,137 @@ void TrafficApp::initializeTrafficMessages() {
         std::string receiver = message["receiver"];
         int receiverPort = message["receiverPort"];
         int packetSize_B = message["packetSize_B"];
-
-
-        inet::Packet *packet = new inet::Packet("data");
-        const auto& trafficPayload = inet::makeShared<CustomTrafficChunk>();
-        trafficPayload->setMsgId(msgId);
-        trafficPayload->setTimeSend_ms(timeSend_ms);
-        trafficPayload->setSender(moduleName);
-        trafficPayload->setSenderPort(serverSocket.getLocalPort());
-        trafficPayload->setReceiver(receiver.c_str());
-        trafficPayload->setReceiverPort(receiverPort);
-        trafficPayload->setPacketSize_B(packetSize_B);
-        trafficPayload->setChunkLength(inet::B(packetSize_B));
-        portToName[receiverPort] = receiver;
-        packet->insertAtBack(trafficPayload);
+        bool reply = false;
+        int replyAfter_ms = 0;
         // Check for "reply" field and set it if present
         if (message.find("reply") != message.end()) {
-            auto replyValue = message["reply"];
-            int replyAfter_ms = message["replyAfter_ms"];
-            trafficPayload->setReply(replyValue);
-            trafficPayload->setReplyAfter(replyAfter_ms);
+            reply = message["reply"];
+            replyAfter_ms = message["replyAfter_ms"];
         }
+        addTrafficMessage(msgId, timeSend_ms, receiver, receiverPort, packetSize_B, reply, replyAfter_ms);
+    }
+
+    // Expand periodic stream rules (see StreamRule in traffic_configuration.py)
+    if (data.find("streamList") != data.end()) {
+        for (const auto& stream : data["streamList"]) {
+            std::string receiver = stream["receiver"];
+            int receiverPort = stream["receiverPort"];
+            int start_ms = stream["start_ms"];
+            int period_ms = stream["period_ms"];
+            int count = stream["count"];
+            int firstMsgId = stream["firstMsgId"];
+            int msgIdStride = stream["msgIdStride"];
+            int packetSizeMin_B = stream["packetSizeMin_B"];
+            int packetSizeMax_B = stream["packetSizeMax_B"];
+            bool reply = stream["reply"];
+            int replyAfterMin_ms = stream["replyAfterMin_ms"];
+            int replyAfterMax_ms = stream["replyAfterMax_ms"];
+            uint64_t seed = stream["seed"];
+
+            for (int k = 0; k < count; k++) {
+                int packetSize_B = drawFromCounterRange(seed, 2 * (uint64_t) k, packetSizeMin_B, packetSizeMax_B);
+                int replyAfter_ms = 0;
+                if (reply) {
+                    replyAfter_ms = drawFromCounterRange(seed, 2 * (uint64_t) k + 1, replyAfterMin_ms, replyAfterMax_ms);
+                }
+                addTrafficMessage(firstMsgId + k * msgIdStride, start_ms + k * period_ms, receiver, receiverPort,
+                                  packetSize_B, reply, replyAfter_ms);
+            }
+        }
+    }
+}
+
+// Parse header, index and name table of a traffic bundle, all values are little-endian (as the host)
+static const TrafficBundleIndex& getTrafficBundleIndex(const std::string& bundlePath) {
+    static std::map<std::string, TrafficBundleIndex> bundleIndices;
+    auto it = bundleIndices.find(bundlePath);
+    if (it != bundleIndices.end()) {
+        return it->second;
+    }
+
+    std::ifstream f(bundlePath, std::ios::binary);
+    if (!f.is_open()) {
+        throw cRuntimeError("TrafficApp: cannot open traffic bundle %s.", bundlePath.c_str());
+    }
+    char magic[4];
+    uint32_t version, numAgents;
+    TrafficBundleIndex index;
+    f.read(magic, 4);
+    f.read(reinterpret_cast<char *>(&version), sizeof(version));
+    f.read(reinterpret_cast<char *>(&numAgents), sizeof(numAgents));
+    f.read(reinterpret_cast<char *>(&index.recordSize), sizeof(index.recordSize));
+    f.read(reinterpret_cast<char *>(&index.recordsOffset), sizeof(index.recordsOffset));
+    if (!f || std::string(magic, 4) != "TRCB" || version != 1 || index.recordSize != 7 * sizeof(int32_t)) {
+        throw cRuntimeError("TrafficApp: %s is not a supported traffic bundle.", bundlePath.c_str());
+    }
+
+    // index entries: name offset, name length, first record, number of records
+    struct IndexEntry {
+        uint32_t nameOffset;
+        uint32_t nameLength;
+        uint64_t firstRecord;
+        uint64_t numRecords;
+    };
+    std::vector<IndexEntry> entries(numAgents);
+    f.read(reinterpret_cast<char *>(entries.data()), numAgents * sizeof(IndexEntry));
+    uint64_t nameTableOffset = f.tellg();
+    std::string nameTable(index.recordsOffset - nameTableOffset, '\0');
+    f.read(&nameTable[0], nameTable.size());
+
+    for (const auto& entry : entries) {
+        std::string name = nameTable.substr(entry.nameOffset, entry.nameLength);
+        index.agentNames.push_back(name);
+        index.agentRecords[name] = std::make_pair(entry.firstRecord, entry.numRecords);
+    }
+    return bundleIndices.emplace(bundlePath, index).first->second;
+}
 
-        messageMap[receiverPort][timeSend_ms] = packet;
-        connectToTimeToPort[timeSend_ms].push_back(receiverPort);
+void TrafficApp::initializeTrafficMessagesFromBundle(const std::string& bundlePath) {
+    const TrafficBundleIndex& index = getTrafficBundleIndex(bundlePath);
+    auto it = index.agentRecords.find(moduleName);
+    if (it == index.agentRecords.end() || it->second.second == 0) {
+        return;
     }
+
+    // read all records of this module with one read
+    uint64_t numRecords = it->second.second;
+    std::vector<int32_t> records(7 * numRecords);
+    std::ifstream f(bundlePath, std::ios::binary);
+    f.seekg(index.recordsOffset + it->second.first * index.recordSize);
+    f.read(reinterpret_cast<char *>(records.data()), numRecords * index.recordSize);
+    if (!f) {
+        throw cRuntimeError("TrafficApp: traffic bundle %s is truncated.", bundlePath.c_str());
+    }
+
+    // record: msgId, timeSend_ms, receiver (index in name table), receiverPort, packetSize_B, reply, replyAfter_ms
+    for (uint64_t i = 0; i < numRecords; i++) {
+        const int32_t *record = &records[7 * i];
+        addTrafficMessage(record[0], record[1], index.agentNames.at(record[2]), record[3], record[4],
+                          record[5] != 0, record[6]);
+    }
+}
+
+void TrafficApp::addTrafficMessage(int msgId, int timeSend_ms, std::string receiver, int receiverPort,
+                                   int packetSize_B, bool reply, int replyAfter_ms) {
+    inet::Packet *packet = new inet::Packet("data");
+    const auto& trafficPayload = inet::makeShared<CustomTrafficChunk>();
+    trafficPayload->setMsgId(msgId);
+    trafficPayload->setTimeSend_ms(timeSend_ms);
+    trafficPayload->setSender(moduleName);
+    trafficPayload->setSenderPort(serverSocket.getLocalPort());
+    trafficPayload->setReceiver(receiver.c_str());
+    trafficPayload->setReceiverPort(receiverPort);
+    trafficPayload->setPacketSize_B(packetSize_B);
+    trafficPayload->setChunkLength(inet::B(packetSize_B));
+    portToName[receiverPort] = receiver;
+    packet->insertAtBack(trafficPayload);
+    if (reply) {
+        trafficPayload->setReply(reply);
+        trafficPayload->setReplyAfter(replyAfter_ms);
+    }
+
+    messageMap[receiverPort][timeSend_ms] = packet;
+    connectToTimeToPort[timeSend_ms].push_back(receiverPort);
 }
 
 void TrafficApp::handleMessageWhenUp(cMessage *msg)
@@ -103,6 +103,27 @@ private:
 };
 
 
+// Counter-based hash (SplitMix64), identical to splitmix64 in traffic_configuration.py
+inline uint64_t splitMix64(uint64_t seed, uint64_t counter) {
+    uint64_t z = seed + (counter + 1) * 0x9E3779B97F4A7C15ULL;
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    return z ^ (z >> 31);
+}
+
+// Maps hashed counter to an integer in [low, high]
+inline int drawFromCounterRange(uint64_t seed, uint64_t counter, int low, int high) {
+    return low + (int) (splitMix64(seed, counter) % (uint64_t) (high - low + 1));
+}
+
+// Index of a traffic bundle (see traffic_bundle.py), parsed once per file and shared by all TrafficApps
+struct TrafficBundleIndex {
+    uint64_t recordsOffset = 0;
+    uint32_t recordSize = 0;
+    std::vector<std::string> agentNames;
+    std::map<std::string, std::pair<uint64_t, uint64_t>> agentRecords; // <agent, <first record, number of records>>
+};
+
 class TrafficApp : public inet::TcpAppBase {
 private:
     inet::TcpSocket serverSocket;
@@ -134,6 +155,15 @@ protected:
     void initialize(int stage) override;
 
     virtual void initializeTrafficMessages();
+    /**
+     * Read the messages of this module from the traffic bundle instead of the json traffic configuration.
+     */
+    virtual void initializeTrafficMessagesFromBundle(const std::string& bundlePath);
+    /**
+     * Create packet of a message from the traffic configuration and schedule it.
+     */
+    virtual void addTrafficMessage(int msgId, int timeSend_ms, std::string receiver, int receiverPort,
+                                   int packetSize_B, bool reply, int replyAfter_ms);
     /**
      * Return number of init stages.
      */
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory of "agent_communication_generation_tool" to sys.path
+sys.path.append(Path(__file__).parent.parent.absolute().__str__())
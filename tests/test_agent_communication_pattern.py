@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_communication_generation_tool.description_classes.agent import LeafAgent, CentralAgent
+from agent_communication_generation_tool.description_classes.agent_communication_pattern import \
+    ScheduledAutomatedMeterReading
+from agent_communication_generation_tool.description_classes.communication_graph import StarCommunicationGraph
+
+
+@pytest.fixture
+def create_pattern(tmp_path, monkeypatch):
+    # traffic configuration files are written to (and deleted from) a temporary directory
+    monkeypatch.chdir(tmp_path)
+    return lambda: get_pattern(tmp_path)
+
+
+def get_pattern(tmp_path):
+    central_agent = CentralAgent('control_center_agent', 1000, CentralAgent.CentralAgentType.CONTROL_CENTER_AGENT)
+    households = [LeafAgent(f'household_agent_{i}', 1001 + i, LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
+                  for i in range(7)]
+    graph = StarCommunicationGraph(households + [central_agent], central_agent)
+    pattern = ScheduledAutomatedMeterReading(10000, graph)
+    pattern.traffic_configuration_directory = str(tmp_path / 'traffic_configurations')
+    return pattern
+
+
+def generate_time_grids(create_pattern, num_workers=1, window_ms=None, use_stream_rules=False,
+                        times_send_ms=np.arange(0, 10000, 1000)):
+    pattern = create_pattern()
+    pattern.set_rng(np.random.default_rng(1))
+    pattern.num_workers = num_workers
+    pattern.window_ms = window_ms
+    pattern.use_stream_rules = use_stream_rules
+    graph = pattern.communication_graph
+    central_agent = graph.central_agent
+    senders = [agent for agent in graph.agents if agent is not central_agent]
+    pattern.add_time_grids_for_senders(senders, [[central_agent]] * len(senders), times_send_ms,
+                                       list(range(100, 100 + len(senders))), expect_reply=True,
+                                       reply_after_ms_range=(10, 500))
+    # later draws of the pattern must not depend on the generation of the time grids either
+    next_draw = int(pattern.rng.integers(2 ** 63))
+    inputs = pattern.get_inputs().sort_values('msgId').reset_index(drop=True)
+    seeds = sorted(rule.seed for config in pattern.traffic_configurations.values() for rule in config.stream_rules)
+    return inputs, seeds, next_draw
+
+
+@pytest.mark.parametrize('use_stream_rules', [False, True])
+def test_time_grids_do_not_depend_on_number_of_workers(create_pattern, use_stream_rules):
+    inputs, seeds, next_draw = generate_time_grids(create_pattern, 1, use_stream_rules=use_stream_rules)
+    for num_workers in [2, 3]:
+        other_inputs, other_seeds, other_next_draw = generate_time_grids(create_pattern, num_workers,
+                                                                         use_stream_rules=use_stream_rules)
+        pd.testing.assert_frame_equal(inputs, other_inputs)
+        assert seeds == other_seeds
+        assert next_draw == other_next_draw
+
+
+def test_streaming_mode_keeps_sending_times_after_simulation_end(create_pattern):
+    # e.g. send_only_once draws the sending time from [0, simulation_duration_ms]
+    times_send_ms = np.array([0, 4000, 10000, 12500])
+    inputs, _, _ = generate_time_grids(create_pattern, times_send_ms=times_send_ms)
+    streamed_inputs, _, _ = generate_time_grids(create_pattern, window_ms=3000, times_send_ms=times_send_ms)
+    assert inputs['timeSend_ms'].max() == 12500
+    pd.testing.assert_frame_equal(inputs, streamed_inputs, check_dtype=False)
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from agent_communication_generation_tool.description_classes.campaign_queue import CampaignQueue, JobState, \
+    get_process_start_time
+
+JOBS = {'a': {'name': 'a'}, 'b': {'name': 'b'}}
+
+
+@pytest.fixture
+def create_queue(tmp_path):
+    queues = []
+
+    def create(worker_id=None, **kwargs):
+        queue = CampaignQueue(str(tmp_path / 'campaign.sqlite'), **kwargs)
+        if worker_id is not None:
+            queue.worker_id = worker_id
+        queues.append(queue)
+        return queue
+
+    yield create
+    for queue in queues:
+        queue.close()
+
+
+def get_dead_worker_id() -> str:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    start_time = get_process_start_time(process.pid)
+    process.wait()
+    return f'{socket.gethostname()}:{process.pid}:{"" if start_time is None else start_time}'
+
+
+def test_jobs_are_claimed_once(create_queue):
+    queue = create_queue()
+    assert queue.add_jobs(JOBS) == 2
+    assert queue.add_jobs(JOBS) == 0
+    other_queue = create_queue(worker_id='other-host:1:100')
+    assert queue.claim_job() == ('a', {'name': 'a'})
+    assert other_queue.claim_job() == ('b', {'name': 'b'})
+    assert queue.claim_job() is None
+    assert queue.get_counts()[JobState.RUNNING] == 2
+
+
+def test_failed_runs_are_retried_until_budget_is_used_up(create_queue):
+    queue = create_queue(max_attempts=2)
+    queue.add_jobs({'a': JOBS['a']})
+    for attempt in range(2):
+        fingerprint, _ = queue.claim_job()
+        queue.complete_job(fingerprint, 'error', 'scenario', None, '/runs/scenario')
+    job = queue.get_job('a')
+    assert job['state'] == JobState.FAILED
+    assert job['attempts'] == 2
+    assert job['error'] == 'error'
+    assert job['run_directory'] == '/runs/scenario'
+    assert queue.get_failed_jobs() == [('a', 'error')]
+
+    assert queue.retry_failed_jobs() == 1
+    assert queue.claim_job()[0] == 'a'
+    queue.complete_job('a', scenario_id='scenario', result_path='/results/data/scenario.csv')
+    job = queue.get_job('a')
+    assert job['state'] == JobState.DONE
+    assert job['attempts'] == 1
+    assert job['error'] is None
+    assert (job['scenario_id'], job['result_path'], job['run_directory']) == \
+           ('scenario', '/results/data/scenario.csv', None)
+
+
+def test_released_jobs_keep_their_retry_budget(create_queue):
+    queue = create_queue()
+    queue.add_jobs({'a': JOBS['a']})
+    queue.claim_job()
+    queue.release_job('a')
+    job = queue.get_job('a')
+    assert job['state'] == JobState.PENDING
+    assert job['attempts'] == 0
+    assert job['worker'] is None
+
+
+def test_jobs_of_crashed_workers_are_recovered(create_queue):
+    crashed_queue = create_queue(worker_id=get_dead_worker_id(), max_attempts=1)
+    crashed_queue.add_jobs(JOBS)
+    crashed_queue.claim_job()
+    live_queue = create_queue(max_attempts=1)
+    live_queue.claim_job()
+    assert live_queue.recover_jobs() == 1
+    assert live_queue.get_job('a')['state'] == JobState.FAILED
+    assert live_queue.get_job('b')['state'] == JobState.RUNNING
+
+
+def test_lease_does_not_apply_to_checked_local_workers(create_queue):
+    queue = create_queue(lease_s=60)
+    queue.add_jobs(JOBS)
+    queue.claim_job()
+    other_queue = create_queue(worker_id='other-host:1:100', lease_s=60)
+    other_queue.claim_job()
+    queue.connection.execute('UPDATE jobs SET claimed_at = ?', (time.time() - 120,))
+    assert queue.recover_jobs() == 1
+    assert queue.get_job('a')['state'] == JobState.RUNNING
+    assert queue.get_job('b')['state'] == JobState.PENDING
+
+
+def test_jobs_of_workers_with_reused_pid_are_recovered(create_queue):
+    start_time = get_process_start_time(os.getpid())
+    if start_time is None:
+        pytest.skip('process start times are not available')
+    # the pid of the crashed worker now belongs to this process
+    crashed_queue = create_queue(worker_id=f'{socket.gethostname()}:{os.getpid()}:{start_time - 1}')
+    crashed_queue.add_jobs({'a': JOBS['a']})
+    crashed_queue.claim_job()
+    assert create_queue().recover_jobs() == 1
+    assert crashed_queue.get_job('a')['state'] == JobState.PENDING
+
+
+def test_lease_applies_to_local_workers_without_start_time(create_queue):
+    queue = create_queue(worker_id=f'{socket.gethostname()}:{os.getpid()}:', lease_s=60)
+    queue.add_jobs({'a': JOBS['a']})
+    queue.claim_job()
+    assert queue.recover_jobs() == 0
+    queue.connection.execute('UPDATE jobs SET claimed_at = ?', (time.time() - 120,))
+    assert queue.recover_jobs() == 1
+
+
+class Scenario:
+    def __init__(self):
+        self.id = 'scenario'
+        self.simulation_process_result = None
+        self.result_file_path = None
+        self.run_directory = None
+
+
+def run_worker(queue, run_scenario):
+    pytest.importorskip('simbench')
+    from agent_communication_generation_tool.description_classes.scenario_runner import CampaignWorker
+
+    class Worker(CampaignWorker):
+        async def run_scenario(self, scenario, semaphore):
+            run_scenario(scenario)
+
+    asyncio.run(Worker(queue, lambda entry: Scenario(), max_concurrent_runs=1).run_scenarios())
+
+
+def test_worker_stores_result_location(create_queue):
+    queue = create_queue()
+    queue.add_jobs({'a': JOBS['a']})
+
+    def run_scenario(scenario):
+        scenario.result_file_path = '/results/data/scenario.csv'
+
+    run_worker(queue, run_scenario)
+    job = queue.get_job('a')
+    assert job['state'] == JobState.DONE
+    assert (job['scenario_id'], job['result_path']) == ('scenario', '/results/data/scenario.csv')
+
+
+@pytest.mark.parametrize('interruption', [KeyboardInterrupt, asyncio.CancelledError])
+def test_worker_releases_interrupted_jobs(create_queue, interruption):
+    queue = create_queue()
+    queue.add_jobs({'a': JOBS['a']})
+
+    def run_scenario(scenario):
+        raise interruption()
+
+    with pytest.raises(interruption):
+        run_worker(queue, run_scenario)
+    job = queue.get_job('a')
+    assert job['state'] == JobState.PENDING
+    assert job['attempts'] == 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from agent_communication_generation_tool.description_classes.agent import LeafAgent, CentralAgent, AggregatorAgent
+from agent_communication_generation_tool.description_classes.communication_graph import RingOverlayGraph, \
+    SmallWorldOverlayGraph, CompleteOverlayGraph, StarCommunicationGraph
+
+
+def create_agents():
+    # non-leaf agents between the leaf agents, so ring edges also connect leaf agents to other agents
+    central_agent = CentralAgent('control_center', 1000, CentralAgent.CentralAgentType.CONTROL_CENTER_AGENT)
+    aggregator_agent = AggregatorAgent('aggregator', 1001, AggregatorAgent.AggregatorAgentType.AGGREGATOR_AGENT)
+    leaf_agents = [LeafAgent(f'leaf_{i}', 1002 + i, LeafAgent.LeafAgentType.HOUSEHOLD_AGENT) for i in range(12)]
+    agents = leaf_agents[:4] + [aggregator_agent] + leaf_agents[4:9] + [central_agent] + leaf_agents[9:]
+    return agents, central_agent, aggregator_agent
+
+
+def create_graphs(sparse_adjacency: bool):
+    agents, central_agent, aggregator_agent = create_agents()
+    return [RingOverlayGraph(agents, central_agent, sparse_adjacency=sparse_adjacency),
+            SmallWorldOverlayGraph(agents, central_agent, p=0.5, sparse_adjacency=sparse_adjacency,
+                                   rng=np.random.default_rng(1)),
+            CompleteOverlayGraph(agents, central_agent, sparse_adjacency=sparse_adjacency),
+            StarCommunicationGraph(agents, central_agent, aggregator_agent, sparse_adjacency=sparse_adjacency)]
+
+
+@pytest.mark.parametrize('graph_index', range(4))
+def test_sparse_adjacency_matches_networkx(graph_index):
+    graph = create_graphs(sparse_adjacency=False)[graph_index]
+    sparse_graph = create_graphs(sparse_adjacency=True)[graph_index]
+    for node in range(len(graph.agents)):
+        if node not in graph.graph:
+            assert len(sparse_graph.get_neighbor_nodes(node)) == 0
+            continue
+        assert sorted(graph.get_neighbor_nodes(node).tolist()) == sparse_graph.get_neighbor_nodes(node).tolist()
+    assert get_edge_set(graph) == get_edge_set(sparse_graph)
+
+
+def get_edge_set(graph) -> set:
+    return {tuple(sorted(edge)) for edge in graph.graph.edges}
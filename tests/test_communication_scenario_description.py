@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip('simbench')
+
+from agent_communication_generation_tool.description_classes import communication_scenario_description
+from agent_communication_generation_tool.description_classes.agent import LeafAgent, CentralAgent
+from agent_communication_generation_tool.description_classes.agent_communication_pattern import \
+    DemandSupplyBalancing, OrganizationalStructure
+from agent_communication_generation_tool.description_classes.communication_graph import StarCommunicationGraph
+from agent_communication_generation_tool.description_classes.communication_network_description import \
+    EthernetDescription
+from agent_communication_generation_tool.description_classes.communication_scenario_description import \
+    CommunicationScenarioDescription
+from agent_communication_generation_tool.description_classes.data_size_generator import \
+    InIntervalDataSizeGenerator, IncreasingInIntervalDataSizeGenerator
+
+
+@pytest.fixture
+def create_scenario(tmp_path, monkeypatch):
+    # traffic configuration and result files are written to (and deleted from) a temporary directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(communication_scenario_description, 'ROOT', str(tmp_path))
+    control_center_agent = CentralAgent('control_center_agent', 1000,
+                                        CentralAgent.CentralAgentType.CONTROL_CENTER_AGENT)
+    generation_agents = [LeafAgent(f'generation_agent_{i}', 1001 + i, LeafAgent.LeafAgentType.GENERATION_AGENT)
+                         for i in range(5)]
+    graph = StarCommunicationGraph(generation_agents + [control_center_agent], control_center_agent)
+
+    def create(data_size_generator, seed):
+        pattern = DemandSupplyBalancing(1000, graph, data_size_generator, OrganizationalStructure.CENTRALIZED,
+                                        (100, 1000))
+        return CommunicationScenarioDescription(f'scenario_{seed}', EthernetDescription(), pattern, graph, seed=seed)
+
+    return create
+
+
+def get_packet_sizes(scenario: CommunicationScenarioDescription, run_directory: str) -> list[int]:
+    scenario.prepare_run(run_directory)
+    return scenario.agent_communication_pattern.get_inputs()['packetSize_B'].tolist()
+
+
+@pytest.mark.parametrize('data_size_generator_class', [InIntervalDataSizeGenerator,
+                                                       IncreasingInIntervalDataSizeGenerator])
+def test_scenarios_sharing_a_data_size_generator(create_scenario, tmp_path, data_size_generator_class):
+    packet_sizes = [get_packet_sizes(create_scenario(data_size_generator_class(8, 50), seed), str(tmp_path / 'run'))
+                    for seed in [1, 2]]
+    data_size_generator = data_size_generator_class(8, 50)
+    scenarios = [create_scenario(data_size_generator, seed) for seed in [1, 2]]
+    assert [get_packet_sizes(scenario, str(tmp_path / f'run_{i}')) for i, scenario in enumerate(scenarios)] == \
+           packet_sizes
+    assert packet_sizes[0] != packet_sizes[1]
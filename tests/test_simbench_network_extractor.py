@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('simbench')
+pytest.importorskip('sklearn')
+pytest.importorskip('utm')
+
+from agent_communication_generation_tool.description_classes.agent import LeafAgent, CentralAgent
+from network_generation import simbench_network_extractor
+from network_generation.simbench_network_extractor import SimbenchEthernetNetworkExtractor, SystemState
+
+
+def create_extractor(seed=0) -> SimbenchEthernetNetworkExtractor:
+    extractor = SimbenchEthernetNetworkExtractor('1-LV-rural1--0-sw', SystemState.LIMITED, None,
+                                                 np.random.default_rng(seed))
+    extractor.household_agents = [LeafAgent(f'household_agent_{i}', 1000 + i, LeafAgent.LeafAgentType.HOUSEHOLD_AGENT,
+                                            coordinates=(i, i)) for i in range(6)]
+    extractor.control_center_agent = CentralAgent('control_center_agent', 2000,
+                                                  CentralAgent.CentralAgentType.CONTROL_CENTER_AGENT)
+    extractor.agents = extractor.household_agents + [extractor.control_center_agent]
+    extractor.add_traffic_devices()
+    extractor.place_communication_infrastructure()
+    extractor.draw_traffic_device_destinations()
+    return extractor
+
+
+def create_directory(path):
+    (path / 'networks').mkdir(parents=True)
+    (path / 'omnetpp.ini').write_text('[General]\n')
+    return path
+
+
+def get_destinations(directory) -> list[str]:
+    return [line.split('=')[1].strip().strip('"') for line in (directory / 'omnetpp.ini').read_text().splitlines()
+            if 'destAddress' in line]
+
+
+def test_destinations_do_not_depend_on_previous_writes(tmp_path):
+    extractor = create_extractor()
+    active_agent_names = {'control_center_agent', 'household_agent_1'}
+    first_directory = create_directory(tmp_path / 'first')
+    extractor.prune_agents(active_agent_names, str(first_directory))
+    for i in range(3):
+        extractor.prune_agents({'household_agent_2'}, str(create_directory(tmp_path / f'other_{i}')))
+    second_directory = create_directory(tmp_path / 'second')
+    extractor.prune_agents(active_agent_names, str(second_directory))
+
+    destinations = get_destinations(first_directory)
+    assert len(destinations) == len(extractor.traffic_devices)
+    assert set(destinations) <= active_agent_names
+    assert destinations == get_destinations(second_directory)
+    # without pruning, the drawn destinations are used
+    complete_directory = create_directory(tmp_path / 'complete')
+    extractor.prune_agents(None, str(complete_directory))
+    assert get_destinations(complete_directory) == [agent.omnet_name
+                                                    for agent in extractor.traffic_device_destinations]
+
+
+def test_project_files_are_rewritten_after_writes_to_run_directories(tmp_path, monkeypatch):
+    project_directory = create_directory(tmp_path / 'project')
+    monkeypatch.setattr(simbench_network_extractor, 'OMNET_PROJECT_DIRECTORY', str(project_directory))
+    extractor = create_extractor()
+    extractor.prune_agents({'household_agent_1'})
+    extractor.prune_agents({'household_agent_2'}, str(create_directory(tmp_path / 'run')))
+    extractor.prune_agents({'household_agent_2'})
+    assert set(get_destinations(project_directory)) == {'household_agent_2'}
+    assert extractor.pruned_agent_names_by_directory[str(project_directory)] == \
+        {agent.omnet_name for agent in extractor.agents} - {'household_agent_2'}
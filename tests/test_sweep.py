@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip('simbench')
+
+from agent_communication_generation_tool.description_classes import communication_scenario_description
+from agent_communication_generation_tool.description_classes.agent import LeafAgent, CentralAgent
+from agent_communication_generation_tool.description_classes.communication_graph import StarCommunicationGraph
+from agent_communication_generation_tool.description_classes.communication_network_description import \
+    EthernetDescription
+from agent_communication_generation_tool.sweep import get_description_text, SweepSpecification
+
+
+def create_entry(parameters: dict) -> dict:
+    return {'name': 'DemandSupplyBalancing', 'parameters': parameters, 'graph': 'star', 'repetition': 0,
+            'network': {'num_agents': 10, 'simbench_code': '1-LV-rural1--0-sw', 'technology': '5G',
+                        'system_state': 'NORMAL'}}
+
+
+def test_description_text_is_canonical():
+    by_name = get_description_text(create_entry({'t_central_optimization_range': 'low'}))
+    by_bounds = get_description_text(create_entry({'t_central_optimization_range': [100, 1000]}))
+    assert by_name == by_bounds
+    assert 't_central_optimization_range_100_1000_star' in by_name
+    for character in '[], \'':
+        assert character not in by_name
+
+
+@pytest.fixture
+def create_specification(tmp_path, monkeypatch):
+    # traffic configuration and result files are written to (and deleted from) a temporary directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(communication_scenario_description, 'ROOT', str(tmp_path))
+    control_center_agent = CentralAgent('control_center_agent', 1000,
+                                        CentralAgent.CentralAgentType.CONTROL_CENTER_AGENT)
+    generation_agents = [LeafAgent(f'generation_agent_{i}', 1001 + i, LeafAgent.LeafAgentType.GENERATION_AGENT)
+                         for i in range(5)]
+    graph = StarCommunicationGraph(generation_agents + [control_center_agent], control_center_agent)
+
+    def create():
+        specification = SweepSpecification({'simulation_duration_ms': 1000,
+                                            'scenarios': [{'pattern': 'DemandSupplyBalancing'}]})
+        specification.get_network_description = lambda network: EthernetDescription()
+        specification.get_communication_graph = lambda network, graph_type: graph
+        return specification
+
+    return create
+
+
+def get_packet_sizes(specification: SweepSpecification, entries: list[dict], tmp_path) -> list[list[int]]:
+    # like the ScenarioRunner: all scenarios are created before the first one is run
+    scenarios = [specification.create_scenario(entry) for entry in entries]
+    packet_sizes = []
+    for i, scenario in enumerate(scenarios):
+        scenario.prepare_run(str(tmp_path / f'run_{i}'))
+        packet_sizes.append(scenario.agent_communication_pattern.get_inputs()['packetSize_B'].tolist())
+    return packet_sizes
+
+
+@pytest.mark.parametrize('data_size_generator', ['8-50B', 'increasing 8-50B'])
+def test_scenarios_do_not_share_data_size_generators(create_specification, tmp_path, data_size_generator):
+    entries = []
+    for seed in [1, 2]:
+        entry = create_entry({'data_size_generator': data_size_generator, 'organizational_structure': 'CENTRALIZED',
+                              't_central_optimization_range': 'low'})
+        entry.update(pattern='DemandSupplyBalancing', simulation_duration_ms=1000, seed=seed)
+        entries.append(entry)
+    packet_sizes = get_packet_sizes(create_specification(), entries, tmp_path)
+    for entry, entry_packet_sizes in zip(entries, packet_sizes):
+        assert get_packet_sizes(create_specification(), [entry], tmp_path) == [entry_packet_sizes]
+    assert packet_sizes[0] != packet_sizes[1]
@@ -0,0 +1,75 @@
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_communication_generation_tool.description_classes.agent import LeafAgent
+from agent_communication_generation_tool.description_classes.traffic_bundle import write_traffic_bundle, \
+    TrafficBundle
+from agent_communication_generation_tool.description_classes.traffic_configuration import TrafficConfiguration, \
+    StreamRule
+
+AGENTS = [LeafAgent(f'household_agent_{i}', 1000 + i, LeafAgent.LeafAgentType.HOUSEHOLD_AGENT) for i in range(3)]
+
+
+def create_configs() -> list[TrafficConfiguration]:
+    config = TrafficConfiguration(AGENTS[0].omnet_name)
+    for i in range(4):
+        config.add_message(msg_id=i, time_send_ms=100 * i, receiver=AGENTS[1 + i % 2], packet_size_bytes=50 + i,
+                           reply=i % 2 == 1, reply_after_ms=10 * i)
+    config.add_stream_rule(StreamRule(receiver=AGENTS[2], start_ms=1000, period_ms=250, count=3, first_msg_id=4,
+                                      msg_id_stride=1, packet_size_range_bytes=(100, 200), seed=7))
+    other_config = TrafficConfiguration(AGENTS[1].omnet_name)
+    other_config.add_message(msg_id=0, time_send_ms=500, receiver=AGENTS[0], packet_size_bytes=20)
+    return [config, other_config]
+
+
+def test_bundle_layout(tmp_path):
+    configs = create_configs()
+    file_path = str(tmp_path / 'traffic.bundle')
+    write_traffic_bundle(file_path, configs)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    magic, version, num_agents, record_size, records_offset = struct.unpack_from('<4sIIIQ', data, 0)
+    assert (magic, version, num_agents, record_size) == (b'TRCB', 1, 3, 7 * 4)
+    names = []
+    first_records = []
+    for code in range(num_agents):
+        name_offset, name_length, first_record, num_records = struct.unpack_from('<IIQQ', data, 24 + 24 * code)
+        name_table_offset = 24 + 24 * num_agents
+        names.append(data[name_table_offset + name_offset:name_table_offset + name_offset + name_length].decode())
+        first_records.append((first_record, num_records))
+    assert names == [agent.omnet_name for agent in AGENTS]
+    # agents that only receive have no records
+    assert first_records == [(0, 7), (7, 1), (0, 0)]
+    assert records_offset % 8 == 0
+    assert len(data) == records_offset + 8 * record_size
+
+    records = list(struct.iter_unpack('<7i', data[records_offset:]))
+    columns = configs[0].get_all_columns()
+    receiver_codes = [AGENTS.index(receiver) for receiver in configs[0].receivers]
+    assert records[:7] == [(msg_id, time_send, receiver_codes[receiver], port, size, int(reply), reply_after)
+                           for msg_id, time_send, receiver, port, size, reply, reply_after in
+                           zip(*(columns[name].tolist() for name in TrafficConfiguration.COLUMN_TYPES))]
+    assert records[7] == (0, 500, 0, 1000, 20, 0, 0)
+
+
+def test_bundle_round_trip(tmp_path):
+    configs = create_configs()
+    file_path = str(tmp_path / 'traffic.bundle')
+    write_traffic_bundle(file_path, configs)
+    bundle = TrafficBundle(file_path)
+    for config in configs:
+        pd.testing.assert_frame_equal(bundle.to_dataframe(config.sender), config.to_dataframe(), check_dtype=False)
+    assert len(bundle.get_records(AGENTS[2].omnet_name)) == 0
+    assert len(bundle.to_dataframe()) == 8
+    assert isinstance(bundle.records, np.memmap)
+
+
+def test_bundle_rejects_other_files(tmp_path):
+    file_path = tmp_path / 'traffic_config.json'
+    file_path.write_text('{"sender": "household_agent_0", "messageList": []}\n')
+    with pytest.raises(ValueError):
+        TrafficBundle(str(file_path))
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from agent_communication_generation_tool.description_classes.agent import LeafAgent
+from agent_communication_generation_tool.description_classes.traffic_configuration import TrafficConfiguration, \
+    StreamRule, TrafficConfigurationWriter, read_traffic_configuration_chunks, splitmix64, \
+    merge_traffic_configurations
+
+SENDER = LeafAgent('household_agent_0', 1000, LeafAgent.LeafAgentType.HOUSEHOLD_AGENT)
+RECEIVERS = [LeafAgent(f'household_agent_{i}', 1000 + i, LeafAgent.LeafAgentType.HOUSEHOLD_AGENT) for i in range(1, 4)]
+
+
+def create_config(num_messages=5, stream_rule_count=4) -> TrafficConfiguration:
+    config = TrafficConfiguration(SENDER)
+    for i in range(num_messages):
+        config.add_message(msg_id=i, time_send_ms=100 * i, receiver=RECEIVERS[i % len(RECEIVERS)],
+                           packet_size_bytes=50 + i, reply=i % 2 == 1, reply_after_ms=10 * i)
+    if stream_rule_count > 0:
+        config.add_stream_rule(StreamRule(receiver=RECEIVERS[0], start_ms=1000, period_ms=250,
+                                          count=stream_rule_count, first_msg_id=num_messages, msg_id_stride=1,
+                                          packet_size_range_bytes=(100, 200), reply=True,
+                                          reply_after_ms_range=(5, 50), seed=42))
+    return config
+
+
+def test_chunks_are_read_in_file_order(tmp_path):
+    config = create_config()
+    writer = TrafficConfigurationWriter(str(tmp_path / 'traffic_config.json'), SENDER.omnet_name)
+    writer.append(config)
+    writer.close()
+    chunks = list(read_traffic_configuration_chunks(writer.file_path, chunk_size=3))
+    # messages of the messageList come before the messages of the stream rules
+    assert pd.concat(chunks)['msgId'].tolist() == list(range(9))
+    assert all(len(chunk) <= 3 for chunk in chunks)
+
+
+def test_splitmix64_matches_reference():
+    # outputs of the reference implementation (state incremented before mixing) for seeds 0 and 1234567
+    assert splitmix64(0, np.arange(3)).tolist() == [0xE220A8397B1DCDAF, 0x6E789E6AA1B965F4, 0x06C45D188009454F]
+    assert splitmix64(1234567, np.arange(2)).tolist() == [0x599ED017FB08FC85, 0x2C73F08458540FA5]
+
+
+def test_stream_rules_are_reproducible():
+    rule = StreamRule(receiver=RECEIVERS[0], start_ms=0, period_ms=10, count=1000, first_msg_id=0, msg_id_stride=2,
+                      packet_size_range_bytes=(100, 200), reply=True, reply_after_ms_range=(5, 50), seed=42)
+    columns = rule.get_message_columns(np.arange(1000, dtype=np.int64))
+    # messages are expanded independently of each other, e.g. chunk by chunk
+    chunk_columns = rule.get_message_columns(np.arange(500, 1000, dtype=np.int64))
+    for name in columns:
+        assert np.array_equal(columns[name][500:], chunk_columns[name])
+    assert columns['msgId'][-1] == 1998
+    assert columns['packetSize_B'].min() >= 100 and columns['packetSize_B'].max() <= 200
+    assert columns['replyAfter_ms'].min() >= 5 and columns['replyAfter_ms'].max() <= 50
+
+
+def test_json_round_trip(tmp_path):
+    config = create_config()
+    file_path = tmp_path / 'traffic_config.json'
+    file_path.write_text(config.to_json())
+    df = pd.concat(read_traffic_configuration_chunks(str(file_path), chunk_size=2), ignore_index=True)
+    pd.testing.assert_frame_equal(df, config.to_dataframe(), check_dtype=False, check_like=True)
+
+
+def test_writer_writes_slices_like_to_json(tmp_path):
+    config = create_config()
+    first_slice = TrafficConfiguration(SENDER)
+    second_slice = TrafficConfiguration(SENDER)
+    for msg_id, time_send, receiver, port, size, reply, reply_after in zip(
+            *(config.get_column(name).tolist() for name in TrafficConfiguration.COLUMN_TYPES)):
+        (first_slice if msg_id < 2 else second_slice).add_message(msg_id, time_send, config.receivers[receiver], size,
+                                                                  reply, reply_after)
+    second_slice.stream_rules = config.stream_rules
+    writer = TrafficConfigurationWriter(str(tmp_path / 'traffic_config.json'), SENDER.omnet_name)
+    writer.append(first_slice)
+    writer.append(TrafficConfiguration(SENDER))
+    writer.append(second_slice)
+    writer.close()
+    with open(writer.file_path) as f:
+        assert f.read() == config.to_json()
+
+
+def test_copy_does_not_share_messages():
+    config = create_config()
+    config_copy = config.copy()
+    config_copy.set_column('packetSize_B', 0)
+    config_copy.stream_rules[0].count = 1
+    config_copy.add_message(msg_id=100, time_send_ms=0, receiver=SENDER, packet_size_bytes=1)
+    assert len(config) == 9
+    assert config.get_column('packetSize_B').tolist() == [50, 51, 52, 53, 54]
+    assert config.receivers == RECEIVERS
+
+
+def test_merge_delays_colliding_messages():
+    first_config = TrafficConfiguration(SENDER)
+    first_config.add_message(msg_id=0, time_send_ms=100, receiver=RECEIVERS[0], packet_size_bytes=10)
+    first_config.add_message(msg_id=1, time_send_ms=100, receiver=RECEIVERS[1], packet_size_bytes=10)
+    second_config = TrafficConfiguration(SENDER)
+    second_config.add_message(msg_id=0, time_send_ms=100, receiver=RECEIVERS[0], packet_size_bytes=20)
+    second_config.add_message(msg_id=1, time_send_ms=101, receiver=RECEIVERS[0], packet_size_bytes=20)
+    merged = merge_traffic_configurations([first_config, second_config], [0, 10])
+    df = merged.to_dataframe()
+    assert df['msgId'].tolist() == [0, 1, 10, 11]
+    assert df['timeSend_ms'].tolist() == [100, 100, 101, 102]
+    assert df['receiver'].tolist() == ['household_agent_1', 'household_agent_2', 'household_agent_1',
+                                       'household_agent_1']